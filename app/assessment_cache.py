@@ -0,0 +1,66 @@
+import hashlib
+import threading
+
+from instagram_fetch import InstagramProfile, ScanOptions
+from ocr_preprocessing import OcrMode
+
+INSTAGRAM = "instagram"
+GRADES = "grades"
+TEXT = "text"
+
+
+def fingerprint(value) -> str:
+    return hashlib.sha256(repr(value).encode()).hexdigest()
+
+
+def grades_fingerprint(grades: list) -> str:
+    # Subject order doesn't matter, so the same grades entered in a different order still match
+    return fingerprint([sorted(term_grades.items()) for term_grades in grades])
+
+
+def instagram_fingerprint(profile: InstagramProfile, options: ScanOptions, ocr_mode: OcrMode = None) -> str | None:
+    # A new post changes the newest shortcode, and a new bio or different scan or OCR options change the rest. Returns
+    # None for a profile that couldn't be fetched, so failures are never reused.
+    if profile.error is not None:
+        return None
+
+    latest_post = max(profile.posts, key=lambda post: post.date).shortcode if len(profile.posts) > 0 else None
+    return fingerprint((profile.biography, latest_post, options, ocr_mode))
+
+
+class AssessmentCache:
+    # The last result of each part of each student's assessment (Instagram, grades and text), along with a
+    # fingerprint of the inputs it was computed from. A re-run asks for each part with the current fingerprint and
+    # only recomputes the parts that come back as None. Shared by the worker threads of a run.
+    def __init__(self):
+        self.hits = {INSTAGRAM: 0, GRADES: 0, TEXT: 0}
+        self.misses = {INSTAGRAM: 0, GRADES: 0, TEXT: 0}
+
+        self._entries = {}  # (student name, part) -> (fingerprint, result)
+        self._lock = threading.Lock()
+
+    def get(self, student_name: str, part: str, input_fingerprint: str | None):
+        with self._lock:
+            entry = self._entries.get((student_name, part))
+            if input_fingerprint is None or entry is None or entry[0] != input_fingerprint:
+                self.misses[part] += 1
+                return None
+
+            self.hits[part] += 1
+            return entry[1]
+
+    def put(self, student_name: str, part: str, input_fingerprint: str | None, result):
+        if input_fingerprint is None:
+            return
+
+        with self._lock:
+            self._entries[(student_name, part)] = (input_fingerprint, result)
+
+    def forget(self, student_name: str):
+        with self._lock:
+            for part in self.hits:
+                self._entries.pop((student_name, part), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
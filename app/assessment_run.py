@@ -0,0 +1,82 @@
+import threading
+
+import scheduler
+
+
+class AssessmentRun:
+    # Collects the results of one batch of assessments. Every student is counted once, as either completed or
+    # failed, and on_complete is called exactly once when all of them are in. Anything reported after that is ignored.
+    #
+    # With total=None, students are added with expect() while they are still being read, and the run can only finish
+    # once close() says there are no more to come.
+    #
+    # on_result is called with each result as it is recorded. With keep_results=False the results are only passed
+    # to on_result and not kept, so a long run can be written out as it goes without holding all of it in memory.
+    def __init__(self, total: int | None, on_complete=None, on_result=None, keep_results: bool = True):
+        self.total = total or 0
+        self.results = []
+        self.failures = {}
+        self.completed = 0
+        self.failed = 0
+
+        self._on_complete = on_complete
+        self._on_result = on_result
+        self._keep_results = keep_results
+        self._recorded = set()
+        self._finished = False
+        self._open = total is None
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self) -> bool:
+        with self._lock:
+            return self._finished
+
+    def expect(self, count: int = 1):
+        with self._lock:
+            self.total += count
+
+    def close(self):
+        with self._lock:
+            self._open = False
+
+        self._check_complete()
+
+    def record_result(self, key: str, result):
+        with self._lock:
+            if self._finished or key in self._recorded:
+                return
+            self._recorded.add(key)
+            if self._keep_results:
+                self.results.append(result)
+            self.completed += 1
+
+        if self._on_result is not None:
+            self._on_result(result)
+
+        self._check_complete()
+
+    def record_failure(self, key: str, error: BaseException):
+        with self._lock:
+            if self._finished or key in self._recorded:
+                return
+            self._recorded.add(key)
+            self.failures[key] = error
+            self.failed += 1
+
+        self._check_complete()
+
+    def record_event(self, event: scheduler.AssessmentEvent):
+        if event.error is None:
+            self.record_result(event.key, event.result)
+        else:
+            self.record_failure(event.key, event.error)
+
+    def _check_complete(self):
+        with self._lock:
+            if self._finished or self._open or self.completed + self.failed < self.total:
+                return
+            self._finished = True
+
+        if self._on_complete is not None:
+            self._on_complete(self)
@@ -0,0 +1,200 @@
+import argparse
+import csv
+import multiprocessing
+import sys
+
+import health_assessment
+import ocr_batching
+import ocr_preprocessing
+import result_export
+import scheduler
+import student_list
+from instagram_fetch import ScanOptions
+
+# Runs a mass assessment without the GUI, for scheduled scans on a server:
+#
+#   python app/cli.py students.txt --output results.csv --image-text --image-brightness
+#
+# The student list uses the same format as Import List in the GUI. Results are written as CSV, lowest (most
+# concerning) score first, with the same columns as the GUI's Save to CSV.
+#
+# With --export-dir, every student is also written to normalized students/instagram_posts/grade_changes tables as
+# soon as they finish (see result_export). If --output isn't given as well, the summary CSV is skipped and results
+# aren't kept in memory at all.
+
+
+def log_in(username: str, password: str = None):
+    instagram_bot = health_assessment.instagram_bot.get()
+
+    if password is None:
+        instagram_bot.load_session_from_file(username)
+    else:
+        instagram_bot.login(username, password)
+
+
+def report_progress(assessment_run):
+    print(f"\rAssessed {assessment_run.completed + assessment_run.failed}/{assessment_run.total}", end="",
+          file=sys.stderr, flush=True)
+
+
+def main(arguments=None) -> int:
+    parser = argparse.ArgumentParser(description="Assess every student in a student list and write the results.")
+    parser.add_argument("student_list", help="student list file, in the GUI's Import List format")
+    parser.add_argument("-o", "--output", help="CSV file to write (default: standard output)")
+    parser.add_argument("--image-text", action="store_true", help="scan the text in post images (slower)")
+    parser.add_argument("--image-brightness", action="store_true", help="score post image brightness")
+    parser.add_argument("--ocr-max-side", type=int, metavar="PIXELS",
+                        help=f"scan image text at most this many pixels wide and high (faster; "
+                             f"{ocr_preprocessing.DEFAULT_MAX_SIDE} reads most quote posts)")
+    parser.add_argument("--ocr-text-check", action="store_true",
+                        help="skip scanning images that don't look like they contain text")
+    parser.add_argument("--ocr-processes", type=int, metavar="COUNT",
+                        help="scan image text in this many worker processes, each with its own model "
+                             "(default: one shared model; needs fork, so not on Windows)")
+    parser.add_argument("--ocr-torch-threads", type=int, metavar="COUNT",
+                        help="torch threads per --ocr-processes worker (default: the CPU cores split between them)")
+    parser.add_argument("--ocr-batch-size", type=int, metavar="IMAGES",
+                        help=f"images scanned together by the shared model "
+                             f"(default: {ocr_batching.DEFAULT_BATCH_SIZE})")
+    parser.add_argument("--ocr-max-wait", type=float, metavar="SECONDS",
+                        help=f"how long a partial batch waits for more images "
+                             f"(default: {ocr_batching.DEFAULT_MAX_WAIT})")
+    parser.add_argument("--io-workers", type=int, default=scheduler.DEFAULT_IO_WORKERS,
+                        help="concurrent Instagram requests")
+    parser.add_argument("--cpu-workers", type=int, default=scheduler.DEFAULT_CPU_WORKERS,
+                        help="concurrent OCR and scoring jobs")
+    parser.add_argument("--instagram-username", help="Instagram account to scan from")
+    parser.add_argument("--instagram-password",
+                        help="password for --instagram-username; without it, a saved session is loaded")
+    parser.add_argument("--export-dir", help="directory to stream normalized result tables into")
+    parser.add_argument("--export-format", choices=result_export.FORMATS, default=result_export.CSV,
+                        help="file format for --export-dir (parquet needs pyarrow)")
+    parser.add_argument("--trace-json", metavar="PATH", help="write per-stage and per-student timings as JSON")
+    parser.add_argument("--trace-prometheus", metavar="PATH",
+                        help="write per-stage timings in Prometheus text format (e.g. for a textfile collector)")
+    parser.add_argument("--quiet", action="store_true", help="don't report progress")
+    arguments = parser.parse_args(arguments)
+    if arguments.ocr_max_side is not None and arguments.ocr_max_side < 1:
+        parser.error("--ocr-max-side must be at least 1")
+    if arguments.ocr_processes is not None and arguments.ocr_processes < 0:
+        parser.error("--ocr-processes can't be negative")
+    if arguments.ocr_processes and "fork" not in multiprocessing.get_all_start_methods():
+        parser.error("--ocr-processes needs the fork start method, which this platform doesn't have")
+    if arguments.ocr_torch_threads is not None and arguments.ocr_torch_threads < 1:
+        parser.error("--ocr-torch-threads must be at least 1")
+    if arguments.ocr_batch_size is not None and arguments.ocr_batch_size < 1:
+        parser.error("--ocr-batch-size must be at least 1")
+    if arguments.ocr_max_wait is not None and arguments.ocr_max_wait < 0:
+        parser.error("--ocr-max-wait can't be negative")
+
+    if arguments.image_text:
+        # Before logging in or starting the assessment, so any OCR processes are forked while there are no threads
+        health_assessment.configure_ocr(arguments.ocr_processes, arguments.ocr_torch_threads, arguments.ocr_batch_size,
+                                        arguments.ocr_max_wait)
+
+    if arguments.instagram_username:
+        try:
+            log_in(arguments.instagram_username, arguments.instagram_password)
+        except Exception as error:
+            print(f"Could not log in to Instagram: {error}", file=sys.stderr)
+            return 1
+
+    def report_error(error):
+        print(f"{arguments.student_list}:{error.line_number}: {error.message}", file=sys.stderr)
+
+    options = ScanOptions(arguments.image_text, arguments.image_brightness)
+    health_assessment.ocr_mode = ocr_preprocessing.OcrMode(arguments.ocr_max_side, arguments.ocr_text_check)
+    write_summary = arguments.output is not None or arguments.export_dir is None
+
+    exporter = None
+    if arguments.export_dir:
+        try:
+            exporter = result_export.ResultExporter(arguments.export_dir, arguments.export_format)
+        except (ImportError, OSError) as error:
+            print(f"Could not export to {arguments.export_dir}: {error}", file=sys.stderr)
+            return 1
+
+    try:
+        file = open(arguments.student_list, encoding="utf-8")
+    except OSError as error:
+        print(f"Could not read {arguments.student_list}: {error}", file=sys.stderr)
+        if exporter is not None:
+            exporter.close()
+        return 1
+
+    # Students are assessed while the rest of the list is still being read. Errors reading the list or writing the
+    # export are kept and reported on their own, so they aren't mistaken for each other or for other failures.
+    read_errors = []
+    export_errors = []
+
+    def read_lines():
+        try:
+            yield from file
+        except (OSError, UnicodeDecodeError) as error:
+            read_errors.append(error)  # The list ends here
+
+    def export_result(result):
+        if len(export_errors) == 0:
+            try:
+                exporter.write(result)
+            except OSError as error:
+                export_errors.append(error)  # Nothing more is exported, but the assessment carries on
+
+    try:
+        with file:
+            assessment_run = health_assessment.assess_students(
+                student_list.read_student_list(read_lines(), report_error), options, arguments.io_workers,
+                arguments.cpu_workers, None if arguments.quiet else report_progress, report_error,
+                None if exporter is None else export_result, keep_results=write_summary)
+    except OSError as error:
+        print(f"The assessment failed: {error}", file=sys.stderr)
+        return 1
+    finally:
+        if exporter is not None:
+            try:
+                exporter.close()
+            except OSError as error:
+                export_errors.append(error)
+
+    if len(read_errors) > 0:
+        print(f"Could not read {arguments.student_list}: {read_errors[0]}", file=sys.stderr)
+        return 1
+    if len(export_errors) > 0:
+        print(f"Could not export to {arguments.export_dir}: {export_errors[0]}", file=sys.stderr)
+        return 1
+
+    if not arguments.quiet:
+        print(file=sys.stderr)
+
+        ocr_stats = health_assessment.ocr_stats
+        if ocr_stats.images > 0 and health_assessment.ocr_mode != ocr_preprocessing.FULL_SIZE:
+            print(f"Scanned {ocr_stats.images - ocr_stats.skipped} images for text and skipped {ocr_stats.skipped}, "
+                  f"saving about {round(ocr_stats.seconds_saved, 1)}s", file=sys.stderr)
+
+    if write_summary:
+        output = open(arguments.output, "w", newline="", encoding="utf-8") if arguments.output else sys.stdout
+        try:
+            csv_out = csv.writer(output)
+            csv_out.writerow(health_assessment.CSV_HEADER)
+            for result in sorted(assessment_run.results, key=lambda result: result[2]):
+                csv_out.writerow(health_assessment.csv_row(result))
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+    try:
+        if arguments.trace_json:
+            health_assessment.tracer.write_json(arguments.trace_json)
+        if arguments.trace_prometheus:
+            health_assessment.tracer.write_prometheus(arguments.trace_prometheus)
+    except OSError as error:
+        print(f"Could not write the trace: {error}", file=sys.stderr)
+
+    for student_name, error in assessment_run.failures.items():
+        print(f"{student_name}: assessment failed ({error})", file=sys.stderr)
+
+    return 0 if assessment_run.failed == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
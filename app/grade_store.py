@@ -0,0 +1,188 @@
+import dataclasses
+
+import numpy as np
+
+# Terms are counted back from each student's most recent one, so PREVIOUS and CURRENT mean the same thing however
+# long a student's history is
+PREVIOUS = -2
+CURRENT = -1
+MIN_TERMS = 2
+
+
+@dataclasses.dataclass
+class GradeTrends:
+    # Per student and subject statistics over the graded terms, each a (students, subjects) array
+    terms: np.ndarray  # How many terms have a grade
+    slope: np.ndarray  # Least-squares change per term; for two terms this is just current - previous
+    largest_drop: np.ndarray  # The biggest fall from one graded term to the next (0 or negative)
+    volatility: np.ndarray  # Standard deviation of the term-to-term changes
+
+
+def grade_trends(grades: np.ndarray, mask: np.ndarray) -> GradeTrends:
+    # grades and mask are (students, terms, subjects) arrays, with terms in order; a missing term leaves a gap
+    # rather than shifting the later ones
+    weights = mask.astype(float)
+    terms = weights.sum(axis=1)
+    positions = np.arange(grades.shape[1], dtype=float)[:, None]
+    values = np.where(mask, grades, 0.0)
+
+    mean_position = np.divide((weights * positions).sum(axis=1), terms, out=np.zeros_like(terms), where=terms > 0)
+    mean_grade = np.divide(values.sum(axis=1), terms, out=np.zeros_like(terms), where=terms > 0)
+    offsets = (positions - mean_position[:, None, :]) * weights
+    spread = (offsets ** 2).sum(axis=1)
+    slope = np.divide((offsets * (values - mean_grade[:, None, :])).sum(axis=1), spread,
+                      out=np.zeros_like(terms), where=terms >= 2)
+
+    # Each grade is compared with the last graded term before it, skipping any gaps
+    last_graded = np.maximum.accumulate(np.where(mask, np.arange(grades.shape[1])[:, None], -1), axis=1)
+    before = np.take_along_axis(values, np.maximum(last_graded[:, :-1], 0), axis=1)
+    compared = mask[:, 1:] & (last_graded[:, :-1] >= 0)
+    steps = np.where(compared, values[:, 1:] - before, 0.0)
+
+    step_counts = compared.sum(axis=1)
+    mean_step = np.divide(steps.sum(axis=1), step_counts, out=np.zeros_like(terms), where=step_counts > 0)
+    variance = np.divide((steps ** 2).sum(axis=1), step_counts, out=np.zeros_like(terms),
+                         where=step_counts > 0) - mean_step ** 2
+
+    return GradeTrends(terms.astype(int), slope, np.minimum(steps.min(axis=1, initial=0.0), 0.0),
+                       np.sqrt(np.maximum(variance, 0.0)))
+
+
+class GradeStore:
+    # Grades for a whole roster, stored by column: one row per student, one column per subject (subject names are
+    # interned to column numbers) and one slice per term. grades holds the values as fractions and mask says which
+    # of them are present, so the whole roster can be scored with array operations instead of per-student loops.
+    # Each student's terms are right-aligned, with their current term in the last slice, so students with shorter
+    # histories simply have nothing in the earliest slices. Rows of removed students are reused, and all three axes
+    # grow by doubling.
+    def __init__(self, capacity: int = 64, subject_capacity: int = 16, term_capacity: int = 8):
+        self.subjects = []
+        self.subject_ids = {}
+        self.names = []  # Student name per row, or None for a free row
+        self.term_counts = []  # Number of terms in each row's history
+        self.rows = {}
+
+        self._free_rows = []
+        self.grades = np.zeros((capacity, max(term_capacity, MIN_TERMS), subject_capacity))
+        self.mask = np.zeros(self.grades.shape, dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.rows
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    @property
+    def previous(self) -> np.ndarray:
+        return self.grades[:len(self.names), PREVIOUS, :len(self.subjects)]
+
+    @property
+    def current(self) -> np.ndarray:
+        return self.grades[:len(self.names), CURRENT, :len(self.subjects)]
+
+    def _grow(self, rows: int, columns: int, terms: int = MIN_TERMS):
+        old_rows, old_terms, old_columns = self.grades.shape
+        if rows <= old_rows and columns <= old_columns and terms <= old_terms:
+            return
+
+        shape = (old_rows if rows <= old_rows else max(rows, old_rows * 2),
+                 old_terms if terms <= old_terms else max(terms, old_terms * 2),
+                 old_columns if columns <= old_columns else max(columns, old_columns * 2))
+        grades = np.zeros(shape)
+        mask = np.zeros(shape, dtype=bool)
+        grades[:old_rows, shape[1] - old_terms:, :old_columns] = self.grades  # New terms go in front
+        mask[:old_rows, shape[1] - old_terms:, :old_columns] = self.mask
+        self.grades = grades
+        self.mask = mask
+
+    def _term_slice(self, row: int, term: int) -> int:
+        # term counts from 0 for the oldest of the student's terms, or back from -1 for the current one
+        if term >= 0:
+            term -= self.term_counts[row]
+        if not -self.term_counts[row] <= term < 0:
+            raise IndexError(f"{self.names[row]} has no term {term}")
+
+        return self.grades.shape[1] + term
+
+    def subject_id(self, subject: str) -> int:
+        if subject not in self.subject_ids:
+            self._grow(len(self.names), len(self.subjects) + 1)
+            self.subject_ids[subject] = len(self.subjects)
+            self.subjects.append(subject)
+
+        return self.subject_ids[subject]
+
+    def add(self, name: str) -> int:
+        if name in self.rows:
+            return self.rows[name]
+
+        if len(self._free_rows) > 0:
+            row = self._free_rows.pop()
+            self.names[row] = name
+            self.term_counts[row] = MIN_TERMS
+        else:
+            row = len(self.names)
+            self._grow(row + 1, len(self.subjects))
+            self.names.append(name)
+            self.term_counts.append(MIN_TERMS)
+
+        self.rows[name] = row
+        return row
+
+    def remove(self, name: str):
+        row = self.rows.pop(name, None)
+        if row is None:
+            return
+
+        self.mask[row] = False
+        self.names[row] = None
+        self._free_rows.append(row)
+
+    def clear(self):
+        self.__init__(term_capacity=self.grades.shape[1])
+
+    def set_grade(self, name: str, term: int, subject: str, grade: float):
+        row = self.add(name)
+        column = self.subject_id(subject)
+        term_slice = self._term_slice(row, term)
+        self.grades[row, term_slice, column] = grade
+        self.mask[row, term_slice, column] = True
+
+    def set_grades(self, name: str, grades: list[dict[str, float]]):
+        # grades has one dict per term, oldest first, as produced by student_list
+        row = self.add(name)
+        self._grow(len(self.names), len(self.subjects), len(grades))
+        self.mask[row] = False
+        self.term_counts[row] = max(len(grades), MIN_TERMS)
+        for term, term_grades in enumerate(grades):
+            for subject, grade in term_grades.items():
+                self.set_grade(name, term, subject, grade)
+
+    def clear_term(self, name: str, term: int):
+        if name in self.rows:
+            row = self.rows[name]
+            self.mask[row, self._term_slice(row, term)] = False
+
+    def term_grades(self, name: str, term: int) -> dict[str, float]:
+        if name not in self.rows:
+            return {}
+
+        row = self.rows[name]
+        term_slice = self._term_slice(row, term)
+        return {self.subjects[column]: float(self.grades[row, term_slice, column])
+                for column in np.flatnonzero(self.mask[row, term_slice, :len(self.subjects)])}
+
+    def get(self, name: str) -> list[dict[str, float]]:
+        if name not in self.rows:
+            return [{} for _ in range(MIN_TERMS)]
+
+        return [self.term_grades(name, term) for term in range(self.term_counts[self.rows[name]])]
+
+    def trends(self) -> GradeTrends:
+        # Trend statistics for every row and subject; rows and subjects without two graded terms have 0 for all of
+        # them except terms
+        rows, columns = len(self.names), len(self.subjects)
+        return grade_trends(self.grades[:rows, :, :columns], self.mask[:rows, :, :columns])
@@ -0,0 +1,540 @@
+import dataclasses
+import datetime
+import os
+import queue
+import threading
+
+import instaloader
+import nltk
+import nltk.sentiment
+import numpy as np
+
+import assessment_cache
+import image_features
+import instagram_fetch
+import ocr_batching
+import ocr_cache
+import ocr_preprocessing
+import ocr_workers
+import profile_cache
+import scheduler
+import text_scoring
+import tracing
+from assessment_cache import AssessmentCache
+from assessment_run import AssessmentRun
+from grade_store import GradeStore, GradeTrends
+from instagram_fetch import InstagramProfile, ScanOptions
+from lazy_resources import LazyResource
+from student_list import StudentListError, split_student_name
+
+# The scoring core, shared by the GUI (main.py) and the command line (cli.py). Nothing here may import Tk.
+
+def load_ocr_reader():
+    import easyocr  # Imports torch, which takes seconds on its own, so wait until image text is first scanned
+    return easyocr.Reader(['en'])
+
+
+ocr_processes = 0  # Run OCR in this many worker processes instead of one shared model (needs fork, so not Windows)
+ocr_torch_threads = None  # Torch threads per OCR process, or None to split the CPU cores between them
+ocr_batch_size = ocr_batching.DEFAULT_BATCH_SIZE  # Images sent to EasyOCR together
+ocr_max_wait = ocr_batching.DEFAULT_MAX_WAIT  # Seconds to wait for a batch to fill up
+ocr_mode = ocr_preprocessing.FULL_SIZE  # Or ocr_preprocessing.FAST to read scaled-down images and skip textless ones
+ocr_stats = ocr_preprocessing.OcrStats()  # What ocr_mode has saved so far
+tracer = tracing.Tracer()  # Time spent in each stage of every assessment, per student
+reader = LazyResource("Image text", load_ocr_reader)  # None while OCR runs in worker processes
+ocr_backend = None  # Built by configure_ocr(), or from the settings above when the first image is read
+_ocr_backend_lock = threading.Lock()
+# Models and clients are created on first use or warmed up ahead of time, so importing this stays fast
+sentiment_analyzer = LazyResource("Sentiment", nltk.sentiment.vader.SentimentIntensityAnalyzer)
+text_scorer = LazyResource("Text scoring", lambda: text_scoring.TextScorer(sentiment_analyzer.get()))
+instagram_bot = LazyResource("Instagram", instaloader.Instaloader)
+cache_directory = os.path.join(os.path.expanduser("~"), ".socialscanner")
+profile_cache_ttl = profile_cache.DEFAULT_TTL  # Seconds before a cached profile is fetched again in full
+stub_url = os.environ.get("SOCIALSCANNER_STUB_URL")
+# Fixture profiles from a stub are never cached, as later real runs would be served them under real usernames. The
+# caches only create their files when first used.
+fetch_engine = instagram_fetch.InstagramFetchEngine(
+    instagram_bot.get, stub_url=stub_url,
+    cache=None if stub_url else profile_cache.ProfileCache(os.path.join(cache_directory, "profiles.sqlite3"),
+                                                           ttl=profile_cache_ttl))
+ocr_results = ocr_cache.OcrCache(os.path.join(cache_directory, "ocr.sqlite3"))
+
+
+def preprocess_text(text: str) -> str:
+    return text_scorer.get().preprocess(text)
+
+
+@dataclasses.dataclass
+class TextHealthAssessment:
+    student_text: str
+    overall_health_score: float
+
+
+@tracer.traced("text_scoring")
+def text_health_analysis(text: str) -> float:
+    return text_scorer.get().score(text)
+
+
+@tracer.traced("text_scoring_batch")
+def text_health_analysis_batch(texts) -> np.ndarray:
+    return text_scorer.get().score_batch(texts)
+
+
+BIO = "bio"
+POST = "post"
+WARNING = "warning"
+ERROR = "error"
+
+
+@dataclasses.dataclass
+class InstagramHealthAssessment:
+    @dataclasses.dataclass
+    class AssessmentResult:
+        caption: str  # As shown in the GUI, with any scanned text and brightness
+        date: datetime.datetime
+        health_score: float
+        kind: str = POST  # BIO, POST, WARNING or ERROR
+        shortcode: str = ""
+        post_caption: str | None = None  # The caption or bio alone
+        image_text: str | None = None  # Text read from the image, if it was scanned
+        brightness: float | None = None  # Brightness adjustment to the score, if brightness was scored
+        image_features: list[float] | None = None  # In image_features.FEATURES order, if brightness was scored
+
+    overall_health_score: float
+    results: list[AssessmentResult]
+
+
+# The assessment is split into stages so network requests and OCR/scoring can run on separate pools
+
+
+@tracer.traced("instagram_profile")
+def fetch_instagram_profile(username: str) -> InstagramProfile:
+    return fetch_engine.fetch_profile(username)
+
+
+@tracer.traced("caption_scoring")
+def score_instagram_captions(profile: InstagramProfile) -> InstagramProfile:
+    for post in profile.posts:
+        if post.caption is not None:
+            post.caption_score = text_health_analysis(post.caption)
+
+    return profile
+
+
+@tracer.traced("image_download")
+def fetch_post_images(profile: InstagramProfile, options: ScanOptions) -> InstagramProfile:
+    return fetch_engine.fetch_images(profile, lambda post: post.needs_image(options))
+
+
+def _build_ocr_backend():
+    # Called with _ocr_backend_lock held
+    global reader, ocr_backend
+
+    if ocr_processes > 0:
+        reader = None
+        ocr_backend = ocr_workers.OcrProcessPool(ocr_processes, ocr_torch_threads)
+    else:
+        if reader is None:
+            reader = LazyResource("Image text", load_ocr_reader)
+        ocr_backend = ocr_batching.OcrBatcher(reader.get, ocr_batch_size, ocr_max_wait)
+    return ocr_backend
+
+
+def configure_ocr(processes: int = None, torch_threads: int = None, batch_size: int = None, max_wait: float = None):
+    # Replaces the OCR backend with one built from the given settings, keeping the module's for any left out. Worker
+    # processes are forked here, so with processes call this before any threads or windows exist; otherwise they
+    # are only forked when the first image is read, from a worker thread.
+    global ocr_processes, ocr_torch_threads, ocr_batch_size, ocr_max_wait
+
+    with _ocr_backend_lock:
+        if processes is not None:
+            ocr_processes = processes
+        if torch_threads is not None:
+            ocr_torch_threads = torch_threads
+        if batch_size is not None:
+            ocr_batch_size = batch_size
+        if max_wait is not None:
+            ocr_max_wait = max_wait
+
+        if ocr_backend is not None:
+            ocr_backend.close()
+        return _build_ocr_backend()
+
+
+def get_ocr_backend():
+    if ocr_backend is None:
+        with _ocr_backend_lock:
+            if ocr_backend is None:
+                return _build_ocr_backend()
+    return ocr_backend
+
+
+@tracer.traced("ocr")
+def read_image_text(pixels: np.ndarray) -> list[str]:
+    # Reposted images (memes, quotes) turn up on many accounts, so OCR each distinct image only once per OCR mode
+    mode = ocr_mode
+    return ocr_results.get_or_compute(
+        mode.cache_key(ocr_cache.image_hash(pixels)),
+        lambda: ocr_preprocessing.read_text(get_ocr_backend().readtext, pixels, mode, ocr_stats))
+
+
+@tracer.traced("instagram_analysis")
+def analyze_instagram_profile(profile: InstagramProfile, options: ScanOptions) -> InstagramHealthAssessment:
+    if profile.error is not None:
+        raise profile.error
+
+    with tracer.span("image_decode"):
+        instagram_fetch.decode_post_images(profile, options)
+
+    health_score = 0.0
+    results = []
+
+    # Bio
+    biography = profile.biography
+    health_score += text_health_analysis(biography)
+    results.append(InstagramHealthAssessment.AssessmentResult("(BIO) " + biography, datetime.datetime.now(),
+                                                              health_score, BIO, post_caption=biography))
+
+    # Posts
+    recency_factor = 1  # Decrease importance of older posts
+    for post in profile.posts:
+        image_text = None
+        brightness_factor = None
+        features = None
+
+        if post.caption is not None:
+            full_text = post.caption
+            current_health_score = post.caption_score
+
+            if post.needs_text_scan(options):
+                image_text = " ".join(read_image_text(post.pixels))
+                full_text = image_text + " " + post.caption
+                current_health_score = text_health_analysis(full_text)
+                full_text = "<Scanned: " + image_text + "> " + post.caption
+
+            if options.image_brightness:
+                features = post.features if post.features is not None else image_features.image_features(
+                    image_features.reduce(post.pixels))
+                # Features are scaled to 0-1, so this is the grey mean (out of 255) less 100, scaled the same way
+                brightness_factor = (float(features[image_features.BRIGHTNESS]) * 255 - 100) / 255
+                current_health_score += brightness_factor
+                full_text = f"[Brightness: {round(brightness_factor, 3)}] " + full_text
+
+            results.append(
+                InstagramHealthAssessment.AssessmentResult(full_text, post.date, current_health_score, POST,
+                                                           post.shortcode, post.caption, image_text,
+                                                           brightness_factor,
+                                                           None if features is None else features.tolist()))
+            health_score += current_health_score * recency_factor
+        elif options.image_text:
+            image_text = " ".join(read_image_text(post.pixels))
+            current_health_score = text_health_analysis(image_text)
+            full_text = "<Scanned: " + image_text + ">"
+
+            results.append(
+                InstagramHealthAssessment.AssessmentResult(full_text, post.date, current_health_score, POST,
+                                                           post.shortcode, image_text=image_text))
+            health_score += current_health_score * recency_factor
+
+        recency_factor /= 1.5 # older posts decreased in importance by a factor of 1.5
+
+    if len(results) == 0 or (len(results) == 1 and results[0].caption.strip() == "(BIO)"):
+        return InstagramHealthAssessment(0.0,
+                                         [InstagramHealthAssessment.AssessmentResult(
+                                             "(WARNING) No information found. You may need to sign in to a friend's account to view private posts.",
+                                             datetime.datetime.now(), 0.0, WARNING)])
+
+    if len(results) == 1:
+        results[
+            0].caption += " (WARNING) No posts found. This account may have private posts that can only be seen if you log in using a friend's account."
+
+    NORMALIZATION_FACTOR = 4  # Approximately normalize the score to the same scale as the grades (-1 to 1).
+
+    return InstagramHealthAssessment(health_score / (1 + ((((2 / 3) ** (len(results) - 1)) - 1) / ((2 / 3) - 1))) /
+                                     NORMALIZATION_FACTOR,
+                                     results)  # Use the geometric series formula because of the weighted average.
+
+
+@tracer.traced("instagram")
+def instagram_health_assessment(username: str, options: ScanOptions = None) -> InstagramHealthAssessment:
+    if options is None:
+        options = ScanOptions()
+
+    profile = fetch_instagram_profile(username)
+    profile = score_instagram_captions(profile)
+    profile = fetch_post_images(profile, options)
+
+    return analyze_instagram_profile(profile, options)
+
+
+SUDDEN_DROP = 0.15  # A fall of this much (15 percentage points) from one term to the next is flagged
+SUDDEN_DROP_PENALTY = 0.5
+VOLATILITY_PENALTY = 1.0
+
+
+@dataclasses.dataclass
+class GradesHealthAssessment:
+    @dataclasses.dataclass
+    class AssessmentResult:
+        subject: str
+        change: float  # Trend per term; with only previous and current grades, just the difference
+        series: list[float | None] = dataclasses.field(default_factory=list)  # Grade per term, oldest first
+        largest_drop: float = 0.0
+        volatility: float = 0.0
+        sudden_drop: bool = False
+
+    overall_health_score: float
+    results: list[AssessmentResult]
+
+
+@tracer.traced("grades")
+def grades_health_assessment(grades: list) -> GradesHealthAssessment:
+    # grades has one dict per term, oldest first
+    grade_store = GradeStore(capacity=1, subject_capacity=max(map(len, grades), default=1),
+                             term_capacity=len(grades))
+    grade_store.set_grades("", grades)
+    return grades_health_assessment_batch(grade_store)[""]
+
+
+def grades_health_scores(grade_store: GradeStore, trends: GradeTrends = None) -> np.ndarray:
+    # The overall grades score of every row in the store at once. Every subject graded in at least two terms counts:
+    # its trend is scaled like a change between two terms, and with longer histories sudden drops and erratic
+    # grades count against the student too. A drop is only "sudden" against at least three terms of history, so
+    # students with just previous and current grades are scored on the difference alone, as before.
+    if trends is None:
+        trends = grade_store.trends()
+
+    trended = trends.terms >= 2
+    sudden_drops = (trends.terms >= 3) & (trends.largest_drop <= -SUDDEN_DROP)
+    # Drops in grades need to be multiplied by 2 to highlight them more
+    subject_scores = trends.slope * 2.5 - sudden_drops * SUDDEN_DROP_PENALTY - trends.volatility * VOLATILITY_PENALTY
+
+    counts = trended.sum(axis=1)
+    return np.divide(np.where(trended, subject_scores, 0.0).sum(axis=1), counts, out=np.zeros(len(counts)),
+                     where=counts > 0)
+
+
+@tracer.traced("grades_batch")
+def grades_health_assessment_batch(grade_store: GradeStore) -> dict[str, GradesHealthAssessment]:
+    trends = grade_store.trends()
+    scores = grades_health_scores(grade_store, trends).tolist()
+
+    # Pull every trended grade out in one go (row by row), then slice each student's share
+    rows, columns = np.nonzero(trends.terms >= 2)
+    subjects = [grade_store.subjects[column] for column in columns.tolist()]
+    slopes = trends.slope[rows, columns].tolist()
+    drops = trends.largest_drop[rows, columns]
+    sudden_drops = ((trends.terms[rows, columns] >= 3) & (drops <= -SUDDEN_DROP)).tolist()
+    drops = drops.tolist()
+    volatilities = trends.volatility[rows, columns].tolist()
+
+    series = grade_store.grades[rows, :, columns].astype(object)
+    series[~grade_store.mask[rows, :, columns]] = None
+    series = series.tolist()
+
+    starts = np.searchsorted(rows, np.arange(len(grade_store.names) + 1)).tolist()
+    terms = grade_store.grades.shape[1]
+
+    return {name: GradesHealthAssessment(scores[row], [
+        GradesHealthAssessment.AssessmentResult(subjects[index], slopes[index],
+                                                series[index][terms - grade_store.term_counts[row]:], drops[index],
+                                                volatilities[index], sudden_drops[index])
+        for index in range(starts[row], starts[row + 1])])
+        for name, row in grade_store.rows.items()}
+
+
+@tracer.traced("assessment")
+def run_basic_health_assessment(user_input, grades: list | GradesHealthAssessment = None,
+                                text: str | TextHealthAssessment = "",
+                                profile: InstagramProfile | InstagramHealthAssessment = None,
+                                options: ScanOptions = None):
+    # Any part can be given already assessed (from a batch or an earlier run), in which case it's used as it is
+    if options is None:
+        options = ScanOptions()
+
+    real_name, username = split_student_name(user_input)
+
+    if real_name == "" and username == "":
+        display_name = ""
+    elif username == "":
+        display_name = real_name
+    else:
+        display_name = f"{real_name}@{username}"
+
+    if isinstance(profile, InstagramHealthAssessment):
+        instagram_assessment_results = profile
+    elif username != "":
+        try:
+            if profile is None:
+                instagram_assessment_results = instagram_health_assessment(username, options)
+            else:
+                instagram_assessment_results = analyze_instagram_profile(profile, options)
+        except:
+            instagram_assessment_results = InstagramHealthAssessment(0.0, [
+                InstagramHealthAssessment.AssessmentResult(
+                    "(ERROR) No account found. Instagram may refuse to accept connections if you are not logged in.",
+                    datetime.datetime.now(),
+                    0.0, ERROR)])
+    else:
+        instagram_assessment_results = InstagramHealthAssessment(0.0, [
+            InstagramHealthAssessment.AssessmentResult("(ERROR) No account entered.", datetime.datetime.now(),
+                                                       0.0, ERROR)])
+
+    if isinstance(grades, GradesHealthAssessment):
+        grades_assessment_results = grades  # Already scored along with the rest of the roster
+    else:
+        try:
+            grades_assessment_results = grades_health_assessment(grades)
+        except:
+            grades_assessment_results = GradesHealthAssessment(0.0, [])
+
+    if isinstance(text, TextHealthAssessment):
+        text_assessment_results = text
+    elif text != "":
+        text_assessment_results = TextHealthAssessment(text, text_health_analysis(text) / 4)
+    else:
+        text_assessment_results = TextHealthAssessment("", 0.0)
+
+    mental_health_components = []
+
+    if not (len(instagram_assessment_results.results) == 0 or (len(instagram_assessment_results.results) == 1 and
+                                                          (instagram_assessment_results.results[
+                                                           0].caption.startswith(
+                                                           "(WARNING)") or instagram_assessment_results.results[
+                                                           0].caption.startswith("(ERROR)")))):
+        mental_health_components.append(instagram_assessment_results.overall_health_score)
+    
+    if len(grades_assessment_results.results) != 0:
+        mental_health_components.append(grades_assessment_results.overall_health_score)
+    
+    if text_assessment_results.student_text != "":
+        mental_health_components.append(text_assessment_results.overall_health_score)
+
+    if len(mental_health_components) == 0:
+        mental_health = 0.0
+    else:
+        mental_health = sum(mental_health_components) / len(mental_health_components)
+
+    return (display_name, username, mental_health, instagram_assessment_results,
+            grades_assessment_results, text_assessment_results)
+
+def assessment_stages(user_input: str, grades: list | GradesHealthAssessment, text: str, options: ScanOptions,
+                      cache: AssessmentCache = None) -> list:
+    # With a cache, parts whose inputs haven't changed since the student's last assessment are reused, and the
+    # results of this one are remembered. The profile listing is still fetched to see whether there are new posts,
+    # but an unchanged profile skips caption scoring, image downloads and OCR.
+    username = split_student_name(user_input)[1]
+    fingerprints = {}
+
+    if cache is not None:
+        fingerprints[assessment_cache.TEXT] = assessment_cache.fingerprint(text)
+        cached_text = cache.get(user_input, assessment_cache.TEXT, fingerprints[assessment_cache.TEXT])
+        text = text if cached_text is None else cached_text
+
+        if not isinstance(grades, GradesHealthAssessment):
+            fingerprints[assessment_cache.GRADES] = assessment_cache.grades_fingerprint(grades or [])
+            cached_grades = cache.get(user_input, assessment_cache.GRADES, fingerprints[assessment_cache.GRADES])
+            grades = grades if cached_grades is None else cached_grades
+
+    def check_profile(profile: InstagramProfile) -> InstagramProfile | InstagramHealthAssessment:
+        if cache is not None:
+            fingerprints[assessment_cache.INSTAGRAM] = assessment_cache.instagram_fingerprint(profile, options,
+                                                                                              ocr_mode)
+            cached_instagram = cache.get(user_input, assessment_cache.INSTAGRAM,
+                                         fingerprints[assessment_cache.INSTAGRAM])
+            if cached_instagram is not None:
+                return cached_instagram
+
+        return score_instagram_captions(profile)
+
+    def fetch_images_if_needed(profile: InstagramProfile | InstagramHealthAssessment):
+        return profile if isinstance(profile, InstagramHealthAssessment) else fetch_post_images(profile, options)
+
+    def assess(profile: InstagramProfile | InstagramHealthAssessment = None) -> tuple:
+        if isinstance(profile, InstagramProfile) and assessment_cache.INSTAGRAM in fingerprints:
+            try:
+                profile = analyze_instagram_profile(profile, options)
+            except Exception:
+                fingerprints.pop(assessment_cache.INSTAGRAM)  # Reported below, but never cached
+
+        result = run_basic_health_assessment(user_input, grades, text, profile, options)
+
+        if cache is not None:
+            parts = {assessment_cache.INSTAGRAM: result[3], assessment_cache.GRADES: result[4],
+                     assessment_cache.TEXT: result[5]}
+            for part, input_fingerprint in fingerprints.items():
+                cache.put(user_input, part, input_fingerprint, parts[part])
+
+        return result
+
+    # Every stage runs as this student, so the stages traced inside it are counted against them
+    if username == "":
+        return [(scheduler.CPU, tracer.for_student(user_input, assess))]
+
+    return [(pool, tracer.for_student(user_input, stage)) for pool, stage in [
+        (scheduler.IO, lambda: fetch_instagram_profile(username)),
+        (scheduler.CPU, check_profile),
+        (scheduler.IO, fetch_images_if_needed),
+        (scheduler.CPU, assess),
+    ]]
+
+
+def assess_students(records, options: ScanOptions = None, io_workers: int = scheduler.DEFAULT_IO_WORKERS,
+                    cpu_workers: int = scheduler.DEFAULT_CPU_WORKERS, on_progress=None,
+                    on_error=None, on_result=None, keep_results: bool = True) -> AssessmentRun:
+    # records is an iterable of StudentRecords, usually straight from student_list.read_student_list. Each student
+    # is handed to the scheduler as soon as it is read, so scanning starts before a long list is fully parsed. A
+    # student listed twice is only assessed once, and on_error is told about the repeat. Blocks until every student
+    # is done. on_result and keep_results are passed on to the AssessmentRun, to stream results out as they arrive.
+    if options is None:
+        options = ScanOptions()
+
+    assessment_scheduler = scheduler.AssessmentScheduler(io_workers, cpu_workers)
+    assessment_run = AssessmentRun(None, on_result=on_result, keep_results=keep_results)
+    first_lines = {}
+
+    def record_events(block: bool):
+        while not assessment_run.finished:
+            try:
+                event = assessment_scheduler.events.get(block=block)
+            except queue.Empty:
+                return
+
+            assessment_run.record_event(event)
+            if on_progress is not None:
+                on_progress(assessment_run)
+
+    # If reading the records (or anything else) fails partway, the students already submitted are cancelled and the
+    # worker threads are always released
+    try:
+        for record in records:
+            if record.student_name in first_lines:
+                if on_error is not None:
+                    on_error(StudentListError(record.line_number, f"{record.student_name} is already listed on line "
+                                                                  f"{first_lines[record.student_name]}"))
+                continue
+
+            first_lines[record.student_name] = record.line_number
+            assessment_run.expect()
+            assessment_scheduler.submit(record.student_name, assessment_stages(record.student_name, record.grades,
+                                                                               record.text, options))
+            record_events(block=False)
+
+        assessment_run.close()
+        record_events(block=True)
+    except BaseException:
+        assessment_scheduler.cancel()
+        raise
+    finally:
+        assessment_scheduler.shutdown()
+    return assessment_run
+
+
+CSV_HEADER = ['display_name', 'username', 'overall_score', 'instagram_score', 'grades_score', 'text_score',
+              'instagram_results', 'grade_results', 'text_content']
+
+
+def csv_row(result) -> tuple:
+    # result is the tuple returned by run_basic_health_assessment
+    return (result[0], result[1], result[2], result[3].overall_health_score, result[4].overall_health_score,
+            result[5].overall_health_score, result[3].results, result[4].results, result[5].student_text)
@@ -0,0 +1,231 @@
+import asyncio
+import dataclasses
+import datetime
+import json
+import threading
+import urllib.parse
+
+import aiohttp
+import cv2
+import instaloader
+import numpy as np
+
+import image_features
+
+INSTAGRAM_HOST = "www.instagram.com"
+POST_LIMIT = 20
+
+
+@dataclasses.dataclass
+class ScanOptions:
+    image_text: bool = False
+    image_brightness: bool = False
+
+
+@dataclasses.dataclass
+class InstagramPost:
+    caption: str | None
+    date: datetime.datetime
+    url: str
+    shortcode: str = ""
+    caption_score: float | None = None
+    image: bytes | None = None
+    pixels: np.ndarray | None = None
+    features: np.ndarray | None = None  # See image_features
+
+    def needs_text_scan(self, options: ScanOptions) -> bool:
+        # Text is only scanned from captioned images when the caption doesn't say much either way
+        return options.image_text and (self.caption is None or -0.2 < self.caption_score < 0.2)
+
+    def needs_features(self, options: ScanOptions) -> bool:
+        # Only captioned posts are scored on brightness
+        return options.image_brightness and self.caption is not None
+
+    def needs_image(self, options: ScanOptions) -> bool:
+        # Posts without a caption are skipped unless the text in their image is scanned
+        if self.caption is None:
+            return options.image_text
+
+        return options.image_brightness or self.needs_text_scan(options)
+
+
+@dataclasses.dataclass
+class InstagramProfile:
+    username: str
+    biography: str = ""
+    posts: list[InstagramPost] = dataclasses.field(default_factory=list)
+    error: Exception | None = None
+
+
+def decode_post_images(profile: InstagramProfile, options: ScanOptions = None) -> InstagramProfile:
+    # Decode every downloaded image exactly once. Only images whose text will be scanned are decoded at full size;
+    # with options, image features are worked out too, from a reduced decode when the full image isn't needed.
+    # Without options, every image is decoded in full.
+    for post in profile.posts:
+        if post.image is None or post.pixels is not None or post.features is not None:
+            continue
+
+        if options is None or post.needs_text_scan(options):
+            post.pixels = cv2.imdecode(np.frombuffer(post.image, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if post.pixels is None:
+                raise ValueError(f"Could not decode the image at {post.url}")
+
+            if options is not None and post.needs_features(options):
+                post.features = image_features.image_features(image_features.reduce(post.pixels))
+        elif post.needs_features(options):
+            reduced = image_features.decode_reduced(post.image)
+            if reduced is None:
+                raise ValueError(f"Could not decode the image at {post.url}")
+
+            post.features = image_features.image_features(reduced)
+
+        post.image = None  # The compressed bytes aren't needed once decoded
+
+    return profile
+
+
+class InstagramFetchEngine:
+    # Fetches profiles and post images on a private asyncio loop. Image downloads share one keep-alive aiohttp
+    # session, and every host gets its own concurrency limit. Instaloader is blocking and keeps its own pooled
+    # requests session, so profile lookups run in a thread but still count against the instagram.com limit.
+    #
+    # load_instagram_bot returns the Instaloader to use, and is only called once a real profile is looked up.
+    #
+    # With stub_url set, profiles and images come from an instagram_stub server instead, for offline tests and
+    # benchmarks.
+    #
+    # With a ProfileCache, listings are only read down to the newest post already cached and the rest of the
+    # profile comes from the cache.
+    def __init__(self, load_instagram_bot=None, stub_url: str = None, connections: int = 32,
+                 connections_per_host: int = 8, post_limit: int = POST_LIMIT, cache=None):
+        self.load_instagram_bot = load_instagram_bot
+        self.stub_url = stub_url.rstrip("/") if stub_url else None
+        self.cache = cache
+        self.connections = connections
+        self.connections_per_host = connections_per_host
+        self.post_limit = post_limit
+
+        self._session = None
+        self._host_limits = {}
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="instagram-fetch", daemon=True)
+        self._thread.start()
+
+    def _run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    # Blocking entry points for worker threads
+
+    def fetch_profile(self, username: str) -> InstagramProfile:
+        return self._run(self.fetch_profile_async(username))
+
+    def fetch_images(self, profile: InstagramProfile, needs_image) -> InstagramProfile:
+        return self._run(self.fetch_images_async(profile, needs_image))
+
+    def fetch_all(self, usernames, needs_image) -> list[InstagramProfile]:
+        return self._run(self.fetch_all_async(usernames, needs_image))
+
+    def close(self):
+        if self._session is not None:
+            self._run(self._session.close())
+
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    # Coroutines, run on the engine's loop
+
+    def _session_for_loop(self) -> aiohttp.ClientSession:
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.connections, limit_per_host=self.connections_per_host)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=60))
+
+        return self._session
+
+    def _host_limit(self, host: str) -> asyncio.Semaphore:
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.connections_per_host)
+
+        return self._host_limits[host]
+
+    async def _get(self, url: str) -> bytes:
+        session = self._session_for_loop()
+
+        async with self._host_limit(urllib.parse.urlsplit(url).netloc):
+            async with session.get(url) as response:
+                response.raise_for_status()
+                return await response.read()
+
+    def _merge_with_cache(self, username: str, biography: str, listing) -> InstagramProfile:
+        # listing yields (post, is_pinned) newest first, apart from pinned posts which Instagram always lists first
+        cached = self.cache.load(username) if self.cache is not None else None
+        high_water_mark = max((post.date for post in cached.posts), default=None) if cached is not None else None
+
+        posts = []
+        for post, is_pinned in listing:
+            if len(posts) == self.post_limit:
+                break
+            if high_water_mark is not None and not is_pinned and post.date <= high_water_mark:
+                break
+            posts.append(post)
+
+        if cached is not None:
+            shortcodes = {post.shortcode for post in posts}
+            posts += [post for post in cached.posts if post.shortcode not in shortcodes]
+
+        profile = InstagramProfile(username, biography, posts[:self.post_limit])
+
+        if self.cache is not None:
+            self.cache.store(profile, full_fetch=cached is None)
+
+        return profile
+
+    def _load_profile(self, username: str) -> InstagramProfile:
+        profile = instaloader.Profile.from_username(self.load_instagram_bot().context, username)
+        listing = ((InstagramPost(post.caption, post.date_utc, post.url, post.shortcode),
+                    getattr(post, "is_pinned", False)) for post in profile.get_posts())
+
+        return self._merge_with_cache(username, profile.biography, listing)
+
+    async def _load_stub_profile(self, username: str) -> InstagramProfile:
+        profile_url = f"{self.stub_url}/profiles/{urllib.parse.quote(username)}.json"
+        data = json.loads(await self._get(profile_url))
+
+        listing = ((InstagramPost(post["caption"], datetime.datetime.fromisoformat(post["date"]),
+                                  urllib.parse.urljoin(profile_url, post["url"]), post.get("shortcode", "")),
+                    post.get("pinned", False)) for post in data["posts"])
+
+        return await asyncio.to_thread(self._merge_with_cache, username, data["biography"], listing)
+
+    async def fetch_profile_async(self, username: str) -> InstagramProfile:
+        try:
+            if self.stub_url is not None:
+                return await self._load_stub_profile(username)
+
+            async with self._host_limit(INSTAGRAM_HOST):
+                return await asyncio.to_thread(self._load_profile, username)
+        except Exception as error:
+            return InstagramProfile(username, error=error)
+
+    async def fetch_images_async(self, profile: InstagramProfile, needs_image) -> InstagramProfile:
+        if profile.error is not None:
+            return profile
+
+        posts = [post for post in profile.posts if needs_image(post)]
+
+        try:
+            images = await asyncio.gather(*(self._get(post.url) for post in posts))
+        except Exception as error:
+            profile.error = error
+            return profile
+
+        for post, image in zip(posts, images):
+            post.image = image
+
+        return profile
+
+    async def fetch_all_async(self, usernames, needs_image) -> list[InstagramProfile]:
+        # Each profile's images start downloading as soon as its own listing arrives
+        async def fetch_one(username):
+            return await self.fetch_images_async(await self.fetch_profile_async(username), needs_image)
+
+        return await asyncio.gather(*(fetch_one(username) for username in usernames))
@@ -0,0 +1,99 @@
+import argparse
+import http.server
+import json
+import os
+import threading
+import time
+import urllib.parse
+
+# A local stand-in for Instagram, so the fetch engine can be tested and benchmarked offline. It serves a fixtures
+# directory laid out as:
+#
+#   profiles/<username>.json   {"biography": ..., "posts": [{"shortcode": ..., "caption": ...,
+#                                                           "date": ISO 8601, "url": ..., "pinned": false}]}
+#   images/<name>              post images, referenced from a profile as "../images/<name>"
+
+
+class StubRequestHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep connections alive like the real CDN
+
+    def do_GET(self):
+        fixtures_directory = self.server.fixtures_directory
+        path = urllib.parse.unquote(urllib.parse.urlsplit(self.path).path).lstrip("/")
+        file_path = os.path.realpath(os.path.join(fixtures_directory, path))
+
+        if not file_path.startswith(fixtures_directory + os.sep) or not os.path.isfile(file_path):
+            self.send_error(404)
+            return
+
+        with open(file_path, "rb") as file:
+            body = file.read()
+
+        if self.server.latency > 0:
+            time.sleep(self.server.latency)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json" if file_path.endswith(".json") else "image/jpeg")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, fixtures_directory: str, port: int = 0, latency: float = 0.0):
+        super().__init__(("127.0.0.1", port), StubRequestHandler)
+        self.fixtures_directory = os.path.realpath(fixtures_directory)
+        self.latency = latency
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self) -> "StubServer":
+        threading.Thread(target=self.serve_forever, name="instagram-stub", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def write_image(fixtures_directory: str, image_name: str, image: bytes) -> str:
+    os.makedirs(os.path.join(fixtures_directory, "images"), exist_ok=True)
+    with open(os.path.join(fixtures_directory, "images", image_name), "wb") as file:
+        file.write(image)
+
+    return image_name
+
+
+def write_profile(fixtures_directory: str, username: str, biography: str, posts: list):
+    # posts is a list of (caption, date, image) tuples. image is either the image's bytes or the name of an image
+    # already written with write_image, so large fixture sets can share a few image files between many posts.
+    os.makedirs(os.path.join(fixtures_directory, "profiles"), exist_ok=True)
+
+    post_data = []
+    for caption, date, image in posts:
+        shortcode = f"{username}_{date.strftime('%Y%m%d%H%M%S')}"
+        image_name = image if isinstance(image, str) else write_image(fixtures_directory, f"{shortcode}.jpg", image)
+        post_data.append({"shortcode": shortcode, "caption": caption, "date": date.isoformat(),
+                          "url": f"../images/{image_name}", "pinned": False})
+
+    with open(os.path.join(fixtures_directory, "profiles", f"{username}.json"), "w", encoding="utf-8") as file:
+        json.dump({"biography": biography, "posts": post_data}, file)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve Instagram fixtures for offline tests and benchmarks.")
+    parser.add_argument("fixtures_directory")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before every response")
+    arguments = parser.parse_args()
+
+    server = StubServer(arguments.fixtures_directory, arguments.port, arguments.latency)
+    print(f"Serving {arguments.fixtures_directory} at {server.url}")
+    server.serve_forever()
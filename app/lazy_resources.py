@@ -0,0 +1,53 @@
+import threading
+
+NOT_LOADED = "not loaded"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+class LazyResource:
+    # A model or client that is slow to create, built the first time get() is called or ahead of time by warm_up()
+    # on a background thread. Callers arriving while it loads wait for that load instead of starting another. If
+    # loading fails, the next get() tries again.
+    def __init__(self, name: str, load):
+        self.name = name
+        self.state = NOT_LOADED
+        self.error = None
+
+        self._load = load
+        self._value = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self.state == READY:
+            return self._value
+
+        with self._lock:
+            if self.state != READY:
+                self.state = LOADING
+                try:
+                    self._value = self._load()
+                except Exception as error:
+                    self.state = FAILED
+                    self.error = error
+                    raise
+
+                self.error = None
+                self.state = READY
+
+        return self._value
+
+    def warm_up(self) -> threading.Thread | None:
+        if self.state in (LOADING, READY):
+            return None
+
+        thread = threading.Thread(target=self._warm_up, name=f"warm-up-{self.name}", daemon=True)
+        thread.start()
+        return thread
+
+    def _warm_up(self):
+        try:
+            self.get()
+        except Exception:
+            pass  # Kept in self.error and raised again on the next get()
@@ -1,188 +1,37 @@
 import csv
-import dataclasses
-import datetime
-import itertools
+import json
+import queue
 import threading
 import customtkinter as ctk
 from customtkinter import *
 import speech_recognition as sr
 import tkinter as tk
-import urllib
-import urllib.request
 from tkinter import filedialog, messagebox
 
-import cv2
-import easyocr
-import instaloader
-import nltk
-import nltk.corpus
-import nltk.sentiment
-import nltk.tokenize
-import numpy as np
-
-sentiment_analyzer = nltk.sentiment.vader.SentimentIntensityAnalyzer()
-instagram_bot = instaloader.Instaloader()
-reader = easyocr.Reader(['en'])
-recognizer = sr.Recognizer()
+import assessment_cache
+import health_assessment
+import result_export
+import results_table
+import scheduler
+import student_list
+from assessment_cache import AssessmentCache
+from assessment_run import AssessmentRun
+from grade_store import CURRENT, PREVIOUS, GradeStore
+from health_assessment import assessment_stages, text_health_analysis
+from instagram_fetch import ScanOptions
+from lazy_resources import LazyResource
+from student_list import StudentListError
+
+recognizer = LazyResource("Speech", sr.Recognizer)
 splice_level = 3
 secondary_splicing = 10
+io_workers = scheduler.DEFAULT_IO_WORKERS  # Concurrent Instagram requests during a mass assessment
+cpu_workers = scheduler.DEFAULT_CPU_WORKERS  # Concurrent OCR and scoring jobs during a mass assessment
+text_save_delay = 500  # Milliseconds without typing before the student's text is saved
 
 
-def preprocess_text(text: str) -> str:
-    # Tokenization
-    tokens = nltk.tokenize.word_tokenize(text.lower())
-
-    # Stopwords
-    stopwords = nltk.corpus.stopwords.words('english')
-    tokens = [token for token in tokens if token not in stopwords]
-
-    # Lemmatize
-    lemmatizer = nltk.WordNetLemmatizer()
-    tokens = [lemmatizer.lemmatize(token) for token in tokens]
-
-    # Rejoin
-    final = ' '.join(tokens)
-
-    return final
-
-
-@dataclasses.dataclass
-class TextHealthAssessment:
-    student_text: str
-    overall_health_score: float
-
-
-def text_health_analysis(text: str) -> float:
-    analyzer_text = preprocess_text(text)
-
-    health_score = 0.0
-
-    # Concerning words
-    concerning_words = ['kill', 'die', 'death', 'hate', 'destroy', 'massacre',
-                        'slaughter', 'depression', 'depressed', 'sad', 'sadness', 'suicide', 'murder', 'hatred',
-                        'booze', 'drunk', 'beer', 'lie', 'liar', 'killer', 'murderer', 'bomb', 'shoot', 'bombing',
-                        'shooting', 'shooter']
-
-    # Highlight negative words, ignoring positive words
-    for word in analyzer_text.split(" "):
-        word_score = sentiment_analyzer.polarity_scores(word)
-        if word_score["neg"] == 1:
-            health_score += sentiment_analyzer.polarity_scores(word)["compound"] / 1.5
-
-        # Particularly concerning words get an additional penalty
-        if word in concerning_words:
-            health_score -= 0.5
-
-    # Incorporate the overall sentiment of the text as the most important factor
-    health_score += sentiment_analyzer.polarity_scores(analyzer_text)["compound"] * 3
-
-    return health_score
-
-
-@dataclasses.dataclass
-class InstagramHealthAssessment:
-    @dataclasses.dataclass
-    class AssessmentResult:
-        caption: str
-        date: datetime.datetime
-        health_score: float
-
-    overall_health_score: float
-    results: list[AssessmentResult]
-
-
-def instagram_health_assessment(username: str) -> InstagramHealthAssessment:
-    profile = instaloader.Profile.from_username(instagram_bot.context, username)
-
-    health_score = 0.0
-    results = []
-
-    # Bio
-    biography = profile.biography
-    health_score += text_health_analysis(biography)
-    results.append(InstagramHealthAssessment.AssessmentResult("(BIO) " + biography, datetime.datetime.now(),
-                                                              health_score))
-
-    # Posts
-    posts = profile.get_posts()
-
-    recency_factor = 1  # Decrease importance of older posts
-    for post in itertools.islice(posts, 0, 20):
-        if post.caption is not None:
-            full_text = post.caption
-            current_health_score = text_health_analysis(full_text)
-
-            if analyze_images.get() and -0.2 < current_health_score < 0.2:
-                text_recognition = reader.readtext(post.url, detail=0, paragraph=True)
-                full_text = " ".join(text_recognition) + " " + post.caption
-                current_health_score = text_health_analysis(full_text)
-                full_text = "<Scanned: " + " ".join(text_recognition) + "> " + post.caption
-
-            if analyze_brightness.get():
-                image_request = urllib.request.urlopen(post.url)
-                image_array = np.asarray(bytearray(image_request.read()), dtype=np.uint8)
-                image = cv2.imdecode(image_array, 0)
-                brightness_factor = (np.mean(image) - 100) / 255
-                current_health_score += brightness_factor
-                full_text = f"[Brightness: {round(brightness_factor, 3)}] " + full_text
-
-            results.append(
-                InstagramHealthAssessment.AssessmentResult(full_text, post.date_utc, current_health_score))
-            health_score += current_health_score * recency_factor
-        elif analyze_images.get():
-            text_recognition = reader.readtext(post.url, detail=0, paragraph=True)
-            full_text = " ".join(text_recognition)
-            current_health_score = text_health_analysis(full_text)
-            full_text = "<Scanned: " + full_text + ">"
-
-            results.append(
-                InstagramHealthAssessment.AssessmentResult(full_text, post.date_utc, current_health_score))
-            health_score += current_health_score * recency_factor
-
-        recency_factor /= 1.5 # older posts decreased in importance by a factor of 1.5
-
-    if len(results) == 0 or (len(results) == 1 and results[0].caption.strip() == "(BIO)"):
-        return InstagramHealthAssessment(0.0,
-                                         [InstagramHealthAssessment.AssessmentResult(
-                                             "(WARNING) No information found. You may need to sign in to a friend's account to view private posts.",
-                                             datetime.datetime.now(), 0.0)])
-
-    if len(results) == 1:
-        results[
-            0].caption += " (WARNING) No posts found. This account may have private posts that can only be seen if you log in using a friend's account."
-
-    NORMALIZATION_FACTOR = 4  # Approximately normalize the score to the same scale as the grades (-1 to 1).
-
-    return InstagramHealthAssessment(health_score / (1 + ((((2 / 3) ** (len(results) - 1)) - 1) / ((2 / 3) - 1))) /
-                                     NORMALIZATION_FACTOR,
-                                     results)  # Use the geometric series formula because of the weighted average.
-
-
-@dataclasses.dataclass
-class GradesHealthAssessment:
-    @dataclasses.dataclass
-    class AssessmentResult:
-        subject: str
-        change: float
-
-    overall_health_score: float
-    results: list[AssessmentResult]
-
-
-def grades_health_assessment(grades: list) -> GradesHealthAssessment:
-    health_score = 0.0
-    results = []
-
-    for subject in grades[1]:
-        if subject in grades[0]:
-            difference = grades[1][subject] - grades[0][subject]
-            results.append(GradesHealthAssessment.AssessmentResult(subject, difference))
-            health_score += difference
-
-    if len(results) == 0:
-        return GradesHealthAssessment(0.0, results)
-
-    return GradesHealthAssessment(health_score * 2.5 / len(results), results) # Drops in grades need to be multiplied by 2 to highlight them more
+def current_scan_options() -> ScanOptions:
+    return ScanOptions(analyze_images.get(), analyze_brightness.get())
 
 
 root = CTk()
@@ -192,9 +41,13 @@ root.geometry("1400x700")
 root.minsize(1200, 600)
 
 student_names = set()
-student_grades = {}
+student_grades = GradeStore()
 student_texts = {}
-assessment_results = []
+active_assessments = {}
+previous_assessments = AssessmentCache()  # Reused by the next run for anything that hasn't changed
+student_editor_visible = True  # Until the setup below hides it
+edited_student = None  # The student whose text is in text_input
+text_save_job = None
 
 analyze_brightness = tk.BooleanVar()
 analyze_images = tk.BooleanVar()
@@ -207,32 +60,41 @@ name_entry.grid(row=0, column=1, padx=10, pady=5, sticky="ew")
 students_listbox = tk.Listbox(root, exportselection=0)
 students_listbox.grid(row=1, column=0, columnspan=2, padx=10, pady=5, sticky="nsew")
 
-def add_student():
-    user_input = name_entry.get()
-
-    try:
-        real_name, username = user_input.split("@")
-        real_name = real_name.strip()
-        username = username.strip().lower()
-    except:
-        real_name = ""
-        username = user_input.strip().lower()
-
-    student_name = f"{real_name}@{username}"
-
-    if student_name == "" or student_name == "@":
-        messagebox.showwarning("Empty field.", "Please enter a name/account.")
+def show_student_editor():
+    # Only switches the editor's widgets on when it was hidden, so handlers can call this freely
+    global student_editor_visible
+    if student_editor_visible:
         return
 
-    student_names.add(student_name)
-    student_grades[student_name] = [{}, {}]
-    student_texts[student_name] = ""
-
-    students_listbox.delete(0, tk.END)
-    for student_name in student_names:
-        students_listbox.insert(tk.END, student_name)
-
-    name_entry.delete(0, tk.END)
+    text_input.configure(state=tk.NORMAL)
+    previous_grades_entry.configure(state=tk.NORMAL)
+    current_grades_entry.configure(state=tk.NORMAL)
+    previous_grades_add_button.configure(state=tk.NORMAL)
+    current_grades_add_button.configure(state=tk.NORMAL)
+
+    text_input_label.grid()
+    text_input.grid()
+    previous_grades_entry_label.grid()
+    previous_grades_entry.grid()
+    previous_grades_add_button.grid()
+    previous_grades_listbox_label.grid()
+    previous_grades_listbox.grid()
+    previous_grades_clear_button.grid()
+    current_grades_entry_label.grid()
+    current_grades_entry.grid()
+    current_grades_add_button.grid()
+    current_grades_listbox_label.grid()
+    current_grades_listbox.grid()
+    current_grades_clear_button.grid()
+
+    student_editor_visible = True
+
+def hide_student_editor():
+    global student_editor_visible, edited_student
+    save_student_text()
+    edited_student = None
+    if not student_editor_visible:
+        return
 
     previous_grades_listbox.delete(0, tk.END)
     current_grades_listbox.delete(0, tk.END)
@@ -259,12 +121,64 @@ def add_student():
     current_grades_listbox.grid_remove()
     current_grades_clear_button.grid_remove()
 
+    student_editor_visible = False
+
+def schedule_text_save():
+    # Typing only restarts the timer; the text is copied out once typing pauses
+    global text_save_job
+    if text_save_job is not None:
+        root.after_cancel(text_save_job)
+
+    text_save_job = root.after(text_save_delay, save_student_text)
+
+def save_student_text():
+    # Saves any edits still waiting on the timer. Called before anything reads student_texts or text_input moves to
+    # another student.
+    global text_save_job
+    if text_save_job is None:
+        return
+
+    root.after_cancel(text_save_job)
+    text_save_job = None
+    if edited_student in student_names:
+        student_texts[edited_student] = text_input.get("1.0", tk.END).strip()
+
+def add_student():
+    user_input = name_entry.get()
+
+    try:
+        real_name, username = user_input.split("@")
+        real_name = real_name.strip()
+        username = username.strip().lower()
+    except:
+        real_name = ""
+        username = user_input.strip().lower()
+
+    student_name = f"{real_name}@{username}"
+
+    if student_name == "" or student_name == "@":
+        messagebox.showwarning("Empty field.", "Please enter a name/account.")
+        return
+
+    student_names.add(student_name)
+    student_grades.set_grades(student_name, [{}, {}])
+    student_texts[student_name] = ""
+
+    students_listbox.delete(0, tk.END)
+    for student_name in student_names:
+        students_listbox.insert(tk.END, student_name)
+
+    name_entry.delete(0, tk.END)
+
+    hide_student_editor()
+
 def remove_student():
     selected_index = students_listbox.curselection()
     if selected_index:
         student_names.remove(students_listbox.get(selected_index))
-        student_grades.pop(students_listbox.get(selected_index), None)
+        student_grades.remove(students_listbox.get(selected_index))
         student_texts.pop(students_listbox.get(selected_index), None)
+        previous_assessments.forget(students_listbox.get(selected_index))
 
         students_listbox.delete(0, tk.END)
         for student_name in student_names:
@@ -272,61 +186,16 @@ def remove_student():
     else:
         messagebox.showwarning("Nothing selected.", "Please select a student to remove.")
 
-    previous_grades_listbox.delete(0, tk.END)
-    current_grades_listbox.delete(0, tk.END)
-    text_input.delete("1.0", tk.END)
-
-    text_input.configure(state=tk.DISABLED)
-    previous_grades_entry.configure(state=tk.DISABLED)
-    current_grades_entry.configure(state=tk.DISABLED)
-    previous_grades_add_button.configure(state=tk.DISABLED)
-    current_grades_add_button.configure(state=tk.DISABLED)
-
-    text_input_label.grid_remove()
-    text_input.grid_remove()
-    previous_grades_entry_label.grid_remove()
-    previous_grades_entry.grid_remove()
-    previous_grades_add_button.grid_remove()
-    previous_grades_listbox_label.grid_remove()
-    previous_grades_listbox.grid_remove()
-    previous_grades_clear_button.grid_remove()
-    current_grades_entry_label.grid_remove()
-    current_grades_entry.grid_remove()
-    current_grades_add_button.grid_remove()
-    current_grades_listbox_label.grid_remove()
-    current_grades_listbox.grid_remove()
-    current_grades_clear_button.grid_remove()
+    hide_student_editor()
 
 def clear_students():
     student_names.clear()
     student_grades.clear()
     student_texts.clear()
+    previous_assessments.clear()
 
     students_listbox.delete(0, tk.END)
-    previous_grades_listbox.delete(0, tk.END)
-    current_grades_listbox.delete(0, tk.END)
-    text_input.delete("1.0", tk.END)
-
-    text_input.configure(state=tk.DISABLED)
-    previous_grades_entry.configure(state=tk.DISABLED)
-    current_grades_entry.configure(state=tk.DISABLED)
-    previous_grades_add_button.configure(state=tk.DISABLED)
-    current_grades_add_button.configure(state=tk.DISABLED)
-
-    text_input_label.grid_remove()
-    text_input.grid_remove()
-    previous_grades_entry_label.grid_remove()
-    previous_grades_entry.grid_remove()
-    previous_grades_add_button.grid_remove()
-    previous_grades_listbox_label.grid_remove()
-    previous_grades_listbox.grid_remove()
-    previous_grades_clear_button.grid_remove()
-    current_grades_entry_label.grid_remove()
-    current_grades_entry.grid_remove()
-    current_grades_add_button.grid_remove()
-    current_grades_listbox_label.grid_remove()
-    current_grades_listbox.grid_remove()
-    current_grades_clear_button.grid_remove()
+    hide_student_editor()
 
 def import_list():
     list_file = filedialog.askopenfilename(defaultextension=".txt", filetypes=[("Text Files", "*.txt")])
@@ -336,181 +205,37 @@ def import_list():
         messagebox.showwarning("Invalid file.", "File could not be loaded.")
         return
 
+    save_student_text()  # Before the imported texts, so they aren't overwritten
+
+    errors = []
+    new_names = []
+    first_lines = {}
     with file:
-        for line in file:
-            if line.strip() == "":
+        for record in student_list.read_student_list(file, errors.append):
+            # As with the command line, only the first listing of a student in the file is used
+            if record.student_name in first_lines:
+                errors.append(StudentListError(record.line_number, f"{record.student_name} is already listed on "
+                                                                   f"line {first_lines[record.student_name]}"))
                 continue
+            first_lines[record.student_name] = record.line_number
 
-            try:
-                student_name_unformatted, grades, text = line.split(":")
-
-                try:
-                    real_name, username = student_name_unformatted.split("@")
-                    real_name = real_name.strip()
-                    username = username.strip().lower()
-                except:
-                    real_name = ""
-                    username = student_name_unformatted.strip().lower()
-
-                student_name = f"{real_name}@{username}"
-
-                if student_name == "" or student_name == "@":
-                    continue
-
-                student_names.add(student_name)
-
-                try:
-                    student_grades[student_name] = [{}, {}]
-                    previous, current = grades.split(";")
-                    for subject in previous.split(","):
-                        subject, grade = subject.split("=")
-                        student_grades[student_name][0][subject.strip().lower()] = float(
-                            grade.strip()) / 100
-                    for subject in current.split(","):
-                        subject, grade = subject.split("=")
-                        student_grades[student_name][1][subject.strip().lower()] = float(
-                            grade.strip()) / 100
-                except:
-                    student_grades[student_name] = [{}, {}]
-
-                student_texts[student_name] = text.strip()
-            except:
-                try:
-                    student_name_unformatted, grades = line.split(":")
-
-                    try:
-                        real_name, username = student_name_unformatted.split("@")
-                        real_name = real_name.strip()
-                        username = username.strip().lower()
-                    except:
-                        real_name = ""
-                        username = student_name_unformatted.strip().lower()
-
-                    student_name = f"{real_name}@{username}"
-
-                    if student_name == "" or student_name == "@":
-                        continue
-
-                    student_names.add(student_name)
-
-                    try:
-                        student_grades[student_name] = [{}, {}]
-                        previous, current = grades.split(";")
-                        for subject in previous.split(","):
-                            subject, grade = subject.split("=")
-                            student_grades[student_name][0][subject.strip().lower()] = float(
-                                grade.strip()) / 100
-                        for subject in current.split(","):
-                            subject, grade = subject.split("=")
-                            student_grades[student_name][1][subject.strip().lower()] = float(
-                                grade.strip()) / 100
-                    except:
-                        student_grades[student_name] = [{}, {}]
-
-                    student_texts[student_name] = ""
-
-                except:
-                    student_name_unformatted = line.strip()
-
-                    try:
-                        real_name, username = student_name_unformatted.split("@")
-                        real_name = real_name.strip()
-                        username = username.strip().lower()
-                    except:
-                        real_name = ""
-                        username = student_name_unformatted.strip().lower()
-
-                    student_name = f"{real_name}@{username}"
-
-                    if student_name == "" or student_name == "@":
-                        continue
-
-                    student_names.add(student_name)
-                    student_grades[student_name] = [{}, {}]
-                    student_texts[student_name] = ""
-
-    students_listbox.delete(0, tk.END)
-    for user in student_names:
-        students_listbox.insert(tk.END, user)
-
-    previous_grades_listbox.delete(0, tk.END)
-    current_grades_listbox.delete(0, tk.END)
-    text_input.delete("1.0", tk.END)
-
-    text_input.configure(state=tk.DISABLED)
-    previous_grades_entry.configure(state=tk.DISABLED)
-    current_grades_entry.configure(state=tk.DISABLED)
-    previous_grades_add_button.configure(state=tk.DISABLED)
-    current_grades_add_button.configure(state=tk.DISABLED)
-
-    text_input_label.grid_remove()
-    text_input.grid_remove()
-    previous_grades_entry_label.grid_remove()
-    previous_grades_entry.grid_remove()
-    previous_grades_add_button.grid_remove()
-    previous_grades_listbox_label.grid_remove()
-    previous_grades_listbox.grid_remove()
-    previous_grades_clear_button.grid_remove()
-    current_grades_entry_label.grid_remove()
-    current_grades_entry.grid_remove()
-    current_grades_add_button.grid_remove()
-    current_grades_listbox_label.grid_remove()
-    current_grades_listbox.grid_remove()
-    current_grades_clear_button.grid_remove()
+            if record.student_name not in student_names:
+                student_names.add(record.student_name)
+                new_names.append(record.student_name)
+            student_grades.set_grades(record.student_name, record.grades)
+            student_texts[record.student_name] = record.text
 
-def update_text():
-    selected_index = students_listbox.curselection()
-    if selected_index:
-        text_input.configure(state=tk.NORMAL)
-        previous_grades_entry.configure(state=tk.NORMAL)
-        current_grades_entry.configure(state=tk.NORMAL)
-        previous_grades_add_button.configure(state=tk.NORMAL)
-        current_grades_add_button.configure(state=tk.NORMAL)
-
-        text_input_label.grid()
-        text_input.grid()
-        previous_grades_entry_label.grid()
-        previous_grades_entry.grid()
-        previous_grades_add_button.grid()
-        previous_grades_listbox_label.grid()
-        previous_grades_listbox.grid()
-        previous_grades_clear_button.grid()
-        current_grades_entry_label.grid()
-        current_grades_entry.grid()
-        current_grades_add_button.grid()
-        current_grades_listbox_label.grid()
-        current_grades_listbox.grid()
-        current_grades_clear_button.grid()
+    # Students already in the list keep their place, so only the new ones need adding
+    if len(new_names) > 0:
+        students_listbox.insert(tk.END, *new_names)
 
-        selected_user = students_listbox.get(selected_index)
-        student_texts[selected_user] = text_input.get("1.0", tk.END).strip()
-    else:
-        previous_grades_listbox.delete(0, tk.END)
-        current_grades_listbox.delete(0, tk.END)
-        text_input.delete("1.0", tk.END)
+    if len(errors) > 0:
+        shown_errors = "\n".join(str(error) for error in errors[:10])
+        more_errors = f"\n...and {len(errors) - 10} more." if len(errors) > 10 else ""
+        messagebox.showwarning("Problems in the list.",
+                               f"Some lines could not be read completely or were skipped:\n{shown_errors}{more_errors}")
 
-        text_input.configure(state=tk.DISABLED)
-        previous_grades_entry.configure(state=tk.DISABLED)
-        current_grades_entry.configure(state=tk.DISABLED)
-        previous_grades_add_button.configure(state=tk.DISABLED)
-        current_grades_add_button.configure(state=tk.DISABLED)
-
-        text_input_label.grid_remove()
-        text_input.grid_remove()
-        previous_grades_entry_label.grid_remove()
-        previous_grades_entry.grid_remove()
-        previous_grades_add_button.grid_remove()
-        previous_grades_listbox_label.grid_remove()
-        previous_grades_listbox.grid_remove()
-        previous_grades_clear_button.grid_remove()
-        current_grades_entry_label.grid_remove()
-        current_grades_entry.grid_remove()
-        current_grades_add_button.grid_remove()
-        current_grades_listbox_label.grid_remove()
-        current_grades_listbox.grid_remove()
-        current_grades_clear_button.grid_remove()
-        
-        messagebox.showwarning("No student selected.", "Please select a student.")
+    hide_student_editor()
 
 name_entry.bind("<Return>", (lambda _: add_student()))
 
@@ -525,7 +250,8 @@ text_input_label.grid(row=0, column=4, padx=10, pady=5, sticky="nw")
 
 text_input = ctk.CTkTextbox(root)
 text_input.grid(row=1, column=4, padx=10, pady=5, sticky="nesw")
-text_input.bind("<KeyRelease>", (lambda _: update_text()))
+text_input.bind("<KeyRelease>", (lambda _: schedule_text_save()))
+text_input.bind("<FocusOut>", (lambda _: save_student_text()))
 
 remove_instagram_user_button = ctk.CTkButton(root, text="Remove Student",
                                          height=50,command=remove_student)
@@ -548,45 +274,22 @@ current_grades_listbox = tk.Listbox(root)
 current_grades_listbox.grid(row=3, column=4, padx=10, pady=5, sticky="nsew")
 
 def update_user_info():
+    global edited_student
     selected_index = students_listbox.curselection()
     if selected_index:
-        text_input.configure(state=tk.NORMAL)
-        previous_grades_entry.configure(state=tk.NORMAL)
-        current_grades_entry.configure(state=tk.NORMAL)
-        previous_grades_add_button.configure(state=tk.NORMAL)
-        current_grades_add_button.configure(state=tk.NORMAL)
-
-        text_input_label.grid()
-        text_input.grid()
-        previous_grades_entry_label.grid()
-        previous_grades_entry.grid()
-        previous_grades_add_button.grid()
-        previous_grades_listbox_label.grid()
-        previous_grades_listbox.grid()
-        previous_grades_clear_button.grid()
-        current_grades_entry_label.grid()
-        current_grades_entry.grid()
-        current_grades_add_button.grid()
-        current_grades_listbox_label.grid()
-        current_grades_listbox.grid()
-        current_grades_clear_button.grid()
+        save_student_text()
+        show_student_editor()
 
         selected_user = students_listbox.get(selected_index)
+        edited_student = selected_user
         previous_grades_listbox.delete(0, tk.END)
         current_grades_listbox.delete(0, tk.END)
         text_input.delete("1.0", tk.END)
 
-        try:
-            for subject in student_grades[selected_user][0]:
-                previous_grades_listbox.insert(tk.END,
-                                                    f"{subject}: {round(student_grades[selected_user][0][subject] * 100, 3)}%")
-            for subject in student_grades[selected_user][1]:
-                current_grades_listbox.insert(tk.END,
-                                                   f"{subject}: {round(student_grades[selected_user][1][subject] * 100, 3)}%")
-        except:
-            student_grades[selected_user] = [{}, {}]
-            previous_grades_listbox.delete(0, tk.END)
-            current_grades_listbox.delete(0, tk.END)
+        for subject, grade in student_grades.term_grades(selected_user, PREVIOUS).items():
+            previous_grades_listbox.insert(tk.END, f"{subject}: {round(grade * 100, 3)}%")
+        for subject, grade in student_grades.term_grades(selected_user, CURRENT).items():
+            current_grades_listbox.insert(tk.END, f"{subject}: {round(grade * 100, 3)}%")
 
         try:
             text_input.insert(tk.END, student_texts[selected_user])
@@ -594,54 +297,12 @@ def update_user_info():
             student_texts[selected_user] = ""
             text_input.delete("1.0", tk.END)
     else:
-        previous_grades_listbox.delete(0, tk.END)
-        current_grades_listbox.delete(0, tk.END)
-        text_input.delete("1.0", tk.END)
-
-        text_input.configure(state=tk.DISABLED)
-        previous_grades_entry.configure(state=tk.DISABLED)
-        current_grades_entry.configure(state=tk.DISABLED)
-        previous_grades_add_button.configure(state=tk.DISABLED)
-        current_grades_add_button.configure(state=tk.DISABLED)
-
-        text_input_label.grid_remove()
-        text_input.grid_remove()
-        previous_grades_entry_label.grid_remove()
-        previous_grades_entry.grid_remove()
-        previous_grades_add_button.grid_remove()
-        previous_grades_listbox_label.grid_remove()
-        previous_grades_listbox.grid_remove()
-        previous_grades_clear_button.grid_remove()
-        current_grades_entry_label.grid_remove()
-        current_grades_entry.grid_remove()
-        current_grades_add_button.grid_remove()
-        current_grades_listbox_label.grid_remove()
-        current_grades_listbox.grid_remove()
-        current_grades_clear_button.grid_remove()
+        hide_student_editor()
 
 def add_previous_grade():
     selected_index = students_listbox.curselection()
     if selected_index:
-        text_input.configure(state=tk.NORMAL)
-        previous_grades_entry.configure(state=tk.NORMAL)
-        current_grades_entry.configure(state=tk.NORMAL)
-        previous_grades_add_button.configure(state=tk.NORMAL)
-        current_grades_add_button.configure(state=tk.NORMAL)
-
-        text_input_label.grid()
-        text_input.grid()
-        previous_grades_entry_label.grid()
-        previous_grades_entry.grid()
-        previous_grades_add_button.grid()
-        previous_grades_listbox_label.grid()
-        previous_grades_listbox.grid()
-        previous_grades_clear_button.grid()
-        current_grades_entry_label.grid()
-        current_grades_entry.grid()
-        current_grades_add_button.grid()
-        current_grades_listbox_label.grid()
-        current_grades_listbox.grid()
-        current_grades_clear_button.grid()
+        show_student_editor()
 
         selected_user = students_listbox.get(selected_index)
 
@@ -660,70 +321,27 @@ def add_previous_grade():
             if grade_value > 100 or grade_value < 0:
                 messagebox.showwarning("Invalid grade.", "Please enter a valid grade between 0 and 100.")
 
-            student_grades[selected_user][0][subject] = grade_value / 100
+            student_grades.set_grade(selected_user, PREVIOUS, subject, grade_value / 100)
         except:
             messagebox.showwarning("Invalid grade.",
                                    "Please enter a valid grade as a number without any special characters.")
             return
 
         previous_grades_listbox.delete(0, tk.END)
-        for subject in student_grades[selected_user][0]:
-            previous_grades_listbox.insert(tk.END,
-                                                f"{subject}: {round(student_grades[selected_user][0][subject] * 100, 3)}%")
+        for subject, grade in student_grades.term_grades(selected_user, PREVIOUS).items():
+            previous_grades_listbox.insert(tk.END, f"{subject}: {round(grade * 100, 3)}%")
 
         previous_grades_entry.delete(0, tk.END)
         previous_grades_entry.focus_set()
     else:
-        previous_grades_listbox.delete(0, tk.END)
-        current_grades_listbox.delete(0, tk.END)
-        text_input.delete("1.0", tk.END)
-
-        text_input.configure(state=tk.DISABLED)
-        previous_grades_entry.configure(state=tk.DISABLED)
-        current_grades_entry.configure(state=tk.DISABLED)
-        previous_grades_add_button.configure(state=tk.DISABLED)
-        current_grades_add_button.configure(state=tk.DISABLED)
-
-        text_input_label.grid_remove()
-        text_input.grid_remove()
-        previous_grades_entry_label.grid_remove()
-        previous_grades_entry.grid_remove()
-        previous_grades_add_button.grid_remove()
-        previous_grades_listbox_label.grid_remove()
-        previous_grades_listbox.grid_remove()
-        previous_grades_clear_button.grid_remove()
-        current_grades_entry_label.grid_remove()
-        current_grades_entry.grid_remove()
-        current_grades_add_button.grid_remove()
-        current_grades_listbox_label.grid_remove()
-        current_grades_listbox.grid_remove()
-        current_grades_clear_button.grid_remove()
+        hide_student_editor()
         
         messagebox.showwarning("No student selected.", "Please select a student.")
 
 def add_current_grade():
     selected_index = students_listbox.curselection()
     if selected_index:
-        text_input.configure(state=tk.NORMAL)
-        previous_grades_entry.configure(state=tk.NORMAL)
-        current_grades_entry.configure(state=tk.NORMAL)
-        previous_grades_add_button.configure(state=tk.NORMAL)
-        current_grades_add_button.configure(state=tk.NORMAL)
-
-        text_input_label.grid()
-        text_input.grid()
-        previous_grades_entry_label.grid()
-        previous_grades_entry.grid()
-        previous_grades_add_button.grid()
-        previous_grades_listbox_label.grid()
-        previous_grades_listbox.grid()
-        previous_grades_clear_button.grid()
-        current_grades_entry_label.grid()
-        current_grades_entry.grid()
-        current_grades_add_button.grid()
-        current_grades_listbox_label.grid()
-        current_grades_listbox.grid()
-        current_grades_clear_button.grid()
+        show_student_editor()
 
         selected_user = students_listbox.get(selected_index)
 
@@ -737,154 +355,46 @@ def add_current_grade():
         grade = grade.strip()
 
         try:
-            student_grades[selected_user][1][subject] = float(grade) / 100
+            student_grades.set_grade(selected_user, CURRENT, subject, float(grade) / 100)
         except:
             messagebox.showwarning("Invalid grade.",
                                    "Please enter a valid grade as a number without any special characters.")
             return
 
         current_grades_listbox.delete(0, tk.END)
-        for subject in student_grades[selected_user][1]:
-            current_grades_listbox.insert(tk.END,
-                                               f"{subject}: {round(student_grades[selected_user][1][subject] * 100, 3)}%")
+        for subject, grade in student_grades.term_grades(selected_user, CURRENT).items():
+            current_grades_listbox.insert(tk.END, f"{subject}: {round(grade * 100, 3)}%")
 
         current_grades_entry.delete(0, tk.END)
         current_grades_entry.focus_set()
     else:
-        previous_grades_listbox.delete(0, tk.END)
-        current_grades_listbox.delete(0, tk.END)
-        text_input.delete("1.0", tk.END)
-
-        text_input.configure(state=tk.DISABLED)
-        previous_grades_entry.configure(state=tk.DISABLED)
-        current_grades_entry.configure(state=tk.DISABLED)
-        previous_grades_add_button.configure(state=tk.DISABLED)
-        current_grades_add_button.configure(state=tk.DISABLED)
-
-        text_input_label.grid_remove()
-        text_input.grid_remove()
-        previous_grades_entry_label.grid_remove()
-        previous_grades_entry.grid_remove()
-        previous_grades_add_button.grid_remove()
-        previous_grades_listbox_label.grid_remove()
-        previous_grades_listbox.grid_remove()
-        previous_grades_clear_button.grid_remove()
-        current_grades_entry_label.grid_remove()
-        current_grades_entry.grid_remove()
-        current_grades_add_button.grid_remove()
-        current_grades_listbox_label.grid_remove()
-        current_grades_listbox.grid_remove()
-        current_grades_clear_button.grid_remove()
+        hide_student_editor()
 
         messagebox.showwarning("No student selected.", "Please select a student.")
 
 def clear_previous_grades():
     selected_index = students_listbox.curselection()
     if selected_index:
-        text_input.configure(state=tk.NORMAL)
-        previous_grades_entry.configure(state=tk.NORMAL)
-        current_grades_entry.configure(state=tk.NORMAL)
-        previous_grades_add_button.configure(state=tk.NORMAL)
-        current_grades_add_button.configure(state=tk.NORMAL)
-
-        text_input_label.grid()
-        text_input.grid()
-        previous_grades_entry_label.grid()
-        previous_grades_entry.grid()
-        previous_grades_add_button.grid()
-        previous_grades_listbox_label.grid()
-        previous_grades_listbox.grid()
-        previous_grades_clear_button.grid()
-        current_grades_entry_label.grid()
-        current_grades_entry.grid()
-        current_grades_add_button.grid()
-        current_grades_listbox_label.grid()
-        current_grades_listbox.grid()
-        current_grades_clear_button.grid()
+        show_student_editor()
 
         selected_user = students_listbox.get(selected_index)
-        student_grades[selected_user][0].clear()
+        student_grades.clear_term(selected_user, PREVIOUS)
         previous_grades_listbox.delete(0, tk.END)
     else:
-        previous_grades_listbox.delete(0, tk.END)
-        current_grades_listbox.delete(0, tk.END)
-        text_input.delete("1.0", tk.END)
-
-        text_input.configure(state=tk.DISABLED)
-        previous_grades_entry.configure(state=tk.DISABLED)
-        current_grades_entry.configure(state=tk.DISABLED)
-        previous_grades_add_button.configure(state=tk.DISABLED)
-        current_grades_add_button.configure(state=tk.DISABLED)
-
-        text_input_label.grid_remove()
-        text_input.grid_remove()
-        previous_grades_entry_label.grid_remove()
-        previous_grades_entry.grid_remove()
-        previous_grades_add_button.grid_remove()
-        previous_grades_listbox_label.grid_remove()
-        previous_grades_listbox.grid_remove()
-        previous_grades_clear_button.grid_remove()
-        current_grades_entry_label.grid_remove()
-        current_grades_entry.grid_remove()
-        current_grades_add_button.grid_remove()
-        current_grades_listbox_label.grid_remove()
-        current_grades_listbox.grid_remove()
-        current_grades_clear_button.grid_remove()
+        hide_student_editor()
 
         messagebox.showwarning("No student selected.", "Please select a student.")
 
 def clear_current_grades():
     selected_index = students_listbox.curselection()
     if selected_index:
-        text_input.configure(state=tk.NORMAL)
-        previous_grades_entry.configure(state=tk.NORMAL)
-        current_grades_entry.configure(state=tk.NORMAL)
-        previous_grades_add_button.configure(state=tk.NORMAL)
-        current_grades_add_button.configure(state=tk.NORMAL)
-
-        text_input_label.grid()
-        text_input.grid()
-        previous_grades_entry_label.grid()
-        previous_grades_entry.grid()
-        previous_grades_add_button.grid()
-        previous_grades_listbox_label.grid()
-        previous_grades_listbox.grid()
-        previous_grades_clear_button.grid()
-        current_grades_entry_label.grid()
-        current_grades_entry.grid()
-        current_grades_add_button.grid()
-        current_grades_listbox_label.grid()
-        current_grades_listbox.grid()
-        current_grades_clear_button.grid()
+        show_student_editor()
 
         selected_user = students_listbox.get(selected_index)
-        student_grades[selected_user][1].clear()
+        student_grades.clear_term(selected_user, CURRENT)
         current_grades_listbox.delete(0, tk.END)
     else:
-        previous_grades_listbox.delete(0, tk.END)
-        current_grades_listbox.delete(0, tk.END)
-        text_input.delete("1.0", tk.END)
-
-        text_input.configure(state=tk.DISABLED)
-        previous_grades_entry.configure(state=tk.DISABLED)
-        current_grades_entry.configure(state=tk.DISABLED)
-        previous_grades_add_button.configure(state=tk.DISABLED)
-        current_grades_add_button.configure(state=tk.DISABLED)
-
-        text_input_label.grid_remove()
-        text_input.grid_remove()
-        previous_grades_entry_label.grid_remove()
-        previous_grades_entry.grid_remove()
-        previous_grades_add_button.grid_remove()
-        previous_grades_listbox_label.grid_remove()
-        previous_grades_listbox.grid_remove()
-        previous_grades_clear_button.grid_remove()
-        current_grades_entry_label.grid_remove()
-        current_grades_entry.grid_remove()
-        current_grades_add_button.grid_remove()
-        current_grades_listbox_label.grid_remove()
-        current_grades_listbox.grid_remove()
-        current_grades_clear_button.grid_remove()
+        hide_student_editor()
 
         messagebox.showwarning("No student selected.", "Please select a student.")
 
@@ -924,7 +434,7 @@ instagram_password_label.grid(row=4, column=3, padx=10, pady=5, sticky="e")
 instagram_password_entry = ctk.CTkEntry(root, show="*")
 instagram_password_entry.grid(row=4, column=4, padx=10, pady=5, sticky="ew")
 
-def save_to_csv():
+def save_to_csv(assessment_results):
     location = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV Files",
                                                                                  "*.csv")])
 
@@ -936,238 +446,282 @@ def save_to_csv():
 
     with file:
         csv_out = csv.writer(file)
-        csv_out.writerow(['display_name', 'username', 'overall_score', 'instagram_score', 'grades_score', 'text_score',
-                          'instagram_results',
-                          'grade_results', 'text_content'])
+        csv_out.writerow(health_assessment.CSV_HEADER)
 
         for row in assessment_results:
-            csv_out.writerow((row[0], row[1], row[2], row[3].overall_health_score, row[4].overall_health_score,
-                              row[5].overall_health_score, row[3].results, row[4].results, row[5].student_text))
-
-def show_details(current_selection):
-    try:
-        selected_user = assessment_results[current_selection[0]]
-    except:
-        messagebox.showwarning("Nothing selected.", "Please select a student to see details.")
-        return
-
-    details_window = tk.Toplevel()
-    details_window.configure(bg = "gray12")
-    details_window.geometry("400x300")
-    if selected_user[0] == "":
-        details_window.title("Details")
-    else:
-        details_window.title(f"Details for {selected_user[0]}")
-
-    results_label = ctk.CTkLabel(details_window, text=f"Details for {selected_user[0]}")
-    results_label.pack(padx=10)
+            csv_out.writerow(health_assessment.csv_row(row))
 
-    mental_health_label = ctk.CTkLabel(details_window, text=f"Mental Health Score: {round(selected_user[2], 3)}")
-    mental_health_label.pack()
-
-    if selected_user[2] < -0.5:
-        mental_health_label.configure(text_color="red")
-    elif selected_user[2] < 0:
-        mental_health_label.configure(text_color="orange")
-    elif 0 < selected_user[2] <= 0.5:
-        mental_health_label.configure(text_color="yellow")
-    elif selected_user[2] > 0.5:
-        mental_health_label.configure(text_color="green")
-
-    if selected_user[1] != "":
-        instagram_score_label = ctk.CTkLabel(details_window,
-                                         text=f"Instagram Positivity Score: {round(selected_user[3].overall_health_score, 3)}")
-        instagram_score_label.pack(padx=10)
-        if selected_user[3].overall_health_score < -0.5:
-            instagram_score_label.configure(text_color="red")
-        elif selected_user[3].overall_health_score < 0:
-            instagram_score_label.configure(text_color="orange")
-        elif 0 < selected_user[3].overall_health_score <= 0.5:
-            instagram_score_label.configure(text_color="yellow")
-        elif selected_user[3].overall_health_score > 0.5:
-            instagram_score_label.configure(text_color="green")
-
-        instagram_results_listbox = tk.Listbox(details_window)
-        instagram_results_listbox.pack(padx=10, pady=5, fill=tk.BOTH, expand=True)
-        instagram_results_listbox.insert(tk.END,
-                                         f"{round(selected_user[3].results[0].health_score, 3)}: {selected_user[3].results[0].caption}")
-        if selected_user[3].results[0].health_score < -0.5:
-            instagram_results_listbox.itemconfig(tk.END, {'fg': 'red'})
-        elif selected_user[3].results[0].health_score < 0:
-            instagram_results_listbox.itemconfig(tk.END, {'fg': 'orange'})
-        elif 0 < selected_user[3].results[0].health_score <= 0.5:
-            instagram_results_listbox.itemconfig(tk.END, {'fg': 'yellow'})
-        elif selected_user[3].results[0].health_score > 0.5:
-            instagram_results_listbox.itemconfig(tk.END, {'fg': 'green'})
-
-        for result in itertools.islice(selected_user[3].results, 1, None):
-            instagram_results_listbox.insert(tk.END,
-                                             f"{round(result.health_score, 3)}: ({result.date.date()}) {result.caption}")
-            if result.health_score < -0.5:
-                instagram_results_listbox.itemconfig(tk.END, {'fg': 'red'})
-            elif result.health_score < 0:
-                instagram_results_listbox.itemconfig(tk.END, {'fg': 'orange'})
-            elif 0 < result.health_score <= 0.5:
-                instagram_results_listbox.itemconfig(tk.END, {'fg': 'yellow'})
-            elif result.health_score > 0.5:
-                instagram_results_listbox.itemconfig(tk.END, {'fg': 'green'})
-    else:
-        instagram_score_label = ctk.CTkLabel(details_window, text="No Instagram account provided.")
-        instagram_score_label.pack(padx=10, pady=5)
-
-    if len(selected_user[4].results) > 0:
-        grades_score_label = ctk.CTkLabel(details_window, text=f"Grade Improvement Score: "
-            f"{round(selected_user[4].overall_health_score, 3)}")
-        grades_score_label.pack(padx=10)
-        if selected_user[4].overall_health_score < -0.5:
-            grades_score_label.configure(text_color="red")
-        elif selected_user[4].overall_health_score < 0:
-            grades_score_label.configure(text_color="orange")
-        elif 0 < selected_user[4].overall_health_score <= 0.5:
-            grades_score_label.configure(text_color="yellow")
-        elif selected_user[4].overall_health_score > 0.5:
-            grades_score_label.configure(text_color="green")
-
-        grades_results_listbox = tk.Listbox(details_window)
-        grades_results_listbox.pack(padx=10, pady=5, fill=tk.BOTH, expand=True)
-        for result in selected_user[4].results:
-            grades_results_listbox.insert(tk.END, f"{result.subject}: {round(result.change, 3)}")
-            if result.change < -0.5:
-                grades_results_listbox.itemconfig(tk.END, {'fg': 'red'})
-            elif result.change < 0:
-                grades_results_listbox.itemconfig(tk.END, {'fg': 'orange'})
-            elif 0 < result.change <= 0.5:
-                grades_results_listbox.itemconfig(tk.END, {'fg': 'yellow'})
-            elif result.change > 0.5:
-                grades_results_listbox.itemconfig(tk.END, {'fg': 'green'})
-    else:
-        grades_score_label = ctk.CTkLabel(details_window, text="No grades could be compared.")
-        grades_score_label.pack(padx=10, pady=5)
-    
-    if selected_user[5].student_text != "":
-        text_score_label = ctk.CTkLabel(details_window, text=f"Text Health Score: "
-            f"{round(selected_user[5].overall_health_score, 3)}")
-        text_score_label.pack(padx=10)
-        if selected_user[5].overall_health_score < -0.5:
-            text_score_label.configure(text_color="red")
-        elif selected_user[5].overall_health_score < 0:
-            text_score_label.configure(text_color="orange")
-        elif 0 < selected_user[5].overall_health_score <= 0.5:
-            text_score_label.configure(text_color="yellow")
-        elif selected_user[5].overall_health_score > 0.5:
-            text_score_label.configure(text_color="green")
-
-        text_display_box = ctk.CTkTextbox(details_window)
-        text_display_box.pack(padx=10, fill=tk.BOTH, expand=True)
-        text_display_box.insert("1.0", selected_user[5].student_text)
-        text_display_box.configure(state=tk.DISABLED)
-    else:
-        text_score_label = ctk.CTkLabel(details_window, text="No text was provided.")
-        text_score_label.pack(padx=10, pady=5)
+def save_timings(timings):
+    location = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON Files", "*.json")])
 
-def run_basic_health_assessment(user_input, total_users):
     try:
-        real_name, username = user_input.split("@")
-        real_name = real_name.strip()
-        username = username.strip().lower()
+        file = open(location, "w", encoding="utf-8")
     except:
-        real_name = ""
-        username = user_input.strip().lower()
-
-    if real_name == "" and username == "":
-        display_name = ""
-    elif username == "":
-        display_name = real_name
-    else:
-        display_name = f"{real_name}@{username}"
+        messagebox.showwarning("Invalid file.", "Could not save file.")
+        return
 
-    if username != "":
-        try:
-            instagram_assessment_results = instagram_health_assessment(username)
-        except:
-            instagram_assessment_results = InstagramHealthAssessment(0.0, [
-                InstagramHealthAssessment.AssessmentResult(
-                    "(ERROR) No account found. Instagram may refuse to accept connections if you are not logged in.",
-                    datetime.datetime.now(),
-                    0.0)])
-    else:
-        instagram_assessment_results = InstagramHealthAssessment(0.0, [
-            InstagramHealthAssessment.AssessmentResult("(ERROR) No account entered.", datetime.datetime.now(),
-                                                       0.0)])
+    with file:
+        json.dump(timings, file, indent=2)
 
-    try:
-        grades_assessment_results = grades_health_assessment(student_grades[user_input])
-    except:
-        grades_assessment_results = GradesHealthAssessment(0.0, [])
+def export_tables(assessment_results, export_format):
+    directory = filedialog.askdirectory(mustexist=False)
+    if not directory:
+        return
 
     try:
-        text_to_score = student_texts[user_input]
-
-        if text_to_score != "":
-            text_assessment_results = TextHealthAssessment(text_to_score, text_health_analysis(text_to_score) / 4)
+        with result_export.ResultExporter(directory, export_format) as exporter:
+            for result in assessment_results:
+                exporter.write(result)
+    except ImportError:
+        messagebox.showwarning("Missing package.", "Exporting to Parquet needs pyarrow (pip install pyarrow).")
+    except OSError:
+        messagebox.showwarning("Invalid folder.", "Could not save the tables.")
+
+class DetailsWindow:
+    # The details of one student's results. The widgets are built once, with the window, and show() only refills
+    # them, so following the selection in the results table is cheap and keeps the window's size and position.
+    def __init__(self):
+        self.window = tk.Toplevel()
+        self.window.configure(bg = "gray12")
+        self.window.geometry("400x300")
+        self.window.title("Details")
+
+        self.results_label = ctk.CTkLabel(self.window, text="")
+        self.results_label.pack(padx=10)
+        self.mental_health_label = ctk.CTkLabel(self.window, text="")
+        self.mental_health_label.pack()
+        self.unscored_text_color = self.mental_health_label.cget("text_color")
+
+        self.instagram_score_label = ctk.CTkLabel(self.window, text="")
+        self.instagram_score_label.pack(padx=10)
+        self.instagram_results_listbox = tk.Listbox(self.window)
+        self.instagram_results_listbox.pack(padx=10, pady=5, fill=tk.BOTH, expand=True)
+
+        self.grades_score_label = ctk.CTkLabel(self.window, text="")
+        self.grades_score_label.pack(padx=10)
+        self.grades_results_listbox = tk.Listbox(self.window)
+        self.grades_results_listbox.pack(padx=10, pady=5, fill=tk.BOTH, expand=True)
+
+        self.text_score_label = ctk.CTkLabel(self.window, text="")
+        self.text_score_label.pack(padx=10)
+        self.text_display_box = ctk.CTkTextbox(self.window)
+        self.text_display_box.pack(padx=10, fill=tk.BOTH, expand=True)
+
+    def exists(self) -> bool:
+        return self.window.winfo_exists()
+
+    def _show_score(self, label, text: str, score: float = None):
+        # Without a score, the label is a message in the normal text colour
+        band = results_table.UNSCORED if score is None else results_table.score_band(score)
+        label.configure(text=text, text_color=self.unscored_text_color if band == results_table.UNSCORED
+                        else results_table.BAND_COLOURS[band])
+
+    @staticmethod
+    def _show_below(widget, label, shown: bool, **pack_options):
+        # Sections without results only keep their label; packing after the label keeps the sections in order
+        if shown:
+            widget.pack(after=label, padx=10, fill=tk.BOTH, expand=True, **pack_options)
         else:
-            text_assessment_results = TextHealthAssessment("", 0.0)
-    except:
-        text_assessment_results = TextHealthAssessment("", 0.0)
-
-    mental_health_components = []
-
-    if not (len(instagram_assessment_results.results) == 0 or (len(instagram_assessment_results.results) == 1 and
-                                                          (instagram_assessment_results.results[
-                                                           0].caption.startswith(
-                                                           "(WARNING)") or instagram_assessment_results.results[
-                                                           0].caption.startswith("(ERROR)")))):
-        mental_health_components.append(instagram_assessment_results.overall_health_score)
-    
-    if len(grades_assessment_results.results) != 0:
-        mental_health_components.append(grades_assessment_results.overall_health_score)
-    
-    if text_assessment_results.student_text != "":
-        mental_health_components.append(text_assessment_results.overall_health_score)
-
-    if len(mental_health_components) == 0:
-        mental_health = 0.0
-    else:
-        mental_health = sum(mental_health_components) / len(mental_health_components)
-
-    assessment_results.append((display_name, username, mental_health, instagram_assessment_results,
-                         grades_assessment_results, text_assessment_results))
+            widget.pack_forget()
+
+    def show(self, selected_user):
+        self.window.title("Details" if selected_user[0] == "" else f"Details for {selected_user[0]}")
+        self.results_label.configure(text=f"Details for {selected_user[0]}")
+        self._show_score(self.mental_health_label, f"Mental Health Score: {round(selected_user[2], 3)}",
+                         selected_user[2])
+
+        instagram_results = selected_user[3]
+        self.instagram_results_listbox.delete(0, tk.END)
+        if selected_user[1] != "":
+            self._show_score(self.instagram_score_label, f"Instagram Positivity Score: "
+                             f"{round(instagram_results.overall_health_score, 3)}",
+                             instagram_results.overall_health_score)
+            for position, result in enumerate(instagram_results.results):
+                # The first result is the bio (or a warning), which has no date worth showing
+                date = "" if position == 0 else f"({result.date.date()}) "
+                self.instagram_results_listbox.insert(tk.END,
+                                                      f"{round(result.health_score, 3)}: {date}{result.caption}")
+                self.instagram_results_listbox.itemconfig(tk.END, {'fg': results_table.BAND_COLOURS[
+                    results_table.score_band(result.health_score)]})
+        else:
+            self._show_score(self.instagram_score_label, "No Instagram account provided.")
+        self._show_below(self.instagram_results_listbox, self.instagram_score_label, selected_user[1] != "",
+                         pady=5)
+
+        grades_results = selected_user[4]
+        self.grades_results_listbox.delete(0, tk.END)
+        if len(grades_results.results) > 0:
+            self._show_score(self.grades_score_label, f"Grade Improvement Score: "
+                             f"{round(grades_results.overall_health_score, 3)}", grades_results.overall_health_score)
+            for result in grades_results.results:
+                self.grades_results_listbox.insert(tk.END, f"{result.subject}: {round(result.change, 3)}" +
+                                                   (" (sudden drop)" if result.sudden_drop else ""))
+                self.grades_results_listbox.itemconfig(tk.END, {'fg': results_table.BAND_COLOURS[
+                    results_table.RED if result.sudden_drop else results_table.score_band(result.change)]})
+        else:
+            self._show_score(self.grades_score_label, "No grades could be compared.")
+        self._show_below(self.grades_results_listbox, self.grades_score_label, len(grades_results.results) > 0,
+                         pady=5)
+
+        text_results = selected_user[5]
+        self.text_display_box.configure(state=tk.NORMAL)
+        self.text_display_box.delete("1.0", tk.END)
+        if text_results.student_text != "":
+            self._show_score(self.text_score_label, f"Text Health Score: "
+                             f"{round(text_results.overall_health_score, 3)}", text_results.overall_health_score)
+            self.text_display_box.insert("1.0", text_results.student_text)
+        else:
+            self._show_score(self.text_score_label, "No text was provided.")
+        self.text_display_box.configure(state=tk.DISABLED)
+        self._show_below(self.text_display_box, self.text_score_label, text_results.student_text != "")
+
+def assessment_stages_for(user_input: str, grade_assessments: dict, options: ScanOptions) -> list:
+    # Hand the workers everything they need up front so they never read the GUI's student data
+    grades = grade_assessments.get(user_input, health_assessment.GradesHealthAssessment(0.0, []))
+    return assessment_stages(user_input, grades, student_texts.get(user_input, ""), options, previous_assessments)
+
+def show_results_summary(assessment_run):
+    results_view = results_table.ResultsView(assessment_run.results)
+    timings = health_assessment.tracer.report()  # Before another run clears the tracer
+    details_window = None
+
+    results_window = tk.Toplevel()
+    results_window.configure(bg = "gray12")
+    results_window.geometry("400x300")
+    results_window.title("Results Summary")
+
+    results_label = ctk.CTkLabel(results_window, text="Results Summary", fg_color="black")
+    results_label.pack(padx=10)
 
-    if len(assessment_results) == total_users:
-        def sort_key(result):
-            return result[2]
+    if assessment_run.failed > 0:
+        failures_label = ctk.CTkLabel(results_window, text=f"{assessment_run.failed} assessment(s) did not finish.",
+                                      text_color="orange")
+        failures_label.pack(padx=10)
 
-        assessment_results.sort(key=sort_key)
+    def open_details(selected_user):
+        # One details window per summary, refilled with whichever student is asked for
+        nonlocal details_window
+        if selected_user is None:
+            messagebox.showwarning("Nothing selected.", "Please select a student to see details.")
+            return
 
-        results_window = tk.Toplevel()
-        results_window.configure(bg = "gray12")
-        results_window.geometry("400x300")
-        results_window.title("Results Summary")
+        if details_window is None or not details_window.exists():
+            details_window = DetailsWindow()
+        details_window.show(selected_user)
+
+    def follow_selection(selected_user):
+        if details_window is not None and details_window.exists():
+            details_window.show(selected_user)
+
+    results_list = results_table.ResultsTable(results_window, results_view, on_select=follow_selection,
+                                              on_open=open_details)
+
+    # Sorting and filtering only reorder the view; the table then redraws the rows in sight
+    sort_orders = {"Lowest score first": (results_table.SCORE, False),
+                   "Highest score first": (results_table.SCORE, True),
+                   "Name": (results_table.NAME, False)}
+    band_counts = results_view.band_counts()
+    band_shown = {band: tk.BooleanVar(value=True) for band in results_table.BANDS}
+
+    def sort_results(sort_order):
+        results_view.sort(*sort_orders[sort_order])
+        results_list.scroll_to(0)
+
+    def filter_results():
+        results_view.filter(band for band, shown in band_shown.items() if shown.get())
+        results_list.scroll_to(0)
+
+    sort_menu = ctk.CTkOptionMenu(results_window, values=list(sort_orders), command=sort_results)
+    sort_menu.pack(padx=10, pady=5)
+
+    bands_frame = ctk.CTkFrame(results_window, fg_color="gray12")
+    bands_frame.pack(padx=10)
+    for column, band in enumerate(results_table.BANDS):
+        band_checkbox = ctk.CTkCheckBox(bands_frame, text=f"{band.capitalize()} ({band_counts[band]})",
+                                        variable=band_shown[band], command=filter_results,
+                                        text_color=None if band == results_table.UNSCORED else band)
+        band_checkbox.grid(row=0, column=column, padx=5)
+
+    results_list.pack(padx=10, pady=5, fill=tk.BOTH, expand=True)
+
+    show_more_button = ctk.CTkButton(results_window, text="Show Details", height=50,
+                                 command=lambda: open_details(results_list.selected_result()))
+    show_more_button.pack(padx=10, pady=5)
+
+    save_to_csv_button = ctk.CTkButton(results_window, text="Save to CSV", height=50,
+                                       command=lambda: save_to_csv(sorted(results_view.results,
+                                                                          key=lambda result: result[2])))
+    save_to_csv_button.pack(padx=10, pady=5)
+
+    export_frame = ctk.CTkFrame(results_window, fg_color="gray12")
+    export_frame.pack(padx=10, pady=5)
+    export_format_menu = ctk.CTkOptionMenu(export_frame, values=list(result_export.FORMATS), width=100)
+    export_format_menu.grid(row=0, column=1, padx=5)
+    export_button = ctk.CTkButton(export_frame, text="Export Tables", height=50,
+                                  command=lambda: export_tables(results_view.results, export_format_menu.get()))
+    export_button.grid(row=0, column=0, padx=5)
+
+    save_timings_button = ctk.CTkButton(results_window, text="Save Timings", height=50,
+                                        command=lambda: save_timings(timings))
+    save_timings_button.pack(padx=10, pady=5)
+
+    results_window.rowconfigure(1, weight=1)
+
+def update_assessment_progress():
+    if len(active_assessments) == 0:
+        run_mass_assessment_button.configure(text="Run Mass Assessment")
+        cancel_assessment_button.configure(state=tk.DISABLED)
+        return
 
-        results_label = ctk.CTkLabel(results_window, text="Results Summary", fg_color="black")
-        results_label.pack(padx=10)
+    finished = sum(assessment_run.completed + assessment_run.failed for assessment_run in active_assessments.values())
+    total = sum(assessment_run.total for assessment_run in active_assessments.values())
+    run_mass_assessment_button.configure(text=f"Run Mass Assessment (assessing {finished}/{total})")
+    cancel_assessment_button.configure(state=tk.NORMAL)
 
-        results_listbox = tk.Listbox(results_window)
-        results_listbox.pack(padx=10, pady=5, fill=tk.BOTH, expand=True)
-        for result in assessment_results:
-            results_listbox.insert(tk.END, f"{result[0]}: {round(result[2], 3)}")
-            if result[2] < -0.5:
-                results_listbox.itemconfig(tk.END, {'fg': 'red'})
-            elif result[2] < 0:
-                results_listbox.itemconfig(tk.END, {'fg': 'orange'})
-            elif 0 < result[2] <= 0.5:
-                results_listbox.itemconfig(tk.END, {'fg': 'yellow'})
-            elif result[2] > 0.5:
-                results_listbox.itemconfig(tk.END, {'fg': 'green'})
+def finish_assessment(assessment_run):
+    # Called once per run, on the Tk thread, from poll_assessment_progress
+    for assessment_scheduler, active_run in list(active_assessments.items()):
+        if active_run is assessment_run:
+            assessment_scheduler.shutdown()
+            del active_assessments[assessment_scheduler]
 
-        show_more_button = ctk.CTkButton(results_window, text="Show Details", height=50,
-                                     command=lambda: show_details(results_listbox.curselection()))
-        show_more_button.pack(padx=10, pady=5)
+    update_assessment_progress()
 
-        save_to_csv_button = ctk.CTkButton(results_window, text="Save to CSV", height=50,command=save_to_csv)
-        save_to_csv_button.pack(padx=10, pady=5)
+    if len(assessment_run.results) > 0:
+        show_results_summary(assessment_run)
 
-        results_window.rowconfigure(1, weight=1)
+def poll_assessment_progress(assessment_scheduler, assessment_run):
+    # Results are only ever handled here on the Tk thread; the workers just put events on the queue
+    while True:
+        try:
+            event = assessment_scheduler.events.get_nowait()
+        except queue.Empty:
+            break
+
+        assessment_run.record_event(event)
+
+    if not assessment_run.finished:
+        update_assessment_progress()
+        root.after(100, poll_assessment_progress, assessment_scheduler, assessment_run)
+
+def cached_grade_assessments() -> dict:
+    # Grades are scored for the whole roster in one pass, and only if someone's grades changed since the last run;
+    # the workers just fold the results in
+    fingerprints = {user_input: assessment_cache.grades_fingerprint(student_grades.get(user_input))
+                    for user_input in student_names}
+    grade_assessments = {user_input: previous_assessments.get(user_input, assessment_cache.GRADES, fingerprint)
+                         for user_input, fingerprint in fingerprints.items()}
+
+    changed = [user_input for user_input, grades in grade_assessments.items() if grades is None]
+    if len(changed) > 0:
+        roster_assessments = health_assessment.grades_health_assessment_batch(student_grades)
+        for user_input in changed:
+            grade_assessments[user_input] = roster_assessments.get(user_input,
+                                                                   health_assessment.GradesHealthAssessment(0.0, []))
+            previous_assessments.put(user_input, assessment_cache.GRADES, fingerprints[user_input],
+                                     grade_assessments[user_input])
+
+    return grade_assessments
 
 def run_mass_assessment():
     authentication_username = instagram_username_entry.get()
@@ -1175,14 +729,14 @@ def run_mass_assessment():
 
     if authentication_username != "" and authentication_password == "":
         try:
-            instagram_bot.load_session_from_file(authentication_username)
+            health_assessment.instagram_bot.get().load_session_from_file(authentication_username)
         except:
             messagebox.showwarning("Error loading session.",
                                    "The session file for this username could not be found. Please log in again with both your username and password or leave the authentication fields blank.")
 
     if authentication_username != "" and authentication_password != "":
         try:
-            instagram_bot.login(authentication_username, authentication_password)
+            health_assessment.instagram_bot.get().login(authentication_username, authentication_password)
         except:
             messagebox.showwarning("Error logging in.",
                                    "Please check your username and password. Leave these fields blank if you want to attempt to scan the account without any authentication.")
@@ -1192,12 +746,34 @@ def run_mass_assessment():
         messagebox.showwarning("Insufficient entries.", "Please add at least one entry.")
         return
 
-    assessment_results.clear()
+    save_student_text()  # Include any edits still waiting on the timer
+
+    # Read the checkboxes once here so worker threads never touch Tk
+    options = current_scan_options()
+
+    # Only the timings of the runs in flight are kept, so they don't pile up over a long session
+    if len(active_assessments) == 0:
+        health_assessment.tracer.clear()
+
+    # Each run has its own scheduler and results, so several batches can be in flight at once
+    assessment_scheduler = scheduler.AssessmentScheduler(io_workers, cpu_workers)
+    assessment_run = AssessmentRun(len(student_names), on_complete=finish_assessment)
+    active_assessments[assessment_scheduler] = assessment_run
+
+    grade_assessments = cached_grade_assessments()
+
+    for user_input in student_names:
+        assessment_scheduler.submit(user_input, assessment_stages_for(user_input, grade_assessments, options))
+
+    update_assessment_progress()
+    root.after(100, poll_assessment_progress, assessment_scheduler, assessment_run)
+
+def cancel_assessment():
+    for assessment_scheduler in active_assessments:
+        assessment_scheduler.cancel()
+
+    cancel_assessment_button.configure(state=tk.DISABLED)
 
-    for username in student_names:
-        threading.Thread(target=run_basic_health_assessment,
-                         args=(username, len(student_names))).start()
-        
 def open_speech_window():
     global text_box, record_button
 
@@ -1220,14 +796,16 @@ def start_recording():
 def record_speech():
     global text_box, record_button
 
+    speech_recognizer = recognizer.get()
+
     with sr.Microphone() as source:
-        recognizer.adjust_for_ambient_noise(source)
+        speech_recognizer.adjust_for_ambient_noise(source)
         update_text_box("Listening...")
-        audio = recognizer.listen(source)
+        audio = speech_recognizer.listen(source)
 
         try:
             update_text_box("Recognizing speech...")
-            text = recognizer.recognize_google(audio)
+            text = speech_recognizer.recognize_google(audio)
             update_text_box(f"Recognized text: {text}")
             update_text_box(f"Mental health score: {text_health_analysis(text)}")
         except sr.UnknownValueError:
@@ -1247,40 +825,44 @@ analyze_brightness_mass_checkbox = ctk.CTkCheckBox(root, text="Analyze Image Bri
                                                   offvalue=False)
 analyze_brightness_mass_checkbox.grid(row=5, column=0, columnspan=3, pady=5)
 
+def warm_up_ocr():
+    # Start loading EasyOCR as soon as image text is ticked rather than when the first image arrives
+    if analyze_images.get() and health_assessment.reader is not None:
+        health_assessment.reader.warm_up()
+
 analyze_images_mass_checkbox = ctk.CTkCheckBox(root, text="Analyze Image Text (could take longer)",
                                               variable=analyze_images, onvalue=True,
-                                              offvalue=False)
+                                              offvalue=False, command=warm_up_ocr)
 analyze_images_mass_checkbox.grid(row=5, column=3, columnspan=3, pady=5)
 
 run_mass_assessment_button = ctk.CTkButton(root, text="Run Mass Assessment",
                                        command=run_mass_assessment)
-run_mass_assessment_button.grid(row=6, column=0, columnspan=6, padx=10, pady=5, sticky="ew")
+run_mass_assessment_button.grid(row=6, column=0, columnspan=5, padx=10, pady=5, sticky="ew")
+
+cancel_assessment_button = ctk.CTkButton(root, text="Cancel Assessment", command=cancel_assessment)
+cancel_assessment_button.grid(row=6, column=5, padx=10, pady=5, sticky="ew")
+cancel_assessment_button.configure(state=tk.DISABLED)
 
 start_recording_button = ctk.CTkButton(root, text="Run Speech Assessment")
 start_recording_button.configure(command=open_speech_window)
 start_recording_button.grid(row=7, column=0, columnspan=6, padx=10, pady=5, sticky="ew")
 
+model_status_label = ctk.CTkLabel(root, text="")
+model_status_label.grid(row=8, column=0, columnspan=6, padx=10, pady=5, sticky="w")
+
+def update_model_status():
+    resources = [resource for resource in (health_assessment.text_scorer, health_assessment.instagram_bot,
+                                           health_assessment.reader, recognizer) if resource is not None]
+    model_status_label.configure(text="    ".join(f"{resource.name}: {resource.state}" for resource in resources))
+    root.after(500, update_model_status)
+
+def warm_up_models():
+    # Text scoring is part of nearly every assessment, so load it while the user is still adding students
+    health_assessment.text_scorer.warm_up()
+    health_assessment.instagram_bot.warm_up()
+
 
-text_input.configure(state=tk.DISABLED)
-previous_grades_entry.configure(state=tk.DISABLED)
-current_grades_entry.configure(state=tk.DISABLED)
-previous_grades_add_button.configure(state=tk.DISABLED)
-current_grades_add_button.configure(state=tk.DISABLED)
-
-text_input_label.grid_remove()
-text_input.grid_remove()
-previous_grades_entry_label.grid_remove()
-previous_grades_entry.grid_remove()
-previous_grades_add_button.grid_remove()
-previous_grades_listbox_label.grid_remove()
-previous_grades_listbox.grid_remove()
-previous_grades_clear_button.grid_remove()
-current_grades_entry_label.grid_remove()
-current_grades_entry.grid_remove()
-current_grades_add_button.grid_remove()
-current_grades_listbox_label.grid_remove()
-current_grades_listbox.grid_remove()
-current_grades_clear_button.grid_remove()
+hide_student_editor()  # The editor is built visible, and stays hidden until a student is selected
 
 root.rowconfigure(1, weight=1)
 root.columnconfigure(1, weight=1)
@@ -1288,4 +870,6 @@ root.columnconfigure(4, weight=4)
 
 
 if __name__ == '__main__':
+    warm_up_models()
+    update_model_status()
     root.mainloop()
@@ -0,0 +1,91 @@
+import concurrent.futures
+import queue
+import threading
+import time
+
+import numpy as np
+
+DEFAULT_BATCH_SIZE = 8
+DEFAULT_MAX_WAIT = 0.05  # Seconds to hold a partial batch open for more images
+
+
+class OcrBatcher:
+    # Collects images from every in-flight assessment and runs them through EasyOCR together on one thread. A batch
+    # is sent once it has batch_size images or its first image has waited max_wait seconds. EasyOCR's batched
+    # detector needs images of one size, so each batch is split by shape (most posts are 1080x1080 or 1080x1350).
+    def __init__(self, load_reader, batch_size: int = DEFAULT_BATCH_SIZE, max_wait: float = DEFAULT_MAX_WAIT):
+        self.load_reader = load_reader  # Called for the Reader on every batch, so the model can be loaded lazily
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.batches = 0
+        self.images = 0
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="ocr-batcher", daemon=True)
+        self._thread.start()
+
+    def readtext(self, pixels: np.ndarray) -> list[str]:
+        future = concurrent.futures.Future()
+        self._queue.put((pixels, future))
+        return future.result()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        closing = False
+
+        while not closing:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+                if item is None:
+                    closing = True
+                    break
+                batch.append(item)
+
+            self._process(batch)
+
+    def _process(self, batch: list):
+        # A Reader that fails to load fails this batch only; the next batch tries loading it again
+        try:
+            reader = self.load_reader()
+        except Exception as error:
+            for _, future in batch:
+                future.set_exception(error)
+            return
+
+        groups = {}
+        for pixels, future in batch:
+            groups.setdefault(pixels.shape, []).append((pixels, future))
+
+        for group in groups.values():
+            try:
+                if len(group) == 1:
+                    results = [reader.readtext(group[0][0], detail=0, paragraph=True)]
+                else:
+                    results = reader.readtext_batched([pixels for pixels, _ in group], detail=0, paragraph=True,
+                                                      batch_size=len(group))
+            except Exception as error:
+                for _, future in group:
+                    future.set_exception(error)
+                continue
+
+            self.batches += 1
+            self.images += len(group)
+            for (_, future), text in zip(group, results):
+                future.set_result(text)
@@ -0,0 +1,89 @@
+import concurrent.futures
+import hashlib
+import json
+import time
+
+import numpy as np
+
+from sqlite_cache import SqliteLruCache
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+
+def image_hash(pixels: np.ndarray) -> str:
+    # Hash the decoded pixels rather than the file, so the same picture gets the same key however it was fetched
+    digest = hashlib.sha256(str(pixels.shape).encode())
+    digest.update(np.ascontiguousarray(pixels).data)
+    return digest.hexdigest()
+
+
+class OcrCache(SqliteLruCache):
+    # OCR results on disk in SQLite, keyed by image hash. The least recently used results are dropped once the
+    # stored text passes max_bytes. Concurrent lookups of the same image share one OCR call.
+    TABLE = "ocr_results"
+    KEY = "image_hash"
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS ocr_results (
+            image_hash TEXT PRIMARY KEY,
+            text TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            last_used REAL NOT NULL
+        );
+    """
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        super().__init__(path, max_bytes)
+        self.hits = 0
+        self.misses = 0
+        self._in_flight = {}
+
+    def get(self, key: str) -> list[str] | None:
+        with self._lock, self._connection:
+            row = self._connection.execute("SELECT text FROM ocr_results WHERE image_hash = ?", (key,)).fetchone()
+            if row is None:
+                return None
+
+            self._connection.execute("UPDATE ocr_results SET last_used = ? WHERE image_hash = ?", (time.time(), key))
+
+        return json.loads(row[0])
+
+    def put(self, key: str, text: list[str]):
+        encoded = json.dumps(text)
+
+        with self._lock, self._connection:
+            self._connection.execute("INSERT OR REPLACE INTO ocr_results VALUES (?, ?, ?, ?)",
+                                     (key, encoded, len(key) + len(encoded.encode()), time.time()))
+            self._evict()
+
+    def get_or_compute(self, key: str, compute) -> list[str]:
+        text = self.get(key)
+        if text is not None:
+            with self._lock:
+                self.hits += 1
+            return text
+
+        # If another thread is already reading this image, wait for its result instead of running OCR again
+        with self._lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = concurrent.futures.Future()
+                self._in_flight[key] = future
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if not owner:
+            return future.result()
+
+        try:
+            text = compute()
+            self.put(key, text)
+            future.set_result(text)
+            return text
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
@@ -0,0 +1,101 @@
+import dataclasses
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# Prepares images for OCR. By default EasyOCR gets the image as posted; an OcrMode can instead read a copy scaled
+# down to max_side (text detection time grows with the pixel count, and most quote graphics are still legible at
+# half size), and can skip OCR altogether when a cheap edge-density check finds nothing that looks like text.
+
+DEFAULT_MAX_SIDE = 540  # Half of Instagram's usual 1080 pixels
+PROBE_SIDE = 256  # The text check runs on a copy this size, so it costs the same for any image
+EDGE_DENSITY_THRESHOLD = 0.002  # Fraction of edge pixels; one large line of text on a plain background gives ~0.006
+
+
+@dataclasses.dataclass(frozen=True)
+class OcrMode:
+    max_side: int | None = None  # Scale images down so their longest side is at most this, or None for full size
+    text_check: bool = False  # Skip images whose edge density is below edge_threshold
+    edge_threshold: float = EDGE_DENSITY_THRESHOLD
+
+    def cache_key(self, image_hash: str) -> str:
+        # Different modes can read different text from the same image, so each mode has its own OCR cache entries.
+        # The full-size mode keeps plain image hashes, so results cached before modes existed stay valid.
+        if self.max_side is None and not self.text_check:
+            return image_hash
+
+        check = f"edges<{self.edge_threshold}" if self.text_check else "all"
+        return f"{image_hash}:{self.max_side or 'full'}:{check}"
+
+
+FULL_SIZE = OcrMode()
+FAST = OcrMode(DEFAULT_MAX_SIDE, text_check=True)
+
+
+def scale_down(pixels: np.ndarray, max_side: int) -> np.ndarray:
+    height, width = pixels.shape[:2]
+    scale = max_side / max(height, width)
+    if scale >= 1:
+        return pixels
+
+    return cv2.resize(pixels, (max(round(width * scale), 1), max(round(height * scale), 1)),
+                      interpolation=cv2.INTER_AREA)
+
+
+def edge_density(pixels: np.ndarray) -> float:
+    gray = pixels if pixels.ndim == 2 else cv2.cvtColor(pixels, cv2.COLOR_BGR2GRAY)
+    edges = cv2.Canny(scale_down(gray, PROBE_SIDE), 100, 200)
+    return np.count_nonzero(edges) / edges.size
+
+
+class OcrStats:
+    # What an OcrMode saved over reading every image at full size. OCR time is only measured for the images that
+    # were actually read (including any wait for a batch to fill), so the time saved is an estimate: the measured OCR
+    # seconds per pixel, times the pixels that were scaled away or skipped, less the time spent scaling and checking.
+    # Shared by the worker threads of a run.
+    def __init__(self):
+        self.images = 0
+        self.skipped = 0
+        self.full_pixels = 0  # Pixels in every image as posted
+        self.read_pixels = 0  # Pixels actually sent to OCR
+        self.ocr_seconds = 0.0
+        self.preparation_seconds = 0.0
+
+        self._lock = threading.Lock()
+
+    def record(self, full_pixels: int, read_pixels: int, ocr_seconds: float, preparation_seconds: float):
+        with self._lock:
+            self.images += 1
+            self.skipped += read_pixels == 0
+            self.full_pixels += full_pixels
+            self.read_pixels += read_pixels
+            self.ocr_seconds += ocr_seconds
+            self.preparation_seconds += preparation_seconds
+
+    @property
+    def seconds_saved(self) -> float:
+        with self._lock:
+            if self.read_pixels == 0:
+                return 0.0
+
+            return (self.ocr_seconds / self.read_pixels * (self.full_pixels - self.read_pixels) -
+                    self.preparation_seconds)
+
+
+def read_text(readtext, pixels: np.ndarray, mode: OcrMode, stats: OcrStats = None) -> list[str]:
+    # readtext is the OCR backend's readtext, called with the prepared image unless the text check skips it
+    start = time.perf_counter()
+    prepared = pixels if mode.max_side is None else scale_down(pixels, mode.max_side)
+    if mode.text_check and edge_density(prepared) < mode.edge_threshold:
+        if stats is not None:
+            stats.record(pixels.shape[0] * pixels.shape[1], 0, 0.0, time.perf_counter() - start)
+        return []
+
+    read_start = time.perf_counter()
+    text = readtext(prepared)
+    if stats is not None:
+        stats.record(pixels.shape[0] * pixels.shape[1], prepared.shape[0] * prepared.shape[1],
+                     time.perf_counter() - read_start, read_start - start)
+    return text
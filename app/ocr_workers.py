@@ -0,0 +1,82 @@
+import multiprocessing
+import multiprocessing.resource_tracker
+import multiprocessing.shared_memory
+import os
+
+import numpy as np
+
+DEFAULT_WORKERS = 2
+
+# Set in each worker process by _configure_worker; the Reader itself is only loaded by the first image
+_reader_settings = None
+_reader = None
+
+
+def _easyocr_reader(languages: list[str]):
+    import easyocr  # Only the workers need torch and the model
+    return easyocr.Reader(languages)
+
+
+def _configure_worker(reader_factory, languages: list[str], torch_threads: int):
+    # Must not raise: a Pool whose initializer fails keeps replacing its workers, and nothing sent to it returns
+    global _reader_settings
+    _reader_settings = (reader_factory, languages, torch_threads)
+
+
+def _load_reader():
+    # Runs inside a task, so a missing torch or easyocr, or a model that fails to load, is raised to the caller. The
+    # next task tries again.
+    global _reader
+    if _reader is None:
+        reader_factory, languages, torch_threads = _reader_settings
+
+        import torch
+        torch.set_num_threads(torch_threads)
+        _reader = reader_factory(languages)
+    return _reader
+
+
+def _read_shared_image(name: str, shape: tuple, dtype: str) -> list[str]:
+    memory = multiprocessing.shared_memory.SharedMemory(name=name)
+    try:
+        pixels = np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+        text = _load_reader().readtext(pixels, detail=0, paragraph=True)
+        del pixels  # The view has to go before the block can be closed
+        return text
+    finally:
+        memory.close()
+
+
+class OcrProcessPool:
+    # Runs EasyOCR in worker processes, each loading the model once (for its first image), so OCR isn't held back by
+    # the GIL or by torch locking inside one shared Reader. Images are copied once into shared memory and only the
+    # block's name is sent to a worker; the text comes back over the pool's pipe, or the error if the model couldn't
+    # be loaded.
+    #
+    # main.py builds the GUI at import time, so spawned workers would re-run it. The workers are forked instead, and
+    # all at once when the pool is created, so create it before any threads or windows exist. This needs the fork
+    # start method, which Windows doesn't have.
+    def __init__(self, workers: int = DEFAULT_WORKERS, torch_threads: int = None, languages: list[str] = None,
+                 reader_factory=_easyocr_reader):
+        self.workers = workers
+        self.torch_threads = torch_threads or max(1, (os.cpu_count() or 1) // workers)
+
+        # Start the resource tracker before forking so the workers share it with this process
+        multiprocessing.resource_tracker.ensure_running()
+
+        self._pool = multiprocessing.get_context("fork").Pool(
+            workers, _configure_worker, (reader_factory, languages or ['en'], self.torch_threads))
+
+    def readtext(self, pixels: np.ndarray) -> list[str]:
+        pixels = np.ascontiguousarray(pixels)
+        memory = multiprocessing.shared_memory.SharedMemory(create=True, size=max(pixels.nbytes, 1))
+        try:
+            np.ndarray(pixels.shape, dtype=pixels.dtype, buffer=memory.buf)[...] = pixels
+            return self._pool.apply(_read_shared_image, (memory.name, pixels.shape, pixels.dtype.str))
+        finally:
+            memory.close()
+            memory.unlink()
+
+    def close(self):
+        self._pool.close()
+        self._pool.join()
@@ -0,0 +1,80 @@
+import datetime
+import time
+
+from instagram_fetch import InstagramPost, InstagramProfile
+from sqlite_cache import SqliteLruCache
+
+DEFAULT_TTL = 24 * 60 * 60  # Instagram's image URLs expire after a few days, so don't keep posts much longer
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class ProfileCache(SqliteLruCache):
+    # Profiles and their recent posts on disk in SQLite, keyed by username and post shortcode. A profile expires
+    # ttl seconds after its last full fetch (incremental updates don't extend it), and the least recently used
+    # profiles are dropped once the stored text passes max_bytes.
+    TABLE = "profiles"
+    KEY = "username"
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS profiles (
+            username TEXT PRIMARY KEY,
+            biography TEXT NOT NULL,
+            fetched_at REAL NOT NULL,
+            last_used REAL NOT NULL,
+            size INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS posts (
+            username TEXT NOT NULL REFERENCES profiles (username) ON DELETE CASCADE,
+            shortcode TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            caption TEXT,
+            date TEXT NOT NULL,
+            url TEXT NOT NULL,
+            PRIMARY KEY (username, shortcode)
+        );
+    """
+
+    def __init__(self, path: str, ttl: float = DEFAULT_TTL, max_bytes: int = DEFAULT_MAX_BYTES):
+        super().__init__(path, max_bytes)
+        self.ttl = ttl
+
+    def load(self, username: str) -> InstagramProfile | None:
+        now = time.time()
+
+        with self._lock, self._connection:
+            row = self._connection.execute("SELECT biography, fetched_at FROM profiles WHERE username = ?",
+                                           (username,)).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                return None
+
+            self._connection.execute("UPDATE profiles SET last_used = ? WHERE username = ?", (now, username))
+            posts = self._connection.execute(
+                "SELECT caption, date, url, shortcode FROM posts WHERE username = ? ORDER BY position",
+                (username,)).fetchall()
+
+        return InstagramProfile(username, row[0], [
+            InstagramPost(caption, datetime.datetime.fromisoformat(date), url, shortcode)
+            for caption, date, url, shortcode in posts])
+
+    def store(self, profile: InstagramProfile, full_fetch: bool = True):
+        if profile.error is not None:
+            return
+
+        now = time.time()
+        size = len(profile.biography.encode()) + sum(
+            len((post.caption or "").encode()) + len(post.url) + len(post.shortcode) for post in profile.posts)
+
+        with self._lock, self._connection:
+            self._connection.execute("""
+                INSERT INTO profiles VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (username) DO UPDATE SET
+                    biography = excluded.biography,
+                    fetched_at = CASE WHEN ? THEN excluded.fetched_at ELSE fetched_at END,
+                    last_used = excluded.last_used,
+                    size = excluded.size
+            """, (profile.username, profile.biography, now, now, size, full_fetch))
+            self._connection.execute("DELETE FROM posts WHERE username = ?", (profile.username,))
+            self._connection.executemany("INSERT OR IGNORE INTO posts VALUES (?, ?, ?, ?, ?, ?)", [
+                (profile.username, post.shortcode, position, post.caption, post.date.isoformat(), post.url)
+                for position, post in enumerate(profile.posts)])
+
+            self._evict()
@@ -0,0 +1,177 @@
+import csv
+import json
+import os
+
+import image_features
+
+# Writes assessment results as three normalized tables, one file each, with a row added as each student finishes:
+#
+#   students          one row per student, with their overall and per-part scores and text
+#   instagram_posts   one row per bio, post, warning or error in a student's Instagram assessment
+#   grade_changes     one row per subject with a grade trend
+#
+# The student column links the tables. Dates are ISO 8601 strings and per-term grades are lists (joined with ';' in
+# CSV, with blanks for missing terms). Parquet needs pyarrow, which is optional and only imported when used.
+
+CSV = "csv"
+JSONL = "jsonl"
+PARQUET = "parquet"
+FORMATS = (CSV, JSONL, PARQUET)
+
+STUDENTS = "students"
+INSTAGRAM_POSTS = "instagram_posts"
+GRADE_CHANGES = "grade_changes"
+
+# Column name and type for each table; the types are only needed for Parquet
+TABLES = {
+    STUDENTS: [("student", "string"), ("username", "string"), ("overall_score", "float"),
+               ("instagram_score", "float"), ("grades_score", "float"), ("text_score", "float"),
+               ("text_content", "string")],
+    INSTAGRAM_POSTS: [("student", "string"), ("position", "int"), ("kind", "string"), ("shortcode", "string"),
+                      ("date", "string"), ("caption", "string"), ("image_text", "string"),
+                      ("brightness", "float"), ("saturation", "float"), ("colourfulness", "float"),
+                      ("dark_ratio", "float"), ("score", "float"), ("display_text", "string")],
+    GRADE_CHANGES: [("student", "string"), ("subject", "string"), ("change", "float"), ("largest_drop", "float"),
+                    ("volatility", "float"), ("sudden_drop", "bool"), ("series", "floats")],
+}
+
+PARQUET_BATCH_SIZE = 1024  # Rows buffered per table before a Parquet row group is written
+
+
+def _optional_float(value) -> float | None:
+    return None if value is None else float(value)
+
+
+def _image_feature(post, feature: int) -> float | None:
+    return None if post.image_features is None else post.image_features[feature]
+
+
+def result_rows(result) -> dict[str, list[tuple]]:
+    # The rows a run_basic_health_assessment result adds to each table, in TABLES column order
+    display_name, username, overall_score, instagram_results, grades_results, text_results = result
+
+    return {
+        STUDENTS: [(display_name, username, float(overall_score), float(instagram_results.overall_health_score),
+                    float(grades_results.overall_health_score), float(text_results.overall_health_score),
+                    text_results.student_text)],
+        INSTAGRAM_POSTS: [(display_name, position, post.kind, post.shortcode, post.date.isoformat(),
+                           post.post_caption, post.image_text, _optional_float(post.brightness),
+                           _image_feature(post, image_features.SATURATION),
+                           _image_feature(post, image_features.COLOURFULNESS),
+                           _image_feature(post, image_features.DARK_RATIO), float(post.health_score), post.caption)
+                          for position, post in enumerate(instagram_results.results)],
+        GRADE_CHANGES: [(display_name, change.subject, float(change.change), float(change.largest_drop),
+                         float(change.volatility), bool(change.sudden_drop), change.series)
+                        for change in grades_results.results],
+    }
+
+
+class CsvTableWriter:
+    def __init__(self, path: str, columns: list):
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._csv = csv.writer(self._file)
+        self._csv.writerow([name for name, _ in columns])
+
+    def write_rows(self, rows: list[tuple]):
+        self._csv.writerows([[";".join("" if value is None else str(value) for value in cell)
+                              if isinstance(cell, list) else cell for cell in row] for row in rows])
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class JsonLinesTableWriter:
+    def __init__(self, path: str, columns: list):
+        self._file = open(path, "w", encoding="utf-8")
+        self._names = [name for name, _ in columns]
+
+    def write_rows(self, rows: list[tuple]):
+        self._file.writelines(json.dumps(dict(zip(self._names, row))) + "\n" for row in rows)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetTableWriter:
+    # Buffers up to batch_size rows, then writes them as a row group, so memory use stays flat however long the run
+    def __init__(self, path: str, columns: list, batch_size: int = PARQUET_BATCH_SIZE):
+        import pyarrow
+        import pyarrow.parquet
+
+        types = {"string": pyarrow.string(), "float": pyarrow.float64(), "int": pyarrow.int64(),
+                 "bool": pyarrow.bool_(), "floats": pyarrow.list_(pyarrow.float64())}
+        self._pyarrow = pyarrow
+        self._schema = pyarrow.schema([(name, types[column_type]) for name, column_type in columns])
+        self._writer = pyarrow.parquet.ParquetWriter(path, self._schema)
+        self._batch_size = batch_size
+        self._rows = []
+
+    def write_rows(self, rows: list[tuple]):
+        self._rows += rows
+        if len(self._rows) >= self._batch_size:
+            self.flush()
+
+    def flush(self):
+        if len(self._rows) == 0:
+            return
+
+        columns = list(zip(*self._rows))
+        self._writer.write_table(self._pyarrow.Table.from_arrays(
+            [self._pyarrow.array(column, type=field.type) for column, field in zip(columns, self._schema)],
+            schema=self._schema))
+        self._rows = []
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+
+
+TABLE_WRITERS = {CSV: CsvTableWriter, JSONL: JsonLinesTableWriter, PARQUET: ParquetTableWriter}
+
+
+class ResultExporter:
+    # Streams results into <directory>/<table>.<format>. write() is meant to be passed to AssessmentRun as
+    # on_result, and so is only ever called from one thread at a time.
+    def __init__(self, directory: str, export_format: str = CSV):
+        if export_format not in TABLE_WRITERS:
+            raise ValueError(f"Unknown export format '{export_format}' (expected one of {', '.join(FORMATS)})")
+
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.export_format = export_format
+        self.students = 0
+
+        self._writers = {}
+        try:
+            for table, columns in TABLES.items():
+                self._writers[table] = TABLE_WRITERS[export_format](
+                    os.path.join(directory, f"{table}.{export_format}"), columns)
+        except:
+            self.close()
+            raise
+
+    def write(self, result):
+        for table, rows in result_rows(result).items():
+            self._writers[table].write_rows(rows)
+
+        self.students += 1
+        if self.export_format != PARQUET:
+            # Text formats are flushed per student, so the tables can be followed while a run is going
+            for writer in self._writers.values():
+                writer.flush()
+
+    def close(self):
+        for writer in self._writers.values():
+            writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
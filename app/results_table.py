@@ -0,0 +1,175 @@
+import tkinter as tk
+
+import numpy as np
+
+SCORE = "score"
+NAME = "name"
+
+# Score bands, in the same colours the rest of the app uses. Scores of exactly 0 (usually nothing could be scored)
+# are left uncoloured.
+RED = "red"
+ORANGE = "orange"
+YELLOW = "yellow"
+GREEN = "green"
+UNSCORED = "unscored"
+BANDS = (RED, ORANGE, YELLOW, GREEN, UNSCORED)
+BAND_COLOURS = {RED: "red", ORANGE: "orange", YELLOW: "yellow", GREEN: "green", UNSCORED: "black"}
+
+ROW_HEIGHT = 20
+WHEEL_ROWS = 3
+
+
+def score_band(score: float) -> str:
+    if score < -0.5:
+        return RED
+    elif score < 0:
+        return ORANGE
+    elif 0 < score <= 0.5:
+        return YELLOW
+    elif score > 0.5:
+        return GREEN
+
+    return UNSCORED
+
+
+class ResultsView:
+    # The rows of a results table: run_basic_health_assessment tuples, sorted and filtered by score band. Only an
+    # array of result indices is reordered, so re-sorting or changing the bands never copies or rebuilds the results.
+    def __init__(self, results: list):
+        self.results = results
+        self.scores = np.array([result[2] for result in results], dtype=float)
+        self.bands = np.select([self.scores < -0.5, self.scores < 0, self.scores > 0.5, self.scores > 0],
+                               [BANDS.index(RED), BANDS.index(ORANGE), BANDS.index(GREEN), BANDS.index(YELLOW)],
+                               BANDS.index(UNSCORED))
+        self.shown_bands = set(BANDS)
+
+        self._names = None  # Built the first time the view is sorted by name
+        self._sorted = np.argsort(self.scores, kind="stable")  # Lowest (most concerning) score first
+        self.order = self._sorted
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def __getitem__(self, row: int):
+        return self.results[self.order[row]]
+
+    def sort(self, column: str = SCORE, descending: bool = False):
+        if column == NAME:
+            if self._names is None:
+                self._names = np.array([result[0].lower() for result in self.results], dtype=str)
+            keys = self._names
+        else:
+            keys = self.scores
+
+        self._sorted = np.argsort(keys, kind="stable")
+        if descending:
+            self._sorted = self._sorted[::-1]
+        self._apply_filter()
+
+    def filter(self, bands):
+        self.shown_bands = set(bands)
+        self._apply_filter()
+
+    def band_counts(self) -> dict[str, int]:
+        return dict(zip(BANDS, np.bincount(self.bands, minlength=len(BANDS)).tolist()))
+
+    def _apply_filter(self):
+        shown = np.isin(self.bands[self._sorted], [BANDS.index(band) for band in self.shown_bands])
+        self.order = self._sorted[shown]
+
+
+class ResultsTable:
+    # A scrolling list of results that only draws the rows in view. A small pool of canvas items (enough to fill the
+    # window) is refilled as the table scrolls, so opening, sorting and filtering cost the same for ten students or
+    # ten thousand. on_select is called with the clicked result, and on_open with a double-clicked one.
+    def __init__(self, master, view: ResultsView, on_select=None, on_open=None):
+        self.view = view
+        self.on_select = on_select
+        self.on_open = on_open
+        self.first_row = 0
+        self.selected = None  # Index into view.results, so the selection survives sorting and filtering
+
+        self.frame = tk.Frame(master)
+        self.canvas = tk.Canvas(self.frame, bg="white", highlightthickness=0)
+        self.scrollbar = tk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.yview)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self._row_items = []  # (background, text) canvas items, one per row that fits in the window
+
+        self.canvas.bind("<Configure>", lambda _: self.refresh())
+        self.canvas.bind("<Button-1>", self._click)
+        self.canvas.bind("<Double-Button-1>", self._double_click)
+        self.canvas.bind("<MouseWheel>", lambda event: self.scroll_to(
+            self.first_row + (-WHEEL_ROWS if event.delta > 0 else WHEEL_ROWS)))
+        self.canvas.bind("<Button-4>", lambda _: self.scroll_to(self.first_row - WHEEL_ROWS))
+        self.canvas.bind("<Button-5>", lambda _: self.scroll_to(self.first_row + WHEEL_ROWS))
+
+    def pack(self, **options):
+        self.frame.pack(**options)
+
+    def visible_rows(self) -> int:
+        return max(self.canvas.winfo_height() // ROW_HEIGHT, 1)
+
+    def selected_result(self):
+        return None if self.selected is None else self.view.results[self.selected]
+
+    def yview(self, *arguments):
+        # The scrollbar's command: ("moveto", fraction) or ("scroll", count, "units" or "pages")
+        if arguments[0] == "moveto":
+            self.scroll_to(round(float(arguments[1]) * len(self.view)))
+        elif arguments[0] == "scroll":
+            self.scroll_to(self.first_row + int(arguments[1]) * (self.visible_rows() if arguments[2] == "pages" else 1))
+
+    def scroll_to(self, first_row: int):
+        self.first_row = first_row
+        self.refresh()
+
+    def refresh(self):
+        # Called after scrolling, resizing, sorting or filtering; only the rows in view are touched
+        visible_rows = self.visible_rows()
+        self.first_row = max(min(self.first_row, len(self.view) - visible_rows), 0)
+
+        width = self.canvas.winfo_width()
+        while len(self._row_items) < visible_rows + 1:
+            top = len(self._row_items) * ROW_HEIGHT
+            self._row_items.append((
+                self.canvas.create_rectangle(0, top, width, top + ROW_HEIGHT, width=0),
+                self.canvas.create_text(4, top + ROW_HEIGHT // 2, anchor=tk.W)))
+
+        for position, (background, text) in enumerate(self._row_items):
+            row = self.first_row + position
+            if row >= len(self.view):
+                self.canvas.itemconfigure(background, state=tk.HIDDEN)
+                self.canvas.itemconfigure(text, state=tk.HIDDEN)
+                continue
+
+            index = self.view.order[row]
+            result = self.view.results[index]
+            self.canvas.coords(background, 0, position * ROW_HEIGHT, width, (position + 1) * ROW_HEIGHT)
+            self.canvas.itemconfigure(background, state=tk.NORMAL,
+                                      fill="lightblue" if index == self.selected else "white")
+            self.canvas.itemconfigure(text, state=tk.NORMAL, text=f"{result[0]}: {round(result[2], 3)}",
+                                      fill=BAND_COLOURS[BANDS[self.view.bands[index]]])
+
+        if len(self.view) == 0:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(self.first_row / len(self.view), (self.first_row + visible_rows) / len(self.view))
+
+    def _row_at(self, y: int) -> int | None:
+        row = self.first_row + y // ROW_HEIGHT
+        return row if row < len(self.view) else None
+
+    def _click(self, event):
+        row = self._row_at(event.y)
+        if row is None:
+            return
+
+        self.selected = int(self.view.order[row])
+        self.refresh()
+        if self.on_select is not None:
+            self.on_select(self.view.results[self.selected])
+
+    def _double_click(self, event):
+        if self._row_at(event.y) is not None and self.on_open is not None:
+            self.on_open(self.selected_result())
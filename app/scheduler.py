@@ -0,0 +1,95 @@
+import concurrent.futures
+import dataclasses
+import os
+import queue
+import threading
+
+IO = "io"
+CPU = "cpu"
+
+DEFAULT_IO_WORKERS = 8
+DEFAULT_CPU_WORKERS = os.cpu_count() or 4
+
+
+@dataclasses.dataclass
+class AssessmentEvent:
+    key: str
+    result: object = None
+    error: BaseException = None
+
+    @property
+    def cancelled(self) -> bool:
+        return isinstance(self.error, concurrent.futures.CancelledError)
+
+
+class AssessmentScheduler:
+    # Runs each submitted job as a chain of stages, each on either the I/O pool (network requests) or the CPU pool
+    # (OCR, scoring). Exactly one AssessmentEvent per job is put on the events queue, so a GUI can poll it from its
+    # own thread instead of being called from the workers.
+    def __init__(self, io_workers: int = DEFAULT_IO_WORKERS, cpu_workers: int = DEFAULT_CPU_WORKERS):
+        self._pools = {
+            IO: concurrent.futures.ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="assessment-io"),
+            CPU: concurrent.futures.ThreadPoolExecutor(max_workers=cpu_workers, thread_name_prefix="assessment-cpu"),
+        }
+        self._futures = set()
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+
+        self.events = queue.Queue()
+        self.submitted = 0
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def submit(self, key: str, stages: list):
+        # stages is a list of (pool, function) pairs; the first function takes no arguments and every later one
+        # is called with the result of the stage before it
+        self.submitted += 1
+        self._run_stage(key, stages, 0, None)
+
+    def _run_stage(self, key: str, stages: list, index: int, value):
+        if self._cancelled.is_set():
+            self.events.put(AssessmentEvent(key, error=concurrent.futures.CancelledError()))
+            return
+
+        pool, function = stages[index]
+        arguments = () if index == 0 else (value,)
+
+        try:
+            future = self._pools[pool].submit(function, *arguments)
+        except RuntimeError:  # The pools were shut down by cancel()
+            self.events.put(AssessmentEvent(key, error=concurrent.futures.CancelledError()))
+            return
+
+        with self._lock:
+            self._futures.add(future)
+
+        future.add_done_callback(lambda done: self._stage_done(key, stages, index, done))
+
+    def _stage_done(self, key: str, stages: list, index: int, future: concurrent.futures.Future):
+        with self._lock:
+            self._futures.discard(future)
+
+        if future.cancelled():
+            self.events.put(AssessmentEvent(key, error=concurrent.futures.CancelledError()))
+        elif future.exception() is not None:
+            self.events.put(AssessmentEvent(key, error=future.exception()))
+        elif index == len(stages) - 1:
+            self.events.put(AssessmentEvent(key, result=future.result()))
+        else:
+            self._run_stage(key, stages, index + 1, future.result())
+
+    def cancel(self):
+        # Stages that are already running finish, but nothing new is started
+        self._cancelled.set()
+
+        with self._lock:
+            futures = list(self._futures)
+
+        for future in futures:
+            future.cancel()
+
+    def shutdown(self):
+        for pool in self._pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
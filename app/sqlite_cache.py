@@ -0,0 +1,60 @@
+import os
+import sqlite3
+import threading
+
+
+class SqliteLruCache:
+    # The storage shared by the on-disk caches: one SQLite file whose main table (TABLE, keyed by KEY) has a size and
+    # a last_used column. Once the sizes add up to more than max_bytes, the least recently used rows are dropped,
+    # along with anything that references them. Subclasses give the tables in SCHEMA, and must hold _lock around
+    # their own queries, in a transaction that ends with _evict() whenever they add rows. The file is only created
+    # and opened on first use, so creating a cache (or importing a module that does) never touches the disk.
+    TABLE = None
+    KEY = None
+    SCHEMA = None
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._database = None
+
+    @property
+    def opened(self) -> bool:
+        return self._database is not None
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        # Only used with _lock held, so the database is opened once
+        if self._database is None:
+            if os.path.dirname(self.path) != "":
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+            self._database = sqlite3.connect(self.path, check_same_thread=False)
+            self._database.execute("PRAGMA foreign_keys = ON")
+            self._database.executescript(self.SCHEMA)
+
+        return self._database
+
+    def _evict(self):
+        total = self._connection.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.TABLE}").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        for key, size in self._connection.execute(
+                f"SELECT {self.KEY}, size FROM {self.TABLE} ORDER BY last_used").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._connection.execute(f"DELETE FROM {self.TABLE} WHERE {self.KEY} = ?", (key,))
+            total -= size
+
+    def clear(self):
+        with self._lock, self._connection:
+            self._connection.execute(f"DELETE FROM {self.TABLE}")
+
+    def close(self):
+        with self._lock:
+            if self._database is not None:
+                self._database.close()
+                self._database = None
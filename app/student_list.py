@@ -0,0 +1,101 @@
+import dataclasses
+
+# Student lists are text files with one student per line, in one of these forms:
+#
+#   real name@instagram_username
+#   real name@instagram_username: subject=grade, ...; subject=grade, ...
+#   real name@instagram_username: subject=grade, ...; subject=grade, ...: text the student wrote
+#   real name@instagram_username: subject=grade, ...; subject=grade, ...; subject=grade, ...; ...
+#
+# Grades are percentages, with one list per term from oldest to newest: the last two are the previous and current
+# grades, and any before them give a longer history to find trends in. Either part of the name may be left out. The
+# text runs to the end of the line, so it may contain colons.
+
+
+def split_student_name(user_input: str) -> tuple[str, str]:
+    try:
+        real_name, username = user_input.split("@")
+        real_name = real_name.strip()
+        username = username.strip().lower()
+    except:
+        real_name = ""
+        username = user_input.strip().lower()
+
+    return real_name, username
+
+
+class StudentListError(ValueError):
+    def __init__(self, line_number: int, message: str):
+        super().__init__(f"line {line_number}: {message}")
+        self.line_number = line_number
+        self.message = message
+
+
+@dataclasses.dataclass
+class StudentRecord:
+    student_name: str  # "real name@username", as shown in the student list
+    grades: list[dict[str, float]] = dataclasses.field(default_factory=lambda: [{}, {}])  # One dict per term
+    text: str = ""
+    line_number: int = 0
+
+
+def parse_grades(grades: str, line_number: int = 0) -> list[dict[str, float]]:
+    # Returns one dict per term, oldest first, with grades as fractions
+    terms = grades.split(";")
+    if len(terms) < 2:
+        raise StudentListError(line_number, "expected at least previous and current grades separated by ';'")
+
+    parsed_grades = [{} for _ in terms]
+    for term, term_grades in zip(parsed_grades, terms):
+        for entry in term_grades.split(","):
+            subject, equals, grade = entry.partition("=")
+            if equals == "" or "=" in grade or subject.strip() == "":
+                raise StudentListError(line_number, f"expected subject=grade, not '{entry.strip()}'")
+
+            try:
+                term[subject.strip().lower()] = float(grade.strip()) / 100
+            except ValueError:
+                raise StudentListError(line_number, f"the grade for {subject.strip()} is not a number") from None
+
+    return parsed_grades
+
+
+def parse_student_line(line: str, line_number: int = 0, on_error=None) -> StudentRecord | None:
+    # Returns None for a blank line. Lines that can't be used raise StudentListError, unless on_error is given, in
+    # which case it is called with the error and the line is skipped. A malformed grade list is reported the same
+    # way but, as before, the student is still kept without grades.
+    def report(error: StudentListError):
+        if on_error is None:
+            raise error
+        on_error(error)
+
+    if line.strip() == "":
+        return None
+
+    fields = line.split(":", 2)  # The free text is the rest of the line, so it can have colons of its own
+
+    real_name, username = split_student_name(fields[0])
+    if real_name == "" and username == "":
+        report(StudentListError(line_number, "missing the student's name and Instagram username"))
+        return None
+
+    record = StudentRecord(f"{real_name}@{username}", line_number=line_number)
+
+    if len(fields) > 1:
+        try:
+            record.grades = parse_grades(fields[1], line_number)
+        except StudentListError as error:
+            report(error)
+
+    if len(fields) > 2:
+        record.text = fields[2].strip()
+
+    return record
+
+
+def read_student_list(file, on_error=None):
+    # Yields a StudentRecord per student as the file is read, so a long list can start being assessed straight away
+    for line_number, line in enumerate(file, 1):
+        record = parse_student_line(line, line_number, on_error)
+        if record is not None:
+            yield record
@@ -0,0 +1,73 @@
+import collections
+import os
+
+CONCERNING_TERMS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "concerning_terms.txt")
+
+
+def load_terms(path: str) -> dict[str, float]:
+    terms = {}
+
+    with open(path, encoding="utf-8") as file:
+        for line_number, line in enumerate(file, start=1):
+            line = line.split("#", 1)[0].strip()
+            if line == "":
+                continue
+
+            try:
+                term, penalty = line.split("=")
+                terms[term.strip().lower()] = float(penalty.strip())
+            except ValueError:
+                raise ValueError(f"{path}, line {line_number}: expected term=penalty, got {line!r}")
+
+    return terms
+
+
+class TermMatcher:
+    # Aho-Corasick automaton over tokens, so single words and multi-word phrases are matched together in one
+    # pass over the text no matter how many terms there are
+    def __init__(self, terms: dict[tuple[str, ...], float]):
+        self._transitions = [{}]
+        self._failures = [0]
+        self._penalties = [0.0]
+
+        for term, penalty in terms.items():
+            state = 0
+            for token in term:
+                next_state = self._transitions[state].get(token)
+                if next_state is None:
+                    next_state = len(self._transitions)
+                    self._transitions[state][token] = next_state
+                    self._transitions.append({})
+                    self._failures.append(0)
+                    self._penalties.append(0.0)
+                state = next_state
+
+            if state != 0:
+                self._penalties[state] += penalty
+
+        # Failure links, built breadth first so every state also carries the penalties of the shorter terms
+        # that end where it does (e.g. "kill" inside "want to kill")
+        queue = collections.deque(self._transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, next_state in self._transitions[state].items():
+                failure = self._failures[state]
+                while failure != 0 and token not in self._transitions[failure]:
+                    failure = self._failures[failure]
+
+                self._failures[next_state] = self._transitions[failure].get(token, 0)
+                self._penalties[next_state] += self._penalties[self._failures[next_state]]
+                queue.append(next_state)
+
+    def penalty(self, tokens) -> float:
+        total = 0.0
+        state = 0
+
+        for token in tokens:
+            while state != 0 and token not in self._transitions[state]:
+                state = self._failures[state]
+
+            state = self._transitions[state].get(token, 0)
+            total += self._penalties[state]
+
+        return total
@@ -0,0 +1,127 @@
+import functools
+
+import nltk
+import nltk.corpus
+import nltk.sentiment
+import nltk.tokenize
+import numpy as np
+
+import term_matcher
+
+LEMMA_CACHE_SIZE = 65536
+WORD_PENALTY_CACHE_SIZE = 65536
+
+
+class TextScorer:
+    def __init__(self, sentiment_analyzer: nltk.sentiment.vader.SentimentIntensityAnalyzer = None,
+                 lemma_cache_size: int = LEMMA_CACHE_SIZE,
+                 word_penalty_cache_size: int = WORD_PENALTY_CACHE_SIZE,
+                 concerning_terms_file: str = term_matcher.CONCERNING_TERMS_FILE):
+        if sentiment_analyzer is None:
+            sentiment_analyzer = nltk.sentiment.vader.SentimentIntensityAnalyzer()
+
+        self.sentiment_analyzer = sentiment_analyzer
+        self.stopwords = frozenset(nltk.corpus.stopwords.words('english'))
+        self.lemmatizer = nltk.WordNetLemmatizer()
+        self.lemmatize = functools.lru_cache(maxsize=lemma_cache_size)(self.lemmatizer.lemmatize)
+        self.word_penalty = functools.lru_cache(maxsize=word_penalty_cache_size)(self._word_penalty)
+
+        # Load WordNet now so worker threads don't race on NLTK's lazy corpus loader
+        self.lemmatize("warm")
+
+        # Concerning terms are normalized like the text they are matched against
+        concerning_terms = {}
+        for term, penalty in term_matcher.load_terms(concerning_terms_file).items():
+            tokens = tuple(self.lemmatize(token) for token in nltk.tokenize.word_tokenize(term))
+            concerning_terms[tokens] = concerning_terms.get(tokens, 0.0) + penalty
+        self.concerning_terms = term_matcher.TermMatcher(concerning_terms)
+
+    def tokenize(self, text: str) -> tuple[list[str], str]:
+        # Tokenization
+        tokens = nltk.tokenize.word_tokenize(text.lower())
+
+        # Lemmatize, keeping stopwords around for phrase matching
+        lemmas = [self.lemmatize(token) for token in tokens]
+
+        # Stopwords
+        analyzer_text = ' '.join(lemma for token, lemma in zip(tokens, lemmas) if token not in self.stopwords)
+
+        return lemmas, analyzer_text
+
+    def preprocess(self, text: str) -> str:
+        return self.tokenize(text)[1]
+
+    def _word_penalty(self, word: str) -> float:
+        lexicon = self.sentiment_analyzer.lexicon
+        constants = self.sentiment_analyzer.constants
+
+        # A lone word without punctuation is scored by VADER as just its lexicon valence, so look it up directly.
+        # "neg" is then 1 exactly when the valence is negative, and "compound" is the normalized valence.
+        if word.split() == [word] and not constants.REGEX_REMOVE_PUNCTUATION.search(word):
+            if len(word) < 2 or word.lower() in constants.BOOSTER_DICT:
+                return 0.0
+
+            valence = lexicon.get(word.lower(), 0)
+            if valence >= 0:
+                return 0.0
+
+            return round(constants.normalize(valence), 4) / 1.5
+
+        # Emoticons, contractions and punctuation emphasis still need the full analyzer
+        word_score = self.sentiment_analyzer.polarity_scores(word)
+        if word_score["neg"] == 1:
+            return word_score["compound"] / 1.5
+
+        return 0.0
+
+    def score(self, text: str) -> float:
+        lemmas, analyzer_text = self.tokenize(text)
+
+        health_score = 0.0
+
+        # Highlight negative words, ignoring positive words
+        for word in analyzer_text.split(" "):
+            health_score += self.word_penalty(word)
+
+        # Particularly concerning words and phrases get an additional penalty
+        health_score -= self.concerning_terms.penalty(lemmas)
+
+        # Incorporate the overall sentiment of the text as the most important factor
+        health_score += self.sentiment_analyzer.polarity_scores(analyzer_text)["compound"] * 3
+
+        return health_score
+
+    def score_many(self, texts) -> list[float]:
+        return [self.score(text) for text in texts]
+
+    def score_batch(self, texts) -> np.ndarray:
+        vocabulary = {}
+        rows = []
+        columns = []
+        concerning_penalties = []
+        compound_scores = []
+
+        # Tokenize everything once, recording (text, word) pairs as a sparse token matrix over a shared vocabulary
+        for row, text in enumerate(texts):
+            lemmas, analyzer_text = self.tokenize(text)
+            for word in analyzer_text.split(" "):
+                rows.append(row)
+                columns.append(vocabulary.setdefault(word, len(vocabulary)))
+
+            concerning_penalties.append(self.concerning_terms.penalty(lemmas))
+            compound_scores.append(self.sentiment_analyzer.polarity_scores(analyzer_text)["compound"])
+
+        # Each distinct word is scored once
+        word_scores = np.fromiter((self.word_penalty(word) for word in vocabulary), dtype=np.float64,
+                                  count=len(vocabulary))
+
+        # Sparse matrix-vector product: sum the word scores belonging to each text
+        rows = np.asarray(rows, dtype=np.intp)
+        columns = np.asarray(columns, dtype=np.intp)
+        word_totals = np.bincount(rows, weights=word_scores[columns], minlength=len(compound_scores))
+
+        # Particularly concerning words and phrases get an additional penalty
+        health_scores = word_totals - np.asarray(concerning_penalties, dtype=np.float64)
+
+        # Incorporate the overall sentiment of each text as the most important factor
+        return health_scores + np.asarray(compound_scores, dtype=np.float64) * 3
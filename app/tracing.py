@@ -0,0 +1,168 @@
+import bisect
+import contextlib
+import dataclasses
+import functools
+import json
+import os
+import threading
+import time
+
+# Per-stage timing for assessments. Each traced stage (a decorated function or a span) adds its duration to the
+# stage's totals, and to the totals of the student being assessed on that thread, if any. Spans nest, so a stage's
+# time includes the time of any stages it calls. Recording a span costs two clock reads and one short lock, so
+# tracing can be left on for real runs.
+#
+# The totals can be written as a JSON report (stage and per-student totals) or as Prometheus text exposition (stage
+# totals only, so the number of series doesn't grow with the number of students), for example for node_exporter's
+# textfile collector.
+
+METRIC_PREFIX = "socialscanner_stage"
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)  # Histogram bounds in seconds
+
+
+@dataclasses.dataclass
+class StageStats:
+    calls: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+    max_seconds: float = 0.0
+
+    def add(self, seconds: float, error: bool):
+        self.calls += 1
+        self.errors += error
+        self.seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+
+class Tracer:
+    # Shared by every worker thread. The student a thread is working on is set with student() or for_student(), and
+    # is picked up by every span the thread records until it is unset.
+    def __init__(self, enabled: bool = True, per_student: bool = True):
+        self.enabled = enabled
+        self.per_student = per_student
+        self.stages = {}  # Stage -> StageStats
+        self.students = {}  # Student -> stage -> StageStats
+
+        self._buckets = {}  # Stage -> count per BUCKETS bound (not cumulative), plus one for anything longer
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextlib.contextmanager
+    def student(self, name: str):
+        previous = getattr(self._local, "student", None)
+        self._local.student = name
+        try:
+            yield
+        finally:
+            self._local.student = previous
+
+    def for_student(self, name: str, function):
+        # function, run with name as the thread's student; for scheduler stages, which run on pool threads
+        @functools.wraps(function)
+        def run(*arguments):
+            with self.student(name):
+                return function(*arguments)
+
+        return run
+
+    @contextlib.contextmanager
+    def span(self, stage: str):
+        if not self.enabled:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.record(stage, time.perf_counter() - start, error=True)
+            raise
+        self.record(stage, time.perf_counter() - start)
+
+    def traced(self, stage: str):
+        # Decorator that records every call of a function as stage. The same as span(), without the generator, as
+        # decorated functions can be called many times per student.
+        def decorate(function):
+            @functools.wraps(function)
+            def traced_function(*arguments, **keyword_arguments):
+                if not self.enabled:
+                    return function(*arguments, **keyword_arguments)
+
+                start = time.perf_counter()
+                try:
+                    result = function(*arguments, **keyword_arguments)
+                except BaseException:
+                    self.record(stage, time.perf_counter() - start, error=True)
+                    raise
+                self.record(stage, time.perf_counter() - start)
+                return result
+
+            return traced_function
+
+        return decorate
+
+    def record(self, stage: str, seconds: float, error: bool = False, student: str = None):
+        if student is None:
+            student = getattr(self._local, "student", None)
+
+        with self._lock:
+            if stage not in self.stages:
+                self.stages[stage] = StageStats()
+                self._buckets[stage] = [0] * (len(BUCKETS) + 1)
+            self.stages[stage].add(seconds, error)
+            self._buckets[stage][bisect.bisect_left(BUCKETS, seconds)] += 1
+
+            if student is not None and self.per_student:
+                self.students.setdefault(student, {}).setdefault(stage, StageStats()).add(seconds, error)
+
+    def clear(self):
+        with self._lock:
+            self.stages.clear()
+            self.students.clear()
+            self._buckets.clear()
+
+    def report(self) -> dict:
+        with self._lock:
+            return {
+                "stages": {stage: dataclasses.asdict(stats) for stage, stats in sorted(self.stages.items())},
+                "students": {student: {stage: dataclasses.asdict(stats) for stage, stats in sorted(stages.items())}
+                             for student, stages in self.students.items()},
+            }
+
+    def prometheus_text(self) -> str:
+        lines = [f"# HELP {METRIC_PREFIX}_duration_seconds Time spent in each assessment stage",
+                 f"# TYPE {METRIC_PREFIX}_duration_seconds histogram"]
+        errors = [f"# HELP {METRIC_PREFIX}_errors_total Assessment stage calls that raised an error",
+                  f"# TYPE {METRIC_PREFIX}_errors_total counter"]
+
+        with self._lock:
+            for stage, stats in sorted(self.stages.items()):
+                label = f'stage="{_escape_label(stage)}"'
+                count = 0
+                for bound, bucket in zip(BUCKETS, self._buckets[stage]):
+                    count += bucket
+                    lines.append(f'{METRIC_PREFIX}_duration_seconds_bucket{{{label},le="{bound}"}} {count}')
+                lines.append(f'{METRIC_PREFIX}_duration_seconds_bucket{{{label},le="+Inf"}} {stats.calls}')
+                lines.append(f"{METRIC_PREFIX}_duration_seconds_sum{{{label}}} {stats.seconds}")
+                lines.append(f"{METRIC_PREFIX}_duration_seconds_count{{{label}}} {stats.calls}")
+                errors.append(f"{METRIC_PREFIX}_errors_total{{{label}}} {stats.errors}")
+
+        return "\n".join(lines + errors) + "\n"
+
+    def write_json(self, path: str):
+        _write_atomically(path, json.dumps(self.report(), indent=2))
+
+    def write_prometheus(self, path: str):
+        _write_atomically(path, self.prometheus_text())
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _write_atomically(path: str, text: str):
+    # Scrapers and the textfile collector never see a half-written file
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "w", encoding="utf-8") as file:
+        file.write(text)
+    os.replace(temporary_path, path)
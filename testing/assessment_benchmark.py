@@ -0,0 +1,253 @@
+import argparse
+import datetime
+import importlib.util
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(1, "../app")
+
+import health_assessment
+import instagram_fetch
+import instagram_stub
+import ocr_cache
+import student_list
+from instagram_fetch import InstagramPost, InstagramProfile, ScanOptions
+
+# Reproducible throughput benchmarks for the assessment, run entirely offline. Synthetic students are assessed
+# against profiles served by a local instagram_stub server, so no Instagram account or network is needed:
+#
+#   python assessment_benchmark.py                   compare with the stored baseline
+#   python assessment_benchmark.py --save-baseline   store this machine's numbers as the new baseline
+#   python assessment_benchmark.py --fixtures DIR    use a recorded fixture store (instagram_stub layout) instead
+#
+# Every benchmark reports a throughput, the best of --repeats runs. Anything more than --tolerance below the baseline
+# is flagged as a regression and the script exits with status 1, so it can gate CI. Baselines are only comparable on
+# the machine that recorded them. OCR is only benchmarked when EasyOCR is installed.
+
+STUDENT_COUNTS = (10, 100, 1000)
+POSTS_PER_PROFILE = 6
+IMAGE_POOL = 16  # Distinct images, shared between every fixture post
+TEXT_COUNT = 2000
+BRIGHTNESS_IMAGES = 64
+DEFAULT_REPEATS = 3
+DEFAULT_TOLERANCE = 0.2
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assessment_baseline.json")
+
+CAPTIONS = ["Game day with the team!", "Best summer ever <3", "Can't sleep again", "Nobody gets it",
+            "Love my friends so much", "Monday...", "So tired of everything", "New haircut, who dis",
+            "Worst day. Don't talk to me", "Beach with the family", None]
+BIOS = ["Soccer | class of 2026", "just vibing", "", "Art account, DMs open", "leave me alone"]
+QUOTES = ["Nobody understands me", "Good vibes only", "Monday again", "I feel so alone", "Best day ever",
+          "Stay strong", "Game day", "Can't sleep"]
+STUDENT_TEXTS = ["I had a great weekend with my friends", "I don't want to talk about it", "School is fine I guess",
+                 "I feel hopeless and alone", ""]
+
+
+def make_image(index: int) -> bytes:
+    # A 1080 pixel JPEG like the posts Instagram serves; every other one is a quote graphic for OCR to read
+    rng = np.random.default_rng(index)
+    pixels = cv2.resize(rng.integers(0, 256, (6, 6, 3), dtype=np.uint8), (1080, 1080), interpolation=cv2.INTER_CUBIC)
+    if index % 2 == 0:
+        cv2.putText(pixels, QUOTES[index // 2 % len(QUOTES)], (80, 540), cv2.FONT_HERSHEY_SIMPLEX, 2.5,
+                    (255, 255, 255), 6)
+    return cv2.imencode(".jpg", pixels, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+
+
+def write_fixtures(directory: str, profile_count: int) -> list[str]:
+    images = [instagram_stub.write_image(directory, f"pool{index}.jpg", make_image(index))
+              for index in range(IMAGE_POOL)]
+
+    generator = random.Random(0)
+    usernames = [f"student{number}" for number in range(profile_count)]
+    for username in usernames:
+        posts = [(generator.choice(CAPTIONS), datetime.datetime(2024, 6, 1) - datetime.timedelta(days=7 * index),
+                  generator.choice(images)) for index in range(POSTS_PER_PROFILE)]
+        instagram_stub.write_profile(directory, username, generator.choice(BIOS), posts)
+
+    return usernames
+
+
+def fixture_usernames(directory: str) -> list[str]:
+    return sorted(name[:-len(".json")] for name in os.listdir(os.path.join(directory, "profiles"))
+                  if name.endswith(".json"))
+
+
+def fixture_images(directory: str, count: int) -> list[bytes]:
+    names = sorted(os.listdir(os.path.join(directory, "images")))
+    images = []
+    for name in names[:count]:
+        with open(os.path.join(directory, "images", name), "rb") as file:
+            images.append(file.read())
+    return images
+
+
+def student_lines(usernames: list[str], count: int) -> list[str]:
+    # Students cycle through the fixture profiles, so any number of them can be assessed against a small store
+    generator = random.Random(1)
+    lines = []
+    for number in range(count):
+        grades = "; ".join(f"math={generator.randint(40, 100)}, english={generator.randint(40, 100)}"
+                           for _ in range(generator.randint(2, 4)))
+        lines.append(f"Student {number}@{usernames[number % len(usernames)]}: {grades}: "
+                     f"{generator.choice(STUDENT_TEXTS)}\n")
+    return lines
+
+
+def best_of(repeats: int, run, prepare=None) -> float:
+    # Seconds for the fastest of repeats runs; prepare is called before each one, outside the timing
+    times = []
+    for _ in range(repeats):
+        if prepare is not None:
+            prepare()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def reset_ocr_cache(directory: str):
+    # Every run starts cold, so repeated images are only saved from OCR within a run, as they would be in a real one
+    health_assessment.ocr_results.close()
+    path = os.path.join(directory, "ocr.sqlite3")
+    if os.path.exists(path):
+        os.remove(path)
+    health_assessment.ocr_results = ocr_cache.OcrCache(path)
+
+
+def run_benchmarks(fixtures_directory: str, student_counts, repeats: int, image_text: bool) -> dict[str, float]:
+    results = {}
+    usernames = fixture_usernames(fixtures_directory)
+    server = instagram_stub.StubServer(fixtures_directory).start()
+    health_assessment.fetch_engine = instagram_fetch.InstagramFetchEngine(stub_url=server.url)
+    scratch_directory = tempfile.TemporaryDirectory()
+
+    generator = random.Random(2)
+    texts = [" ".join(generator.choices([caption for caption in CAPTIONS if caption is not None], k=3))
+             for _ in range(TEXT_COUNT)]
+    health_assessment.text_health_analysis(texts[0])  # Load the lexicon before timing
+    elapsed = best_of(repeats, lambda: [health_assessment.text_health_analysis(text) for text in texts])
+    results["text_scoring (texts/s)"] = TEXT_COUNT / elapsed
+
+    images = fixture_images(fixtures_directory, IMAGE_POOL)
+    images = [images[index % len(images)] for index in range(BRIGHTNESS_IMAGES)]
+    profile = InstagramProfile("benchmark")
+
+    def prepare_posts():
+        profile.posts = [InstagramPost("Caption", datetime.datetime(2024, 6, 1), "", caption_score=0.5, image=image)
+                         for image in images]
+
+    elapsed = best_of(repeats, lambda: instagram_fetch.decode_post_images(profile, ScanOptions(image_brightness=True)),
+                      prepare_posts)
+    results["brightness (images/s)"] = BRIGHTNESS_IMAGES / elapsed
+
+    if importlib.util.find_spec("easyocr") is None:
+        print("EasyOCR isn't installed, so OCR is not benchmarked", file=sys.stderr)
+    else:
+        pixels = [cv2.imdecode(np.frombuffer(image, dtype=np.uint8), cv2.IMREAD_COLOR) for image in images[:IMAGE_POOL]]
+        health_assessment.get_ocr_backend().readtext(pixels[0])  # Load the model before timing
+        elapsed = best_of(repeats, lambda: [health_assessment.read_image_text(image) for image in pixels],
+                          lambda: reset_ocr_cache(scratch_directory.name))
+        results["ocr (images/s)"] = len(pixels) / elapsed
+
+    options = ScanOptions(image_text=image_text, image_brightness=True)
+    for count in student_counts:
+        lines = student_lines(usernames, count)
+
+        def assess():
+            assessment_run = health_assessment.assess_students(student_list.read_student_list(lines), options)
+            if assessment_run.failed > 0:
+                raise RuntimeError(f"{assessment_run.failed} assessments failed: {assessment_run.failures}")
+
+        def prepare():
+            reset_ocr_cache(scratch_directory.name)
+            health_assessment.tracer.clear()
+
+        elapsed = best_of(repeats, assess, prepare)
+        results[f"mass_assessment_{count} (students/s)"] = count / elapsed
+
+    # Where the time went in the last (largest) run, from the assessment's own tracing
+    stages = health_assessment.tracer.report()["stages"]
+    print("Stage seconds in the last run (summed over worker threads): " + ", ".join(
+        f"{stage} {round(stats['seconds'], 3)}"
+        for stage, stats in sorted(stages.items(), key=lambda item: -item[1]["seconds"])), file=sys.stderr)
+
+    health_assessment.fetch_engine.close()
+    health_assessment.ocr_results.close()
+    scratch_directory.cleanup()
+    server.stop()
+    return results
+
+
+def compare(results: dict[str, float], baseline: dict[str, float], tolerance: float) -> list[str]:
+    regressions = []
+    for name, throughput in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            print(f"{name}: {round(throughput, 2)} (no baseline)")
+            continue
+
+        change = throughput / reference - 1
+        regressed = change < -tolerance
+        print(f"{name}: {round(throughput, 2)} (baseline {round(reference, 2)}, {change:+.1%})"
+              f"{'  REGRESSION' if regressed else ''}")
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def main(arguments=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the assessment offline and check for regressions.")
+    parser.add_argument("--fixtures", help="recorded fixture store to serve (default: generate synthetic fixtures)")
+    parser.add_argument("--students", type=int, nargs="+", default=STUDENT_COUNTS,
+                        help="numbers of students to mass assess")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS)
+    parser.add_argument("--image-text", action="store_true", help="scan image text in the mass assessments")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="fraction of baseline throughput that can be lost before it counts as a regression")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    arguments = parser.parse_args(arguments)
+
+    if arguments.fixtures:
+        results = run_benchmarks(arguments.fixtures, arguments.students, arguments.repeats, arguments.image_text)
+    else:
+        with tempfile.TemporaryDirectory() as fixtures_directory:
+            write_fixtures(fixtures_directory, max(arguments.students))
+            results = run_benchmarks(fixtures_directory, arguments.students, arguments.repeats, arguments.image_text)
+
+    if arguments.save_baseline:
+        with open(arguments.baseline, "w", encoding="utf-8") as file:
+            json.dump({"platform": platform.platform(), "results": results}, file, indent=2)
+        for name, throughput in results.items():
+            print(f"{name}: {round(throughput, 2)}")
+        print(f"Saved as the baseline in {arguments.baseline}")
+        return 0
+
+    if not os.path.exists(arguments.baseline):
+        compare(results, {}, arguments.tolerance)
+        print(f"No baseline at {arguments.baseline} yet; run with --save-baseline to store one")
+        return 0
+
+    with open(arguments.baseline, encoding="utf-8") as file:
+        baseline = json.load(file)
+    if baseline["platform"] != platform.platform():
+        print(f"The baseline was recorded on {baseline['platform']}, so the comparison is only rough",
+              file=sys.stderr)
+
+    regressions = compare(results, baseline["results"], arguments.tolerance)
+    if len(regressions) > 0:
+        print(f"{len(regressions)} regression(s) of more than {arguments.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,37 +1,408 @@
+import concurrent.futures
+import csv
+import datetime
+import importlib.util
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
 import unittest
+import unittest.mock
 import sys
+import time
 
 sys.path.insert(1, "../app")
 
-import main
+import cv2
+import numpy as np
+
+import assessment_cache
+import health_assessment
+import image_features
+import grade_store
+import instagram_fetch
+import instagram_stub
+import ocr_batching
+import ocr_cache
+import ocr_preprocessing
+import ocr_workers
+import profile_cache
+import result_export
+import results_table
+import scheduler
+import student_list
+import tracing
+from assessment_run import AssessmentRun
+from grade_store import GradeStore
+from instagram_fetch import ScanOptions
+from lazy_resources import LazyResource
+from student_list import StudentListError, StudentRecord
 
 
 class TestTextHealthAssessment(unittest.TestCase):
     def test_positivity(self):
         positive_text = "I love life. I am so happy. The world is beautiful."
-        positive_results = main.text_health_analysis(positive_text)
+        positive_results = health_assessment.text_health_analysis(positive_text)
         self.assertGreater(positive_results, 0.5)
 
     def test_negativity(self):
         negative_text = "I hate the world. I am so sad. Life is terrible."
-        negative_results = main.text_health_analysis(negative_text)
+        negative_results = health_assessment.text_health_analysis(negative_text)
         self.assertLess(negative_results, -0.5)
 
 
+class TestTextScorer(unittest.TestCase):
+    sample_captions = [
+        "I love life. I am so happy. The world is beautiful.",
+        "I hate the world. I am so sad. Life is terrible.",
+        "Game day!!! Let's go team 🏈",
+        "can't sleep again... everything feels pointless :(",
+        "Best birthday ever, thank you all so much <3",
+        "Nobody would even notice if I was gone",
+        "Drunk at the beach lol, don't tell mom",
+        "Not bad, not great. Kind of a boring week?",
+        "This is the worst. I'm never going back there. Hate it!!",
+        "Shooting hoops with the squad after practice",
+        "RIP grandpa. Miss you every day.",
+        "New PR on the mile today, 5:42!",
+        "Why does everyone lie to me??",
+        "sooo tired of this school but at least summer is close",
+        "#depressed #alone #whatever",
+        "",
+    ]
+
+    legacy_concerning_words = ['kill', 'die', 'death', 'hate', 'destroy', 'massacre',
+                               'slaughter', 'depression', 'depressed', 'sad', 'sadness', 'suicide', 'murder', 'hatred',
+                               'booze', 'drunk', 'beer', 'lie', 'liar', 'killer', 'murderer', 'bomb', 'shoot',
+                               'bombing', 'shooting', 'shooter']
+
+    def legacy_score(self, text):
+        analyzer_text = health_assessment.preprocess_text(text)
+
+        health_score = 0.0
+        for word in analyzer_text.split(" "):
+            word_score = health_assessment.sentiment_analyzer.get().polarity_scores(word)
+            if word_score["neg"] == 1:
+                health_score += health_assessment.sentiment_analyzer.get().polarity_scores(word)["compound"] / 1.5
+
+            if word in self.legacy_concerning_words:
+                health_score -= 0.5
+
+        health_score += health_assessment.sentiment_analyzer.get().polarity_scores(analyzer_text)["compound"] * 3
+
+        return health_score
+
+    def test_matches_legacy_scoring(self):
+        for caption in self.sample_captions:
+            with self.subTest(caption=caption):
+                self.assertAlmostEqual(health_assessment.text_health_analysis(caption), self.legacy_score(caption))
+
+    def test_word_penalty_matches_vader(self):
+        words = list(health_assessment.sentiment_analyzer.get().lexicon) + ["", "no", "but", "sad!", "bad??", "can't",
+                                                                            ":(", "😢"]
+        for word in words:
+            word_score = health_assessment.sentiment_analyzer.get().polarity_scores(word)
+            expected = word_score["compound"] / 1.5 if word_score["neg"] == 1 else 0.0
+            self.assertEqual(health_assessment.text_scorer.get().word_penalty(word), expected, word)
+
+    def test_concerning_phrases(self):
+        matcher = health_assessment.text_scoring.term_matcher.TermMatcher({("kill",): 0.5, ("kill", "myself"): 1.0,
+                                                              ("want", "to", "die"): 1.0, ("die",): 0.5})
+        self.assertEqual(matcher.penalty(["i", "want", "to", "kill", "myself"]), 1.5)
+        self.assertEqual(matcher.penalty(["i", "want", "to", "die"]), 1.5)
+        self.assertEqual(matcher.penalty(["want", "to", "want", "to", "die", "die"]), 2.0)
+        self.assertEqual(matcher.penalty(["myself", "kill"]), 0.5)
+        self.assertEqual(matcher.penalty([]), 0.0)
+
+        self.assertLess(health_assessment.text_health_analysis("I want to kill myself"),
+                        health_assessment.text_health_analysis("I want to kill"))
+
+    def test_batch_matches_scalar(self):
+        batch_results = health_assessment.text_health_analysis_batch(self.sample_captions)
+        self.assertEqual(len(batch_results), len(self.sample_captions))
+        for caption, batch_result in zip(self.sample_captions, batch_results):
+            self.assertAlmostEqual(batch_result, health_assessment.text_health_analysis(caption))
+
+
+class TestGradeStore(unittest.TestCase):
+    def test_round_trip(self):
+        store = GradeStore(capacity=1, subject_capacity=1)
+        store.set_grades("Al@", [{"math": 0.5, "art": 0.9}, {"math": 0.7}])
+        store.set_grades("Bea@", [{}, {"science": 0.8}])
+        store.set_grade("Bea@", grade_store.PREVIOUS, "science", 0.6)
+
+        self.assertEqual(store.get("Al@"), [{"math": 0.5, "art": 0.9}, {"math": 0.7}])
+        self.assertEqual(store.get("Bea@"), [{"science": 0.6}, {"science": 0.8}])
+        self.assertEqual(store.subjects, ["math", "art", "science"])
+
+        store.clear_term("Al@", grade_store.CURRENT)
+        self.assertEqual(store.get("Al@"), [{"math": 0.5, "art": 0.9}, {}])
+
+        store.remove("Al@")
+        self.assertNotIn("Al@", store)
+        store.set_grades("Cat@", [{}, {"art": 0.5}])
+        self.assertEqual(store.rows["Cat@"], 0)  # The removed student's row is reused, without their grades
+        self.assertEqual(store.get("Cat@"), [{}, {"art": 0.5}])
+
+    def test_batch_matches_scalar(self):
+        random = np.random.default_rng(3)
+        subjects = ["math", "science", "english", "history", "art", "music"]
+        store = GradeStore(capacity=4, subject_capacity=2)
+        roster = {}
+
+        for number in range(300):
+            grades = [{subject: round(random.uniform(0.3, 1.0), 2) for subject in subjects
+                       if random.random() < 0.7} for _ in range(2)]
+            roster[f"student{number}@"] = grades
+            store.set_grades(f"student{number}@", grades)
+
+        batch = health_assessment.grades_health_assessment_batch(store)
+        scores = health_assessment.grades_health_scores(store)
+
+        for name, grades in roster.items():
+            # The original per-student scoring: with two terms, the mean change of the subjects graded in both
+            changes = [grades[1][subject] - grades[0][subject] for subject in grades[1] if subject in grades[0]]
+            expected = sum(change * 2.5 for change in changes) / len(changes) if len(changes) > 0 else 0.0
+
+            self.assertAlmostEqual(batch[name].overall_health_score, expected)
+            self.assertAlmostEqual(scores[store.rows[name]], expected)
+            self.assertEqual({result.subject for result in batch[name].results},
+                             {subject for subject in grades[1] if subject in grades[0]})
+            for result in batch[name].results:
+                self.assertAlmostEqual(result.change, grades[1][result.subject] - grades[0][result.subject])
+
+    def test_history_score(self):
+        assessment = health_assessment.grades_health_assessment([{"math": 0.9}, {"math": 0.6, "art": 0.7},
+                                                                 {"math": 0.6, "art": 0.8}])
+
+        # math: slope -0.15, a sudden drop of 0.3, and steps of -0.3 and 0 (volatility 0.15); art: slope 0.1
+        math_score = -0.15 * 2.5 - health_assessment.SUDDEN_DROP_PENALTY - 0.15 * health_assessment.VOLATILITY_PENALTY
+        self.assertAlmostEqual(assessment.overall_health_score, (math_score + 0.1 * 2.5) / 2)
+        results = {result.subject: result for result in assessment.results}
+        self.assertTrue(results["math"].sudden_drop)
+        self.assertFalse(results["art"].sudden_drop)
+
+    def test_term_history(self):
+        store = GradeStore(capacity=1, subject_capacity=1, term_capacity=2)
+        store.set_grades("Al@", [{"math": 0.9}, {"math": 0.8}, {}, {"math": 0.6, "art": 0.7}])
+        store.set_grades("Bea@", [{"math": 0.5}, {"math": 0.6}])
+
+        # Terms are right-aligned, so PREVIOUS and CURRENT are the last two terms of any history
+        self.assertEqual(store.get("Al@"), [{"math": 0.9}, {"math": 0.8}, {}, {"math": 0.6, "art": 0.7}])
+        self.assertEqual(store.term_grades("Al@", grade_store.PREVIOUS), {})
+        self.assertEqual(store.term_grades("Bea@", grade_store.PREVIOUS), {"math": 0.5})
+        self.assertEqual(store.current[store.rows["Bea@"], 0], 0.6)
+        with self.assertRaises(IndexError):
+            store.term_grades("Bea@", 2)
+
+    def test_trends_match_per_subject_fit(self):
+        random = np.random.default_rng(5)
+        grades = random.uniform(0.3, 1.0, (200, 8, 5))
+        mask = random.random((200, 8, 5)) < 0.7
+        trends = grade_store.grade_trends(grades, mask)
+
+        for student in range(200):
+            for subject in range(5):
+                terms = np.flatnonzero(mask[student, :, subject])
+                values = grades[student, terms, subject]
+                self.assertEqual(trends.terms[student, subject], len(terms))
+                if len(terms) < 2:
+                    self.assertEqual(trends.slope[student, subject], 0.0)
+                    continue
+
+                steps = np.diff(values)
+                self.assertAlmostEqual(trends.slope[student, subject], np.polyfit(terms, values, 1)[0])
+                self.assertAlmostEqual(trends.largest_drop[student, subject], min(steps.min(), 0.0))
+                self.assertAlmostEqual(trends.volatility[student, subject], steps.std())
+
+    def test_trend_scoring(self):
+        steady = health_assessment.grades_health_assessment([{"math": 0.8}, {"math": 0.8}, {"math": 0.8},
+                                                             {"math": 0.8}])
+        sudden_drop = health_assessment.grades_health_assessment([{"math": 0.8}, {"math": 0.8}, {"math": 0.8},
+                                                                  {"math": 0.6}])
+        two_terms = health_assessment.grades_health_assessment([{"math": 0.8}, {"math": 0.6}])
+
+        self.assertEqual(steady.overall_health_score, 0.0)
+        self.assertEqual(steady.results[0].series, [0.8, 0.8, 0.8, 0.8])
+        self.assertTrue(sudden_drop.results[0].sudden_drop)
+        self.assertAlmostEqual(sudden_drop.results[0].largest_drop, -0.2)
+        self.assertLess(sudden_drop.overall_health_score, two_terms.overall_health_score)
+
+        # With only two terms, scoring is unchanged: the difference, scaled by 2.5
+        self.assertFalse(two_terms.results[0].sudden_drop)
+        self.assertAlmostEqual(two_terms.overall_health_score, -0.5)
+
+        gap = health_assessment.grades_health_assessment([{"math": 0.8, "art": 0.5}, {}, {"math": 0.6}])
+        self.assertEqual([result.subject for result in gap.results], ["math"])
+        self.assertEqual(gap.results[0].series, [0.8, None, 0.6])
+        self.assertAlmostEqual(gap.results[0].change, -0.1)  # Per term, across the missing one
+
+
+
+class TestStudentList(unittest.TestCase):
+    def test_line_formats(self):
+        self.assertEqual(student_list.parse_student_line("Al Smith@AlSmith\n", 1),
+                         StudentRecord("Al Smith@alsmith", [{}, {}], "", 1))
+        self.assertEqual(student_list.parse_student_line("@bob: Math=80, Science=90; math=70, science=95\n"),
+                         StudentRecord("@bob", [{"math": 0.8, "science": 0.9}, {"math": 0.7, "science": 0.95}]))
+        self.assertEqual(student_list.parse_student_line("Cat: math=80; math=85: Feeling great today\n"),
+                         StudentRecord("@cat", [{"math": 0.8}, {"math": 0.85}], "Feeling great today"))
+        self.assertEqual(student_list.parse_student_line("@dee: math=60; math=70, art=50; math=65\n"),
+                         StudentRecord("@dee", [{"math": 0.6}, {"math": 0.7, "art": 0.5}, {"math": 0.65}]))
+        self.assertIsNone(student_list.parse_student_line("   \n"))
+
+    def test_text_with_colons(self):
+        self.assertEqual(student_list.parse_student_line("Cat: math=80; math=85: Note: talked to counselor at 3:30\n"),
+                         StudentRecord("@cat", [{"math": 0.8}, {"math": 0.85}], "Note: talked to counselor at 3:30"))
+
+    def test_errors_have_line_numbers(self):
+        lines = ["@amy\n", "\n", "@: math=80; math=85\n", "dan: math=eighty; math=85: hi\n", "a:b:c:d\n",
+                 "eve: math=80\n"]
+        errors = []
+        records = list(student_list.read_student_list(lines, errors.append))
+
+        # Students with bad grades are kept without them; lines without a usable name are skipped
+        self.assertEqual([(record.student_name, record.grades, record.line_number) for record in records],
+                         [("@amy", [{}, {}], 1), ("@dan", [{}, {}], 4), ("@a", [{}, {}], 5), ("@eve", [{}, {}], 6)])
+        self.assertEqual([error.line_number for error in errors], [3, 4, 5, 6])
+        self.assertIn("math", errors[1].message)
+
+        with self.assertRaises(StudentListError) as raised:
+            list(student_list.read_student_list(lines))
+        self.assertEqual(raised.exception.line_number, 3)
+
+    def test_streams_lazily(self):
+        def lines():
+            yield "@amy\n"
+            raise AssertionError("read past the first student")
+
+        self.assertEqual(next(student_list.read_student_list(lines())).student_name, "@amy")
+
+
+class TestAssessStudents(unittest.TestCase):
+    def test_grades_and_text_without_instagram(self):
+        errors = []
+        records = student_list.read_student_list([
+            "Al@: math=70; math=50: I feel hopeless and alone\n",
+            "Bea@: math=50; math=90\n",
+            "Bea@: math=50; math=70: I love my friends\n",  # Only the first listing is assessed
+        ])
+
+        assessment_run = health_assessment.assess_students(records, cpu_workers=2, on_error=errors.append)
+
+        self.assertEqual(assessment_run.failed, 0)
+        results = {result[0]: result for result in assessment_run.results}
+        self.assertEqual(set(results), {"Al", "Bea"})
+        self.assertLess(results["Al"][2], 0)
+        self.assertAlmostEqual(results["Bea"][2], 1.0)
+        self.assertEqual([error.line_number for error in errors], [3])
+        self.assertEqual(len(health_assessment.csv_row(results["Al"])), len(health_assessment.CSV_HEADER))
+
+    def test_assessment_starts_while_reading(self):
+        started = threading.Event()
+        run_basic_health_assessment = health_assessment.run_basic_health_assessment
+
+        def run_and_signal(*arguments, **keywords):
+            started.set()
+            return run_basic_health_assessment(*arguments, **keywords)
+
+        def records():
+            yield StudentRecord("Al@", [{"math": 0.5}, {"math": 0.6}], line_number=1)
+            self.assertTrue(started.wait(5))  # The first student is assessed before the list is finished
+            yield StudentRecord("Bea@", line_number=2)
+
+        with unittest.mock.patch.object(health_assessment, "run_basic_health_assessment", run_and_signal):
+            assessment_run = health_assessment.assess_students(records(), cpu_workers=1)
+
+        self.assertEqual(assessment_run.completed, 2)
+
+    def test_no_students(self):
+        self.assertEqual(health_assessment.assess_students([]).results, [])
+
+    def test_read_error_cancels(self):
+        schedulers = []
+
+        class RecordingScheduler(scheduler.AssessmentScheduler):
+            def __init__(self, *arguments):
+                super().__init__(*arguments)
+                self.cancel = unittest.mock.Mock(wraps=self.cancel)
+                self.shutdown = unittest.mock.Mock(wraps=self.shutdown)
+                schedulers.append(self)
+
+        def records():
+            yield StudentRecord("Al@", [{"math": 0.5}, {"math": 0.6}], line_number=1)
+            raise StudentListError(2, "Unreadable line")
+
+        with unittest.mock.patch.object(scheduler, "AssessmentScheduler", RecordingScheduler):
+            with self.assertRaises(StudentListError):
+                health_assessment.assess_students(records(), cpu_workers=1)
+
+        schedulers[0].cancel.assert_called_once()
+        schedulers[0].shutdown.assert_called_once()
+        self.assertTrue(schedulers[0].cancelled)
+
+
+class TestTracing(unittest.TestCase):
+    def test_stages_per_student(self):
+        tracer = tracing.Tracer()
+
+        @tracer.traced("scoring")
+        def score(student_name):
+            if student_name == "Bea":
+                raise ValueError("Unreadable text")
+
+        with concurrent.futures.ThreadPoolExecutor(2) as pool:
+            futures = [pool.submit(tracer.for_student(name, score), name) for name in ("Al", "Bea", "Al")]
+        self.assertIsInstance(futures[1].exception(), ValueError)
+
+        with tracer.span("loading"):
+            pass
+
+        report = tracer.report()
+        self.assertEqual((report["stages"]["scoring"]["calls"], report["stages"]["scoring"]["errors"]), (3, 1))
+        self.assertEqual(report["students"]["Al"]["scoring"]["calls"], 2)
+        self.assertEqual(report["students"]["Bea"]["scoring"]["errors"], 1)
+        self.assertEqual(report["stages"]["loading"]["calls"], 1)  # Not while assessing a student
+        self.assertEqual(set(report["students"]), {"Al", "Bea"})
+
+    def test_prometheus_text(self):
+        tracer = tracing.Tracer()
+        tracer.record("ocr", 0.002)
+        tracer.record("ocr", 2.0, error=True)
+
+        lines = tracer.prometheus_text().splitlines()
+        self.assertIn('socialscanner_stage_duration_seconds_bucket{stage="ocr",le="0.001"} 0', lines)
+        self.assertIn('socialscanner_stage_duration_seconds_bucket{stage="ocr",le="0.005"} 1', lines)
+        self.assertIn('socialscanner_stage_duration_seconds_bucket{stage="ocr",le="+Inf"} 2', lines)
+        self.assertIn('socialscanner_stage_duration_seconds_count{stage="ocr"} 2', lines)
+        self.assertIn('socialscanner_stage_errors_total{stage="ocr"} 1', lines)
+
+    def test_assessments_traced(self):
+        health_assessment.tracer.clear()
+        health_assessment.assess_students(student_list.read_student_list(["Al@: math=70; math=50: I feel alone\n"]))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "trace.json")
+            health_assessment.tracer.write_json(path)
+            with open(path, encoding="utf-8") as file:
+                report = json.load(file)
+
+        self.assertEqual(report["students"]["Al@"]["assessment"]["calls"], 1)
+        self.assertEqual(report["students"]["Al@"]["grades"]["calls"], 1)
+        self.assertEqual(report["students"]["Al@"]["text_scoring"]["calls"], 1)
+
+
 class TestInstagramHealthAssessment(unittest.TestCase):
     def test_positivity(self):
-        main.analyze_brightness.set(True)
-        main.analyze_images.set(True)
-        six_am_success_results = main.instagram_health_assessment(
-            "6amsuccess"
+        six_am_success_results = health_assessment.instagram_health_assessment(
+            "6amsuccess", ScanOptions(image_text=True, image_brightness=True)
         )  # A page that posts motivational quotes
         self.assertGreater(six_am_success_results.overall_health_score, 0.5)
 
     def test_negativity(self):
-        main.analyze_brightness.set(True)
-        main.analyze_images.set(True)
-        serial_killers_podcast_results = main.instagram_health_assessment(
-            "serialkillerspodcast"
+        serial_killers_podcast_results = health_assessment.instagram_health_assessment(
+            "serialkillerspodcast", ScanOptions(image_text=True, image_brightness=True)
         )  # A page written by a person obsessed with serial killers
         self.assertLess(serial_killers_podcast_results.overall_health_score, -0.5)
 
@@ -42,7 +413,7 @@ class TestGradesHealthAssessment(unittest.TestCase):
             {"math": 0.5, "science": 0.6, "english": 0.7},
             {"math": 0.7, "science": 0.7, "english": 0.7},
         ]
-        grade_improvement_results = main.grades_health_assessment(grade_improvement)
+        grade_improvement_results = health_assessment.grades_health_assessment(grade_improvement)
         self.assertAlmostEqual(grade_improvement_results.overall_health_score, 0.1)
 
     def test_negativity(self):
@@ -50,9 +421,574 @@ class TestGradesHealthAssessment(unittest.TestCase):
             {"math": 0.7, "science": 0.7, "english": 0.7},
             {"math": 0.5, "science": 0.6, "english": 0.7},
         ]
-        grade_decline_results = main.grades_health_assessment(grade_decline)
+        grade_decline_results = health_assessment.grades_health_assessment(grade_decline)
         self.assertAlmostEqual(grade_decline_results.overall_health_score, -0.1)
 
 
+class TestResultsView(unittest.TestCase):
+    def test_sort_and_filter(self):
+        results = [("Cat", "", 0.7), ("al", "", -0.8), ("Bea", "", 0.2), ("Dan", "", 0.0), ("Eve", "", -0.1)]
+        view = results_table.ResultsView(results)
+
+        self.assertEqual([result[0] for result in view], ["al", "Eve", "Dan", "Bea", "Cat"])
+        self.assertEqual(view.band_counts(), {results_table.RED: 1, results_table.ORANGE: 1, results_table.YELLOW: 1,
+                                              results_table.GREEN: 1, results_table.UNSCORED: 1})
+
+        view.filter([results_table.RED, results_table.GREEN, results_table.UNSCORED])
+        self.assertEqual([result[0] for result in view], ["al", "Dan", "Cat"])
+
+        # The filter is kept when the view is re-sorted
+        view.sort(results_table.NAME)
+        self.assertEqual([result[0] for result in view], ["al", "Cat", "Dan"])
+        view.sort(results_table.SCORE, descending=True)
+        self.assertEqual([result[0] for result in view], ["Cat", "Dan", "al"])
+
+        self.assertEqual([results_table.score_band(result[2]) for result in results],
+                         [results_table.BANDS[band] for band in view.bands])
+
+
+class TestAssessmentScheduler(unittest.TestCase):
+    def collect_events(self, assessment_scheduler):
+        events = [assessment_scheduler.events.get(timeout=5) for _ in range(assessment_scheduler.submitted)]
+        assessment_scheduler.shutdown()
+        return {event.key: event for event in events}
+
+    def test_stages_run_in_order(self):
+        assessment_scheduler = scheduler.AssessmentScheduler(io_workers=2, cpu_workers=2)
+        for number in range(10):
+            assessment_scheduler.submit(str(number), [
+                (scheduler.IO, lambda number=number: number),
+                (scheduler.CPU, lambda value: value * 2),
+                (scheduler.IO, lambda value: value + 1),
+            ])
+        assessment_scheduler.submit("error", [(scheduler.CPU, lambda: 1 / 0)])
+
+        events = self.collect_events(assessment_scheduler)
+        for number in range(10):
+            self.assertEqual(events[str(number)].result, number * 2 + 1)
+        self.assertIsInstance(events["error"].error, ZeroDivisionError)
+
+    def test_cancel(self):
+        assessment_scheduler = scheduler.AssessmentScheduler(io_workers=1, cpu_workers=1)
+        for number in range(10):
+            assessment_scheduler.submit(str(number), [
+                (scheduler.IO, lambda: time.sleep(0.05)),
+                (scheduler.CPU, lambda value: "done"),
+            ])
+        assessment_scheduler.cancel()
+
+        events = self.collect_events(assessment_scheduler)
+        self.assertEqual(len(events), 10)
+        self.assertTrue(any(event.cancelled for event in events.values()))
+
+
+class TestAssessmentRun(unittest.TestCase):
+    def test_completes_once(self):
+        completions = []
+        assessment_run = AssessmentRun(3, on_complete=completions.append)
+
+        assessment_run.record_result("a", 1)
+        assessment_run.record_result("a", 1)  # Duplicates are ignored
+        assessment_run.record_failure("b", RuntimeError())
+        self.assertFalse(assessment_run.finished)
+
+        assessment_run.record_result("c", 2)
+        assessment_run.record_result("d", 3)
+        self.assertTrue(assessment_run.finished)
+        self.assertEqual(completions, [assessment_run])
+        self.assertEqual((assessment_run.completed, assessment_run.failed), (2, 1))
+        self.assertEqual(assessment_run.results, [1, 2])
+
+    def test_open_ended_total(self):
+        completions = []
+        assessment_run = AssessmentRun(None, on_complete=completions.append)
+
+        assessment_run.expect()
+        assessment_run.record_result("a", 1)
+        self.assertFalse(assessment_run.finished)  # More students may still be coming
+
+        assessment_run.expect()
+        assessment_run.close()
+        self.assertFalse(assessment_run.finished)
+        assessment_run.record_result("b", 2)
+        self.assertEqual(completions, [assessment_run])
+
+    def test_streamed_results(self):
+        streamed = []
+        assessment_run = AssessmentRun(2, on_result=streamed.append, keep_results=False)
+
+        assessment_run.record_result("a", 1)
+        assessment_run.record_result("a", 1)
+        assessment_run.record_result("b", 2)
+        self.assertEqual(streamed, [1, 2])
+        self.assertEqual(assessment_run.results, [])
+        self.assertTrue(assessment_run.finished)
+
+
+class TestResultExport(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+        profile = instagram_fetch.InstagramProfile("stubuser", "Just a test account", [
+            instagram_fetch.InstagramPost("What a great day", datetime.datetime(2024, 5, 1), "", "abc"),
+            instagram_fetch.InstagramPost(None, datetime.datetime(2024, 4, 1), ""),
+        ])
+        profile = health_assessment.score_instagram_captions(profile)
+        self.results = [
+            health_assessment.run_basic_health_assessment("Al@stubuser", [{"math": 0.5}, {}, {"math": 0.7}],
+                                                          "I feel fine", profile),
+            health_assessment.run_basic_health_assessment("Bea@", [{}, {}]),
+        ]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def read_table(self, table: str) -> list:
+        with open(os.path.join(self.directory.name, f"{table}.jsonl"), encoding="utf-8") as file:
+            return [json.loads(line) for line in file]
+
+    def test_structured_posts(self):
+        posts = self.results[0][3].results
+        self.assertEqual([post.kind for post in posts], [health_assessment.BIO, health_assessment.POST])
+        self.assertEqual((posts[1].shortcode, posts[1].post_caption), ("abc", "What a great day"))
+        self.assertIsNone(posts[1].image_text)
+        self.assertEqual(self.results[1][3].results[0].kind, health_assessment.ERROR)
+
+    def test_json_lines(self):
+        with result_export.ResultExporter(self.directory.name, result_export.JSONL) as exporter:
+            exporter.write(self.results[0])
+            self.assertEqual(len(self.read_table(result_export.STUDENTS)), 1)  # Written as soon as it arrives
+            exporter.write(self.results[1])
+
+        students = self.read_table(result_export.STUDENTS)
+        self.assertEqual([student["student"] for student in students], ["Al@stubuser", "Bea"])
+        self.assertEqual(students[0]["text_content"], "I feel fine")
+
+        posts = self.read_table(result_export.INSTAGRAM_POSTS)
+        self.assertEqual([(post["student"], post["position"], post["kind"]) for post in posts],
+                         [("Al@stubuser", 0, "bio"), ("Al@stubuser", 1, "post"), ("Bea", 0, "error")])
+        self.assertEqual(posts[1]["date"], "2024-05-01T00:00:00")
+
+        grade_changes = self.read_table(result_export.GRADE_CHANGES)
+        self.assertEqual(len(grade_changes), 1)
+        self.assertEqual(grade_changes[0]["series"], [0.5, None, 0.7])
+
+    def test_csv(self):
+        with result_export.ResultExporter(self.directory.name) as exporter:
+            for result in self.results:
+                exporter.write(result)
+
+        with open(os.path.join(self.directory.name, "grade_changes.csv"), encoding="utf-8") as file:
+            rows = list(csv.reader(file))
+        self.assertEqual(rows[0], [name for name, _ in result_export.TABLES[result_export.GRADE_CHANGES]])
+        self.assertEqual(rows[1][-1], "0.5;;0.7")
+
+    def test_parquet(self):
+        try:
+            import pyarrow.parquet
+        except ImportError:
+            self.skipTest("pyarrow is not installed")
+
+        with result_export.ResultExporter(self.directory.name, result_export.PARQUET) as exporter:
+            for result in self.results:
+                exporter.write(result)
+
+        table = pyarrow.parquet.read_table(os.path.join(self.directory.name, "instagram_posts.parquet"))
+        self.assertEqual(table.column("kind").to_pylist(), ["bio", "post", "error"])
+
+
+class TestImageFeatures(unittest.TestCase):
+    def test_features(self):
+        black = image_features.image_features(np.zeros((16, 16, 3), dtype=np.uint8))
+        grey = image_features.image_features(np.full((16, 16, 3), 200, dtype=np.uint8))
+        red = image_features.image_features(np.tile(np.array([0, 0, 255], dtype=np.uint8), (16, 16, 1)))
+
+        self.assertEqual(black[image_features.DARK_RATIO], 1.0)
+        self.assertEqual(grey[image_features.DARK_RATIO], 0.0)
+        self.assertAlmostEqual(float(grey[image_features.BRIGHTNESS]), 200 / 255, places=5)
+        self.assertEqual(grey[image_features.SATURATION], 0.0)
+        self.assertEqual(red[image_features.SATURATION], 1.0)
+        self.assertGreater(red[image_features.COLOURFULNESS], grey[image_features.COLOURFULNESS])
+
+    def test_reduced_decode_matches_full(self):
+        pixels = np.random.default_rng(0).integers(0, 256, (240, 320, 3), dtype=np.uint8)
+        image = cv2.imencode(".jpg", cv2.GaussianBlur(pixels, (9, 9), 0))[1].tobytes()
+        full = image_features.image_features(cv2.imdecode(np.frombuffer(image, dtype=np.uint8), cv2.IMREAD_COLOR))
+        reduced = image_features.decode_reduced(image)
+
+        self.assertEqual(reduced.shape, (60, 80, 3))
+        self.assertAlmostEqual(float(image_features.image_features(reduced)[image_features.BRIGHTNESS]),
+                               float(full[image_features.BRIGHTNESS]), places=2)
+
+
+class TestInstagramFetchEngine(unittest.TestCase):
+    def setUp(self):
+        self.fixtures = tempfile.TemporaryDirectory()
+        instagram_stub.write_profile(self.fixtures.name, "stubuser", "Just a test account", [
+            ("First post", datetime.datetime(2024, 5, 1), b"image-1"),
+            (None, datetime.datetime(2024, 4, 1), b"image-2"),
+        ])
+        self.server = instagram_stub.StubServer(self.fixtures.name).start()
+        self.engine = instagram_fetch.InstagramFetchEngine(stub_url=self.server.url)
+
+    def tearDown(self):
+        self.engine.close()
+        self.server.stop()
+        self.fixtures.cleanup()
+
+    def test_fetch_profile_and_images(self):
+        profile = self.engine.fetch_profile("stubuser")
+        self.assertIsNone(profile.error)
+        self.assertEqual(profile.biography, "Just a test account")
+        self.assertEqual([post.caption for post in profile.posts], ["First post", None])
+
+        profile = self.engine.fetch_images(profile, lambda post: post.caption is None)
+        self.assertEqual([post.image for post in profile.posts], [None, b"image-2"])
+
+    def test_shared_fixture_images(self):
+        instagram_stub.write_image(self.fixtures.name, "shared.jpg", b"shared-image")
+        instagram_stub.write_profile(self.fixtures.name, "reposter", "", [
+            ("Repost", datetime.datetime(2024, 5, 2), "shared.jpg"),
+            ("Repost again", datetime.datetime(2024, 5, 3), "shared.jpg"),
+        ])
+
+        profile = self.engine.fetch_all(["reposter"], lambda post: True)[0]
+        self.assertEqual([post.image for post in profile.posts], [b"shared-image", b"shared-image"])
+
+    def test_decode_once(self):
+        image = cv2.imencode(".png", np.full((8, 8, 3), 120, dtype=np.uint8))[1].tobytes()
+        post = instagram_fetch.InstagramPost("Caption", datetime.datetime(2024, 5, 1), "", image=image)
+        profile = instagram_fetch.decode_post_images(instagram_fetch.InstagramProfile("stubuser", posts=[post]))
+
+        self.assertIsNone(post.image)
+        self.assertEqual(post.pixels.shape, (8, 8, 3))
+        self.assertIs(instagram_fetch.decode_post_images(profile).posts[0].pixels, post.pixels)
+
+    def test_brightness_only_uses_reduced_decode(self):
+        image = cv2.imencode(".png", np.full((64, 64, 3), 120, dtype=np.uint8))[1].tobytes()
+        post = instagram_fetch.InstagramPost("Caption", datetime.datetime(2024, 5, 1), "", caption_score=0.0,
+                                             image=image)
+        instagram_fetch.decode_post_images(instagram_fetch.InstagramProfile("stubuser", posts=[post]),
+                                           ScanOptions(image_brightness=True))
+
+        self.assertIsNone(post.pixels)
+        self.assertAlmostEqual(float(post.features[image_features.BRIGHTNESS]), 120 / 255, places=2)
+
+    def test_missing_profile(self):
+        profiles = self.engine.fetch_all(["missing", "stubuser"], lambda post: True)
+        self.assertIsNotNone(profiles[0].error)
+        self.assertEqual([post.image for post in profiles[1].posts], [b"image-1", b"image-2"])
+
+
+class TestAssessmentCache(unittest.TestCase):
+    def setUp(self):
+        self.fixtures = tempfile.TemporaryDirectory()
+        self.posts = [("What a great day", datetime.datetime(2024, 5, 1), b"image-1"),
+                      ("Feeling low", datetime.datetime(2024, 4, 1), b"image-2")]
+        instagram_stub.write_profile(self.fixtures.name, "stubuser", "Just a test account", self.posts)
+        self.server = instagram_stub.StubServer(self.fixtures.name).start()
+        self.engine = instagram_fetch.InstagramFetchEngine(stub_url=self.server.url)
+        self.cache = assessment_cache.AssessmentCache()
+
+    def tearDown(self):
+        self.engine.close()
+        self.server.stop()
+        self.fixtures.cleanup()
+
+    def assess(self, user_input: str, grades: list, text: str):
+        value = None
+        stages = health_assessment.assessment_stages(user_input, grades, text, ScanOptions(), self.cache)
+        with unittest.mock.patch.object(health_assessment, "fetch_engine", self.engine):
+            for number, (_, stage) in enumerate(stages):
+                value = stage() if number == 0 else stage(value)
+
+        return value
+
+    def test_only_changed_parts_are_recomputed(self):
+        grades = [{"math": 0.5}, {"math": 0.6}]
+        first = self.assess("Al@stubuser", grades, "I feel fine")
+        self.assertEqual(sum(self.cache.hits.values()), 0)
+
+        unchanged = self.assess("Al@stubuser", [{"math": 0.5}, {"math": 0.6}], "I feel fine")
+        self.assertEqual(self.cache.hits, {assessment_cache.INSTAGRAM: 1, assessment_cache.GRADES: 1,
+                                           assessment_cache.TEXT: 1})
+        self.assertIs(unchanged[3], first[3])
+        self.assertEqual(unchanged[2], first[2])
+
+        edited = self.assess("Al@stubuser", grades, "I feel hopeless")
+        self.assertEqual(self.cache.misses[assessment_cache.TEXT], 2)
+        self.assertIs(edited[3], first[3])
+        self.assertLess(edited[5].overall_health_score, first[5].overall_health_score)
+
+        # A new post makes the profile's newest shortcode change
+        instagram_stub.write_profile(self.fixtures.name, "stubuser", "Just a test account",
+                                     [("So sad today", datetime.datetime(2024, 6, 1), b"image-3")] + self.posts)
+        new_post = self.assess("Al@stubuser", grades, "I feel hopeless")
+        self.assertIsNot(new_post[3], first[3])
+        self.assertEqual(len(new_post[3].results), len(first[3].results) + 1)
+
+    def test_failures_are_not_reused(self):
+        self.assertTrue(self.assess("@missing", [], "")[3].results[0].caption.startswith("(ERROR)"))
+        self.assess("@missing", [], "")
+        self.assertEqual(self.cache.hits[assessment_cache.INSTAGRAM], 0)
+
+        self.cache.forget("@missing")
+        self.assess("@missing", [], "")
+        self.assertEqual(self.cache.hits[assessment_cache.TEXT], 1)  # Only the run before forget() was reused
+
+
+class TestProfileCache(unittest.TestCase):
+    def setUp(self):
+        self.fixtures = tempfile.TemporaryDirectory()
+        self.posts = [(f"Post {number}", datetime.datetime(2024, 5, 30) - datetime.timedelta(days=number), b"image")
+                      for number in range(25)]
+        self.server = instagram_stub.StubServer(self.fixtures.name).start()
+        self.cache = profile_cache.ProfileCache(os.path.join(self.fixtures.name, "cache", "profiles.sqlite3"))
+        self.engine = instagram_fetch.InstagramFetchEngine(stub_url=self.server.url, cache=self.cache)
+
+    def tearDown(self):
+        self.engine.close()
+        self.cache.close()
+        self.server.stop()
+        self.fixtures.cleanup()
+
+    def test_only_new_posts_are_fetched(self):
+        instagram_stub.write_profile(self.fixtures.name, "stubuser", "Old bio", self.posts[5:])
+        self.engine.fetch_profile("stubuser")
+
+        # Five newer posts appear, and an older one disappears from the listing but stays in the cache
+        instagram_stub.write_profile(self.fixtures.name, "stubuser", "New bio", self.posts[:6] + self.posts[7:])
+        profile = self.engine.fetch_profile("stubuser")
+
+        self.assertEqual(profile.biography, "New bio")
+        self.assertEqual([post.caption for post in profile.posts], [f"Post {number}" for number in range(20)])
+
+    def test_opened_on_first_use(self):
+        path = os.path.join(self.fixtures.name, "lazy", "profiles.sqlite3")
+        cache = profile_cache.ProfileCache(path)
+        self.assertFalse(os.path.exists(path))
+
+        self.assertIsNone(cache.load("nobody"))
+        self.assertTrue(cache.opened)
+        cache.close()
+        self.assertTrue(os.path.exists(path))
+
+    def test_expiry(self):
+        instagram_stub.write_profile(self.fixtures.name, "stubuser", "Bio", self.posts)
+        self.engine.fetch_profile("stubuser")
+        self.assertIsNotNone(self.cache.load("stubuser"))
+
+        self.cache.ttl = -1
+        self.assertIsNone(self.cache.load("stubuser"))
+
+
+class TestOcrCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "ocr.sqlite3")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_repeated_image_skips_ocr(self):
+        calls = []
+
+        def fake_ocr():
+            calls.append(1)
+            return ["stay positive"]
+
+        image = np.full((8, 8, 3), 200, dtype=np.uint8)
+        key = ocr_cache.image_hash(image)
+        self.assertEqual(key, ocr_cache.image_hash(image.copy()))
+        self.assertNotEqual(key, ocr_cache.image_hash(image[:4]))
+
+        cache = ocr_cache.OcrCache(self.path)
+        self.assertEqual(cache.get_or_compute(key, fake_ocr), ["stay positive"])
+        self.assertEqual(cache.get_or_compute(key, fake_ocr), ["stay positive"])
+        cache.close()
+
+        # Still cached in a later run
+        cache = ocr_cache.OcrCache(self.path)
+        self.assertEqual(cache.get_or_compute(key, fake_ocr), ["stay positive"])
+        cache.close()
+        self.assertEqual(len(calls), 1)
+
+    def test_eviction(self):
+        cache = ocr_cache.OcrCache(self.path, max_bytes=50)
+        for number in range(10):
+            cache.put(f"image{number}", [f"text {number}"])
+            time.sleep(0.001)
+
+        self.assertIsNone(cache.get("image0"))
+        self.assertEqual(cache.get("image9"), ["text 9"])
+        cache.close()
+
+
+class TestOcrPreprocessing(unittest.TestCase):
+    def setUp(self):
+        self.quote = np.full((1080, 1080, 3), 40, dtype=np.uint8)
+        cv2.putText(self.quote, "Stay strong", (80, 540), cv2.FONT_HERSHEY_SIMPLEX, 2.5, (255, 255, 255), 6)
+        self.blank = np.full((1350, 1080, 3), 90, dtype=np.uint8)
+
+    def test_scaled_and_skipped(self):
+        stats = ocr_preprocessing.OcrStats()
+        shapes = []
+
+        def fake_readtext(pixels):
+            shapes.append(pixels.shape)
+            return ["stay strong"]
+
+        self.assertEqual(ocr_preprocessing.read_text(fake_readtext, self.quote, ocr_preprocessing.FAST, stats),
+                         ["stay strong"])
+        self.assertEqual(ocr_preprocessing.read_text(fake_readtext, self.blank, ocr_preprocessing.FAST, stats), [])
+        self.assertEqual(ocr_preprocessing.read_text(fake_readtext, self.blank, ocr_preprocessing.FULL_SIZE),
+                         ["stay strong"])
+
+        self.assertEqual(shapes, [(540, 540, 3), (1350, 1080, 3)])
+        self.assertEqual((stats.images, stats.skipped), (2, 1))
+        self.assertEqual(stats.full_pixels - stats.read_pixels, 1080 * 1080 + 1350 * 1080 - 540 * 540)
+
+    def test_cache_keys(self):
+        key = ocr_cache.image_hash(self.quote)
+        self.assertEqual(ocr_preprocessing.FULL_SIZE.cache_key(key), key)
+        self.assertEqual(len({mode.cache_key(key) for mode in (ocr_preprocessing.FULL_SIZE, ocr_preprocessing.FAST,
+                                                               ocr_preprocessing.OcrMode(540))}), 3)
+
+
+class TestOcrBatcher(unittest.TestCase):
+    class RecordingReader:
+        # Stands in for easyocr.Reader and records how images were grouped
+        def __init__(self):
+            self.calls = []
+
+        def readtext(self, image, detail, paragraph):
+            self.calls.append([image.shape])
+            return [str(image[0, 0, 0])]
+
+        def readtext_batched(self, images, detail, paragraph, batch_size):
+            self.calls.append([image.shape for image in images])
+            return [[str(image[0, 0, 0])] for image in images]
+
+    def test_batches_by_shape(self):
+        reader = self.RecordingReader()
+        batcher = ocr_batching.OcrBatcher(lambda: reader, batch_size=4, max_wait=0.5)
+        images = [np.full((4, 4, 3) if number % 2 == 0 else (6, 4, 3), number, dtype=np.uint8) for number in range(8)]
+
+        with concurrent.futures.ThreadPoolExecutor(8) as pool:
+            results = list(pool.map(batcher.readtext, images))
+        batcher.close()
+
+        self.assertEqual(results, [[str(number)] for number in range(8)])
+        self.assertEqual(batcher.images, 8)
+        self.assertTrue(all(len(set(call)) == 1 for call in reader.calls))
+        self.assertLess(len(reader.calls), 8)
+
+    def test_partial_batch_sent_after_max_wait(self):
+        reader = self.RecordingReader()
+        batcher = ocr_batching.OcrBatcher(lambda: reader, batch_size=16, max_wait=0.01)
+        self.assertEqual(batcher.readtext(np.full((4, 4, 3), 7, dtype=np.uint8)), ["7"])
+        batcher.close()
+        self.assertEqual(reader.calls, [[(4, 4, 3)]])
+
+    def test_failed_load_fails_batch(self):
+        attempts = []
+
+        def load_reader():
+            attempts.append(None)
+            if len(attempts) == 1:
+                raise RuntimeError("Model download failed")
+            return self.RecordingReader()
+
+        batcher = ocr_batching.OcrBatcher(load_reader, max_wait=0.01)
+        image = np.full((4, 4, 3), 7, dtype=np.uint8)
+        with concurrent.futures.ThreadPoolExecutor(1) as pool:
+            with self.assertRaises(RuntimeError):
+                pool.submit(batcher.readtext, image).result(timeout=5)
+
+            # The batcher thread is still running, and loads the Reader again for the next batch
+            self.assertEqual(pool.submit(batcher.readtext, image).result(timeout=5), ["7"])
+        batcher.close()
+
+    def test_configured_backend(self):
+        with unittest.mock.patch.multiple(health_assessment, ocr_backend=None, ocr_batch_size=2, ocr_max_wait=0.5):
+            backend = health_assessment.get_ocr_backend()  # Built from the settings at first use, not import
+            self.assertEqual((backend.batch_size, backend.max_wait), (2, 0.5))
+
+            configured = health_assessment.configure_ocr(batch_size=4, max_wait=0.01)
+            self.assertIs(health_assessment.get_ocr_backend(), configured)
+            self.assertEqual((configured.batch_size, configured.max_wait), (4, 0.01))
+            self.assertFalse(backend._thread.is_alive())  # The replaced backend was closed
+            configured.close()
+
+
+class ShapeReader:
+    # Stands in for easyocr.Reader in the OCR worker processes, reporting what each worker received
+    def __init__(self, languages):
+        self.languages = languages
+
+    def readtext(self, image, detail, paragraph):
+        return [f"{image.shape} {int(image.sum())}", str(os.getpid())]
+
+
+def failing_reader(languages):
+    raise RuntimeError("Model could not be loaded")
+
+
+@unittest.skipUnless("fork" in multiprocessing.get_all_start_methods(), "OCR worker processes need fork")
+@unittest.skipIf(importlib.util.find_spec("easyocr") is None, "OCR worker processes need EasyOCR")
+class TestOcrProcessPool(unittest.TestCase):
+    def test_images_read_in_workers(self):
+        pool = ocr_workers.OcrProcessPool(workers=2, torch_threads=1, reader_factory=ShapeReader)
+        images = [np.full((20 + number, 30, 3), number, dtype=np.uint8) for number in range(8)]
+
+        with concurrent.futures.ThreadPoolExecutor(4) as threads:
+            results = list(threads.map(pool.readtext, images))
+        pool.close()
+
+        self.assertEqual([text for text, _ in results],
+                         [f"{image.shape} {int(image.sum())}" for image in images])
+        self.assertNotIn(str(os.getpid()), {pid for _, pid in results})
+
+    def test_load_error_returned(self):
+        pool = ocr_workers.OcrProcessPool(workers=1, torch_threads=1, reader_factory=failing_reader)
+        with concurrent.futures.ThreadPoolExecutor(1) as threads:
+            with self.assertRaises(RuntimeError):
+                threads.submit(pool.readtext, np.zeros((4, 4, 3), dtype=np.uint8)).result(timeout=30)
+        pool.close()
+
+
+class TestLazyResource(unittest.TestCase):
+    def test_loads_once_on_first_use(self):
+        loads = []
+        resource = LazyResource("Model", lambda: loads.append(1) or object())
+        self.assertEqual(resource.state, "not loaded")
+        self.assertEqual(loads, [])
+
+        with concurrent.futures.ThreadPoolExecutor(4) as pool:
+            values = list(pool.map(lambda _: resource.get(), range(8)))
+
+        self.assertEqual(loads, [1])
+        self.assertTrue(all(value is values[0] for value in values))
+        self.assertEqual(resource.state, "ready")
+
+    def test_warm_up_and_retry_after_failure(self):
+        attempts = []
+
+        def load():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise OSError("model download failed")
+            return "model"
+
+        resource = LazyResource("Model", load)
+        resource.warm_up().join()
+        self.assertEqual(resource.state, "failed")
+        self.assertIsInstance(resource.error, OSError)
+
+        self.assertEqual(resource.get(), "model")
+        self.assertEqual(resource.state, "ready")
+        self.assertIsNone(resource.warm_up())
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,67 @@
+import datetime
+import json
+import sys
+import tempfile
+import time
+import urllib.parse
+import urllib.request
+
+sys.path.insert(1, "../app")
+
+import instagram_fetch
+import instagram_stub
+
+PROFILE_COUNT = 50
+POSTS_PER_PROFILE = 20
+LATENCY = 0.02  # Simulated server response time in seconds
+
+
+def write_fixtures(directory: str):
+    image = bytes(range(256)) * 200  # About the size of a small JPEG
+    for number in range(PROFILE_COUNT):
+        posts = [(f"Post {index}", datetime.datetime(2024, 1, 1) - datetime.timedelta(days=index), image)
+                 for index in range(POSTS_PER_PROFILE)]
+        instagram_stub.write_profile(directory, f"user{number}", "Benchmark account", posts)
+
+
+def fetch_sequentially(server_url: str) -> int:
+    # What the app did before: one blocking request at a time, each on a fresh connection
+    downloaded = 0
+    for number in range(PROFILE_COUNT):
+        profile_url = f"{server_url}/profiles/user{number}.json"
+        with urllib.request.urlopen(profile_url) as response:
+            profile = json.loads(response.read())
+        for post in profile["posts"]:
+            with urllib.request.urlopen(urllib.parse.urljoin(profile_url, post["url"])) as response:
+                downloaded += len(response.read())
+    return downloaded
+
+
+def fetch_with_engine(server_url: str) -> int:
+    engine = instagram_fetch.InstagramFetchEngine(stub_url=server_url)
+    profiles = engine.fetch_all([f"user{number}" for number in range(PROFILE_COUNT)], lambda post: True)
+    engine.close()
+    return sum(len(post.image) for profile in profiles for post in profile.posts)
+
+
+def run_benchmark():
+    with tempfile.TemporaryDirectory() as fixtures_directory:
+        write_fixtures(fixtures_directory)
+        server = instagram_stub.StubServer(fixtures_directory, latency=LATENCY).start()
+
+        request_count = PROFILE_COUNT * (POSTS_PER_PROFILE + 1)
+        print(f"{PROFILE_COUNT} profiles, {POSTS_PER_PROFILE} posts each, {round(LATENCY * 1000)}ms latency "
+              f"({request_count} requests)")
+
+        for name, fetch in (("Sequential urllib", fetch_sequentially), ("Fetch engine", fetch_with_engine)):
+            start = time.perf_counter()
+            downloaded = fetch(server.url)
+            elapsed = time.perf_counter() - start
+            print(f"{name}: {round(elapsed, 3)}s ({round(request_count / elapsed)} requests/s, "
+                  f"{round(downloaded / 1e6, 1)}MB)")
+
+        server.stop()
+
+
+if __name__ == "__main__":
+    run_benchmark()
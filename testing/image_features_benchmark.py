@@ -0,0 +1,67 @@
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(1, "../app")
+
+import image_features
+
+IMAGE_COUNT = 64
+
+
+def make_fixtures() -> list[bytes]:
+    # Full-size JPEG posts with some smooth colour, as Instagram serves them
+    rng = np.random.default_rng(0)
+    images = []
+    for _ in range(IMAGE_COUNT):
+        pixels = cv2.resize(rng.integers(0, 256, (12, 12, 3), dtype=np.uint8), (1080, 1080),
+                            interpolation=cv2.INTER_CUBIC)
+        images.append(cv2.imencode(".jpg", pixels, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes())
+    return images
+
+
+def load_fixtures(directory: str) -> list[bytes]:
+    images = []
+    for name in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, name), "rb") as file:
+            images.append(file.read())
+    return images
+
+
+def full_brightness(images: list[bytes]) -> list[float]:
+    # What the app did before: a full decode and a grey conversion for every post
+    brightness = []
+    for image in images:
+        pixels = cv2.imdecode(np.frombuffer(image, dtype=np.uint8), cv2.IMREAD_COLOR)
+        brightness.append(float(np.mean(cv2.cvtColor(pixels, cv2.COLOR_BGR2GRAY))) / 255)
+    return brightness
+
+
+def reduced_features(images: list[bytes]) -> list[np.ndarray]:
+    return [image_features.image_features(image_features.decode_reduced(image)) for image in images]
+
+
+def run_benchmark(fixtures_directory: str = None):
+    images = load_fixtures(fixtures_directory) if fixtures_directory else make_fixtures()
+    print(f"{len(images)} images, {round(sum(len(image) for image in images) / 1e6, 1)}MB")
+
+    start = time.perf_counter()
+    expected = full_brightness(images)
+    elapsed = time.perf_counter() - start
+    print(f"Full decode, brightness only: {round(elapsed, 3)}s ({round(len(images) / elapsed, 1)} images/s)")
+
+    start = time.perf_counter()
+    features = reduced_features(images)
+    elapsed = time.perf_counter() - start
+    error = max(abs(float(feature[image_features.BRIGHTNESS]) - reference)
+                for feature, reference in zip(features, expected))
+    print(f"Reduced decode, all features: {round(elapsed, 3)}s ({round(len(images) / elapsed, 1)} images/s, "
+          f"largest brightness difference {round(error, 4)})")
+
+
+if __name__ == "__main__":
+    # Optionally pass a directory of real post images instead of the generated ones
+    run_benchmark(sys.argv[1] if len(sys.argv) > 1 else None)
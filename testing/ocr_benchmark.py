@@ -0,0 +1,96 @@
+import concurrent.futures
+import os
+import sys
+import time
+
+import cv2
+import easyocr
+import numpy as np
+
+sys.path.insert(1, "../app")
+
+import ocr_batching
+import ocr_workers
+
+IMAGE_COUNT = 64
+PROCESS_COUNTS = (2, 4)
+THREADS = 8  # Concurrent assessments asking for OCR, like the scheduler's CPU pool
+QUOTES = ["Nobody understands me", "Good vibes only", "Monday again", "I feel so alone",
+          "Best day ever", "Can't sleep", "Stay strong", "Game day"]
+
+
+def make_fixtures() -> list[np.ndarray]:
+    # Square quote posts, the kind of image text scanning is meant for
+    images = []
+    for index in range(IMAGE_COUNT):
+        image = np.full((1080, 1080, 3), (index * 37 % 200, index * 53 % 200, index * 71 % 200), dtype=np.uint8)
+        cv2.putText(image, QUOTES[index % len(QUOTES)], (80, 540), cv2.FONT_HERSHEY_SIMPLEX, 2.5, (255, 255, 255), 6)
+        cv2.putText(image, f"#{index}", (80, 700), cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 4)
+        images.append(image)
+    return images
+
+
+def load_fixtures(directory: str) -> list[np.ndarray]:
+    images = [cv2.imread(os.path.join(directory, name), cv2.IMREAD_COLOR) for name in sorted(os.listdir(directory))]
+    return [image for image in images if image is not None]
+
+
+def read_per_post(reader, images: list[np.ndarray]) -> list:
+    # What the app did before: every worker thread calls EasyOCR on its own image
+    with concurrent.futures.ThreadPoolExecutor(THREADS) as pool:
+        return list(pool.map(lambda image: reader.readtext(image, detail=0, paragraph=True), images))
+
+
+def read_batched(reader, images: list[np.ndarray], batch_size: int, max_wait: float) -> list:
+    batcher = ocr_batching.OcrBatcher(lambda: reader, batch_size, max_wait)
+    with concurrent.futures.ThreadPoolExecutor(THREADS) as pool:
+        results = list(pool.map(batcher.readtext, images))
+    batcher.close()
+    return results
+
+
+def read_in_processes(pool, images: list[np.ndarray]) -> list:
+    with concurrent.futures.ThreadPoolExecutor(THREADS) as threads:
+        return list(threads.map(pool.readtext, images))
+
+
+def run_benchmark(fixtures_directory: str = None):
+    images = load_fixtures(fixtures_directory) if fixtures_directory else make_fixtures()
+
+    # Fork the worker processes before this process loads its own model
+    pools = [ocr_workers.OcrProcessPool(workers) for workers in PROCESS_COUNTS]
+    for pool in pools:
+        read_in_processes(pool, images[:pool.workers])  # Workers load their models as they start
+
+    reader = easyocr.Reader(['en'])
+    reader.readtext(images[0], detail=0, paragraph=True)  # Warm up the models
+
+    print(f"{len(images)} images, {THREADS} threads")
+
+    start = time.perf_counter()
+    expected = read_per_post(reader, images)
+    elapsed = time.perf_counter() - start
+    print(f"Per post: {round(elapsed, 3)}s ({round(len(images) / elapsed, 2)} images/s)")
+
+    for batch_size in (4, 8, 16):
+        for max_wait in (0.01, 0.05):
+            start = time.perf_counter()
+            results = read_batched(reader, images, batch_size, max_wait)
+            elapsed = time.perf_counter() - start
+            matches = sum(result == reference for result, reference in zip(results, expected))
+            print(f"Batched (size {batch_size}, wait {round(max_wait * 1000)}ms): {round(elapsed, 3)}s "
+                  f"({round(len(images) / elapsed, 2)} images/s, {matches}/{len(images)} identical to per post)")
+
+    for pool in pools:
+        start = time.perf_counter()
+        results = read_in_processes(pool, images)
+        elapsed = time.perf_counter() - start
+        matches = sum(result == reference for result, reference in zip(results, expected))
+        print(f"{pool.workers} processes, {pool.torch_threads} torch threads each: {round(elapsed, 3)}s "
+              f"({round(len(images) / elapsed, 2)} images/s, {matches}/{len(images)} identical to per post)")
+        pool.close()
+
+
+if __name__ == "__main__":
+    # Optionally pass a directory of real post images instead of the generated ones
+    run_benchmark(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,67 @@
+import sys
+import time
+
+import cv2
+import easyocr
+import numpy as np
+
+sys.path.insert(1, "../app")
+
+import ocr_preprocessing
+from ocr_benchmark import load_fixtures, make_fixtures
+from ocr_preprocessing import OcrMode
+
+PHOTO_COUNT = 16
+MODES = [ocr_preprocessing.FULL_SIZE, OcrMode(720), OcrMode(540), OcrMode(360), OcrMode(text_check=True),
+         ocr_preprocessing.FAST]
+
+
+def make_photos() -> list[np.ndarray]:
+    # Smooth, textless images (skies, blurred backgrounds), the kind the text check is meant to skip
+    rng = np.random.default_rng(0)
+    return [cv2.resize(rng.integers(0, 256, (6, 6, 3), dtype=np.uint8), (1080, 1350), interpolation=cv2.INTER_CUBIC)
+            for _ in range(PHOTO_COUNT)]
+
+
+def words(text: list[str]) -> set[str]:
+    return set(" ".join(text).lower().split())
+
+
+def read_all(reader, images: list[np.ndarray], mode: OcrMode) -> tuple[list, float, ocr_preprocessing.OcrStats]:
+    stats = ocr_preprocessing.OcrStats()
+    start = time.perf_counter()
+    results = [ocr_preprocessing.read_text(lambda pixels: reader.readtext(pixels, detail=0, paragraph=True),
+                                           image, mode, stats) for image in images]
+    return results, time.perf_counter() - start, stats
+
+
+def describe(mode: OcrMode) -> str:
+    size = "full size" if mode.max_side is None else f"max side {mode.max_side}"
+    return size + (", text check" if mode.text_check else "")
+
+
+def run_benchmark(fixtures_directory: str = None):
+    # Accuracy is word recall against the full-size reading of the same image, so real images need no labels
+    images = load_fixtures(fixtures_directory) if fixtures_directory else make_fixtures() + make_photos()
+
+    reader = easyocr.Reader(['en'])
+    reader.readtext(images[0], detail=0, paragraph=True)  # Warm up the models
+    print(f"{len(images)} images")
+
+    expected = None
+    for mode in MODES:
+        results, elapsed, stats = read_all(reader, images, mode)
+        if expected is None:
+            expected = [words(result) for result in results]
+
+        found = sum(len(words(result) & reference) for result, reference in zip(results, expected))
+        total = sum(len(reference) for reference in expected)
+        matches = sum(words(result) == reference for result, reference in zip(results, expected))
+        print(f"{describe(mode)}: {round(elapsed, 3)}s ({round(len(images) / elapsed, 2)} images/s), "
+              f"{stats.skipped} skipped, {round(found / max(total, 1) * 100, 1)}% of words found, "
+              f"{matches}/{len(images)} identical to full size, estimated {round(stats.seconds_saved, 2)}s saved")
+
+
+if __name__ == "__main__":
+    # Optionally pass a directory of real post images instead of the generated ones
+    run_benchmark(sys.argv[1] if len(sys.argv) > 1 else None)
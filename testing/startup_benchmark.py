@@ -0,0 +1,58 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+APP_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+
+
+def measure_import(module: str) -> tuple[float, list]:
+    # Import the module in a fresh interpreter with -X importtime, returning the wall time and
+    # (cumulative microseconds, self microseconds, module) for every import
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=APP_DIRECTORY,
+                               capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{completed.stderr}")
+
+    imports = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_time, cumulative_time, name = line[len("import time:"):].split("|")
+        imports.append((int(cumulative_time), int(self_time), name.rstrip()))
+
+    return elapsed, imports
+
+
+def run_benchmark(module: str, top: int, max_seconds: float = None) -> bool:
+    elapsed, imports = measure_import(module)
+
+    print(f"Importing {module}: {round(elapsed, 3)}s wall time")
+    print(f"{'cumulative':>12} {'self':>10}  module")
+    for cumulative_time, self_time, name in sorted(imports, reverse=True)[:top]:
+        print(f"{round(cumulative_time / 1000, 1):>10}ms {round(self_time / 1000, 1):>8}ms  {name}")
+
+    # Heavy libraries that should only be imported once they're needed
+    eager = sorted({name.strip() for _, _, name in imports} & {"torch", "easyocr"})
+    if eager:
+        print(f"Imported at startup but meant to be lazy: {', '.join(eager)}")
+
+    if max_seconds is not None and elapsed > max_seconds:
+        print(f"Regression: startup took {round(elapsed, 3)}s, more than the {max_seconds}s limit")
+        return False
+
+    return not eager
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report how long the app takes to import and where the time goes.")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=20, help="number of slowest imports to list")
+    parser.add_argument("--max-seconds", type=float, help="fail if importing takes longer than this")
+    arguments = parser.parse_args()
+
+    sys.exit(0 if run_benchmark(arguments.module, arguments.top, arguments.max_seconds) else 1)
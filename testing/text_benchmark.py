@@ -0,0 +1,45 @@
+import random
+import sys
+import time
+
+sys.path.insert(1, "../app")
+
+import text_scoring
+
+TEXT_COUNT = 5000
+WORDS_PER_TEXT = 40
+
+word_pool = ["love", "happy", "beautiful", "great", "friends", "game", "school", "summer", "tired", "alone", "sad",
+             "hate", "kill", "death", "drunk", "terrible", "pointless", "fun", "party", "team", "win", "lose",
+             "never", "not", "so", "very", "!", "?", ".", ",", ":(", "<3", "can't", "don't", "really", "life",
+             "world", "family", "crying", "angry", "hurt", "bomb", "shooting", "lie", "miss", "best", "worst"]
+
+
+def make_texts(count: int) -> list[str]:
+    generator = random.Random(0)
+    return [" ".join(generator.choices(word_pool, k=WORDS_PER_TEXT)) for _ in range(count)]
+
+
+def run_benchmark():
+    texts = make_texts(TEXT_COUNT)
+
+    scalar_scorer = text_scoring.TextScorer()
+    start = time.perf_counter()
+    scalar_scores = [scalar_scorer.score(text) for text in texts]
+    scalar_time = time.perf_counter() - start
+
+    batch_scorer = text_scoring.TextScorer()
+    start = time.perf_counter()
+    batch_scores = batch_scorer.score_batch(texts)
+    batch_time = time.perf_counter() - start
+
+    max_difference = max(abs(scalar - batch) for scalar, batch in zip(scalar_scores, batch_scores))
+
+    print(f"{TEXT_COUNT} texts, {WORDS_PER_TEXT} words each")
+    print(f"Scalar loop: {round(scalar_time, 3)}s ({round(TEXT_COUNT / scalar_time)} texts/s)")
+    print(f"Batch:       {round(batch_time, 3)}s ({round(TEXT_COUNT / batch_time)} texts/s)")
+    print(f"Speedup: {round(scalar_time / batch_time, 2)}x, max difference: {max_difference}")
+
+
+if __name__ == "__main__":
+    run_benchmark()